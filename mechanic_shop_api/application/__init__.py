@@ -1,7 +1,14 @@
 from flask import Flask
 from flask_swagger_ui import get_swaggerui_blueprint
 
+from application.auth import token_cache
+from application.commands import register_commands
+from application.database import configure_engine_options, register_sqlite_pragmas
 from application.extensions import cache, db, limiter, ma
+from application.instrumentation import instrumentation
+from application.passwords import password_hasher
+from application.replicas import replica_router
+from application.singleflight import coalescer
 from config import Config
 
 # Swagger configuration
@@ -22,20 +29,30 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    configure_engine_options(app)
     db.init_app(app)
+    register_sqlite_pragmas(app)
+    replica_router.init_app(app)
     ma.init_app(app)
     limiter.init_app(app)
     cache.init_app(app)
+    coalescer.init_app(app)
+    token_cache.init_app(app)
+    password_hasher.init_app(app)
+    instrumentation.init_app(app)
+    register_commands(app)
 
     from application.blueprints.customer import customer_bp
     from application.blueprints.mechanic import mechanic_bp
     from application.blueprints.service_ticket import service_ticket_bp
     from application.blueprints.inventory import inventory_bp
+    from application.blueprints.search import search_bp
 
     app.register_blueprint(customer_bp, url_prefix="/customers")
     app.register_blueprint(mechanic_bp, url_prefix="/mechanics")
     app.register_blueprint(service_ticket_bp, url_prefix="/service-tickets")
     app.register_blueprint(inventory_bp, url_prefix="/inventory")
+    app.register_blueprint(search_bp, url_prefix="/search")
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)  # Register Swagger UI
 
     with app.app_context():
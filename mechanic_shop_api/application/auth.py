@@ -1,3 +1,7 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 
@@ -20,6 +24,112 @@ def encode_token(customer_id):
     )
 
 
+class TokenCache:
+    """Bounded LRU of already-verified tokens.
+
+    Keys are SHA-256 digests of the raw token, values are either
+    ``(customer_id, exp)`` for accepted tokens or ``(None, until, error)`` for
+    rejected ones. Accepted entries are dropped once ``exp`` passes and the
+    whole cache is cleared whenever the signing key changes.
+    """
+
+    def __init__(self, maxsize=1024, negative_ttl=30):
+        self.maxsize = maxsize
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_fingerprint = None
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("TOKEN_CACHE_SIZE", self.maxsize)
+        self.negative_ttl = app.config.get("TOKEN_CACHE_NEGATIVE_TTL", self.negative_ttl)
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._key_fingerprint = None
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _check_key(self, secret_key, algorithm):
+        fingerprint = hashlib.sha256(f"{algorithm}:{secret_key}".encode()).digest()
+        if fingerprint != self._key_fingerprint:
+            self._entries.clear()
+            self._key_fingerprint = fingerprint
+
+    def get(self, digest, secret_key, algorithm):
+        with self._lock:
+            self._check_key(secret_key, algorithm)
+            entry = self._entries.get(digest)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[digest]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry
+
+    def _put(self, digest, entry):
+        self._entries[digest] = entry
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def accept(self, digest, customer_id, exp):
+        with self._lock:
+            self._put(digest, (customer_id, exp))
+
+    def reject(self, digest, error):
+        if self.negative_ttl <= 0:
+            return
+        with self._lock:
+            self._put(digest, (None, time.time() + self.negative_ttl, error))
+
+
+token_cache = TokenCache()
+
+
+def _verify_token(token):
+    """Return ``(customer_id, None)`` or ``(None, error message)``."""
+    secret_key = current_app.config["SECRET_KEY"]
+    algorithm = current_app.config["JWT_ALGORITHM"]
+    digest = hashlib.sha256(token.encode()).digest()
+
+    entry = token_cache.get(digest, secret_key, algorithm)
+    if entry is not None:
+        if entry[0] is None:
+            return None, entry[2]
+        return entry[0], None
+
+    try:
+        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+    except ExpiredSignatureError:
+        error = "Token has expired."
+    except JWTError:
+        error = "Invalid token."
+    else:
+        customer_id = payload.get("sub")
+        exp = payload.get("exp")
+        try:
+            customer_id = int(customer_id)
+        except (TypeError, ValueError):
+            error = "Invalid token payload."
+        else:
+            if isinstance(exp, (int, float)):
+                token_cache.accept(digest, customer_id, exp)
+            return customer_id, None
+
+    token_cache.reject(digest, error)
+    return None, error
+
+
 def token_required(view_func):
     @wraps(view_func)
     def wrapped(*args, **kwargs):
@@ -31,22 +141,11 @@ def token_required(view_func):
         if not token:
             return jsonify({"error": "Missing token."}), 401
 
-        try:
-            payload = jwt.decode(
-                token,
-                current_app.config["SECRET_KEY"],
-                algorithms=[current_app.config["JWT_ALGORITHM"]],
-            )
-        except ExpiredSignatureError:
-            return jsonify({"error": "Token has expired."}), 401
-        except JWTError:
-            return jsonify({"error": "Invalid token."}), 401
-
-        customer_id = payload.get("sub")
-        if customer_id is None:
-            return jsonify({"error": "Invalid token payload."}), 401
+        customer_id, error = _verify_token(token)
+        if error:
+            return jsonify({"error": error}), 401
 
-        kwargs["current_customer_id"] = int(customer_id)
+        kwargs["current_customer_id"] = customer_id
         return view_func(*args, **kwargs)
 
     return wrapped
@@ -1,14 +1,23 @@
 from flask import request, jsonify
 from marshmallow import ValidationError
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from application.auth import encode_token, token_required
-from application.extensions import cache, db, limiter
+from application.bulk import bulk_create, unique_conflicts
+from application.caching import versioned_cached
+from application.conditional import conditional, row_version, table_version
+from application.deletes import start_customer_delete
+from application.export import export_response
+from application.extensions import db, limiter
 from application.models import Customer, ServiceTicket
+from application.passwords import password_hasher
+from application.pagination import get_page_args
+from application.readonly import as_records, fetch_one, fetch_page, page_payload
+from application.serializers import fast_serialization_enabled, json_response, selected_schema
+from application.singleflight import single_flight
 from application.blueprints.customer import customer_bp
 from application.blueprints.customer.schemas import (
+    compiled_customer_schema,
     customer_schema,
-    customers_schema,
     login_schema,
 )
 from application.blueprints.service_ticket.schemas import service_tickets_schema
@@ -26,45 +35,74 @@ def create_customer():
         return jsonify({"error": "Password is required."}), 400
 
     new_customer = Customer(**customer_data)
-    new_customer.password = generate_password_hash(password)
+    new_customer.password = password_hasher.hash(password)
     db.session.add(new_customer)
     db.session.commit()
     return customer_schema.jsonify(new_customer), 201
 
 
+def _prepare_bulk_customers(entries):
+    rejected = {
+        index: (400, {"password": ["Password is required."]})
+        for index, data in entries
+        if not data.get("password")
+    }
+    entries = [(index, data) for index, data in entries if index not in rejected]
+    rejected.update(unique_conflicts(entries, Customer.email))
+    entries = [(index, data) for index, data in entries if index not in rejected]
+
+    hashes = password_hasher.hash_many(data["password"] for _, data in entries)
+    for (_, data), password_hash in zip(entries, hashes):
+        data["password"] = password_hash
+    return rejected
+
+
+@customer_bp.route("/bulk", methods=["POST"])
+def bulk_create_customers():
+    return bulk_create(Customer, customer_schema, _prepare_bulk_customers)
+
+
 @customer_bp.route("/", methods=["GET"])
-@cache.cached(timeout=60, query_string=True)
+@conditional(table_version(Customer))
+@versioned_cached("customers")
+@single_flight
 def get_customers():
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 10, type=int)
-
-    pagination = db.paginate(
-        db.select(Customer).order_by(Customer.id),
-        page=page,
-        per_page=per_page,
-        error_out=False,
-    )
-
-    return (
-        jsonify(
-            {
-                "items": customers_schema.dump(pagination.items),
-                "page": page,
-                "per_page": per_page,
-                "total": pagination.total,
-                "pages": pagination.pages,
-            }
-        ),
-        200,
-    )
+    try:
+        page, per_page, count = get_page_args()
+        compiled = selected_schema(compiled_customer_schema)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    columns = compiled.columns
+    rows, total, pages, has_next = fetch_page(columns, Customer.id, page, per_page, count)
+    if fast_serialization_enabled():
+        items = compiled.dump(rows)
+    else:
+        items = compiled.schema(many=True).dump(as_records(columns, rows))
+
+    return json_response(page_payload(items, page, per_page, total, pages, has_next))
+
+
+@customer_bp.route("/export", methods=["GET"])
+def export_customers():
+    return export_response(compiled_customer_schema, Customer.id, "customers")
 
 
 @customer_bp.route("/<int:customer_id>", methods=["GET"])
+@conditional(row_version(Customer, "customer_id"))
 def get_customer(customer_id):
-    customer = db.session.get(Customer, customer_id)
-    if not customer:
+    try:
+        compiled = selected_schema(compiled_customer_schema)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    columns = compiled.columns
+    row = fetch_one(columns, Customer.id == customer_id)
+    if row is None:
         return jsonify({"error": "Customer not found."}), 404
-    return customer_schema.jsonify(customer), 200
+    if fast_serialization_enabled():
+        return json_response(compiled.dump([row])[0])
+    return compiled.schema().jsonify(as_records(columns, [row])[0]), 200
 
 
 @customer_bp.route("/<int:customer_id>", methods=["PUT"])
@@ -83,7 +121,7 @@ def update_customer(customer_id, current_customer_id):
         return jsonify(e.messages), 400
 
     if "password" in customer_data:
-        customer.password = generate_password_hash(customer_data.pop("password"))
+        customer.password = password_hasher.hash(customer_data.pop("password"))
 
     for key, value in customer_data.items():
         setattr(customer, key, value)
@@ -102,6 +140,12 @@ def delete_customer(customer_id, current_customer_id):
     if not customer:
         return jsonify({"error": "Customer not found."}), 404
 
+    if request.args.get("async", "").lower() in ("1", "true", "yes"):
+        if not start_customer_delete(customer_id):
+            return jsonify({"error": f"Customer {customer_id} is already being deleted."}), 409
+        return jsonify({"message": f"Customer {customer_id} is being deleted."}), 202
+
+    # Tickets and their links are deleted by the database (ON DELETE CASCADE).
     db.session.delete(customer)
     db.session.commit()
     return jsonify({"message": f"Customer {customer_id} deleted."}), 200
@@ -118,8 +162,15 @@ def login_customer():
     customer = db.session.execute(
         db.select(Customer).where(Customer.email == credentials["email"])
     ).scalar_one_or_none()
-    if not customer or not check_password_hash(customer.password, credentials["password"]):
+    if not customer:
+        return jsonify({"error": "Invalid credentials."}), 401
+
+    is_valid, new_hash = password_hasher.verify(customer.password, credentials["password"])
+    if not is_valid:
         return jsonify({"error": "Invalid credentials."}), 401
+    if new_hash:
+        customer.password = new_hash
+        db.session.commit()
 
     token = encode_token(customer.id)
     return jsonify({"token": token}), 200
@@ -2,6 +2,7 @@ from marshmallow import fields
 
 from application.extensions import ma
 from application.models import Customer
+from application.serializers import CompiledSchema
 
 
 class CustomerSchema(ma.SQLAlchemyAutoSchema):
@@ -10,8 +11,10 @@ class CustomerSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Customer
         load_instance = False
+        exclude = ("updated_at",)
 
 
 customer_schema = CustomerSchema()
 customers_schema = CustomerSchema(many=True)
 login_schema = CustomerSchema(only=("email", "password"))
+compiled_customer_schema = CompiledSchema(CustomerSchema)
@@ -1,13 +1,22 @@
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 from marshmallow import ValidationError
 
 from application.blueprints.inventory import inventory_bp
 from application.blueprints.inventory.schemas import (
-    inventories_schema,
+    compiled_inventory_schema,
     inventory_schema,
+    reprice_schema,
 )
+from application.bulk import bulk_create
+from application.caching import versioned_cached
+from application.conditional import conditional, row_version, table_version
+from application.export import export_response
 from application.extensions import db
 from application.models import Inventory
+from application.pagination import get_page_args
+from application.readonly import as_records, fetch_all, fetch_one, fetch_page, page_payload
+from application.repricing import UnknownParts, apply_reprice, plan_reprice
+from application.serializers import fast_serialization_enabled, json_response, selected_schema
 
 
 @inventory_bp.route("/", methods=["POST"])
@@ -23,18 +32,82 @@ def create_inventory_item():
     return inventory_schema.jsonify(new_item), 201
 
 
+@inventory_bp.route("/bulk", methods=["POST"])
+def bulk_create_inventory_items():
+    return bulk_create(Inventory, inventory_schema)
+
+
+@inventory_bp.route("/reprice", methods=["POST"])
+def reprice_inventory():
+    try:
+        sheet = reprice_schema.load(request.get_json(silent=True) or {})
+    except ValidationError as e:
+        return jsonify(e.messages), 400
+    max_items = current_app.config["BULK_MAX_ITEMS"]
+    if len(sheet["prices"]) > max_items:
+        return jsonify({"error": f"prices may contain at most {max_items} entries."}), 413
+
+    try:
+        changes = plan_reprice(sheet["prices"], sheet["rules"])
+    except UnknownParts as e:
+        return jsonify({"error": "Inventory item(s) not found.", "missing_ids": e.ids}), 404
+
+    dry_run = request.args.get("dry_run", "").lower() in ("1", "true", "yes")
+    if not dry_run:
+        apply_reprice(changes)
+        db.session.commit()
+    return json_response({"dry_run": dry_run, "changed": len(changes), "changes": changes})
+
+
 @inventory_bp.route("/", methods=["GET"])
+@conditional(table_version(Inventory))
+@versioned_cached("inventory")
 def get_inventory_items():
-    items = db.session.query(Inventory).all()
-    return inventories_schema.jsonify(items), 200
+    try:
+        compiled = selected_schema(compiled_inventory_schema)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    columns = compiled.columns
+    # Without page or per_page the whole list is returned, as before.
+    if "page" not in request.args and "per_page" not in request.args:
+        rows = fetch_all(columns, order_by=Inventory.id)
+        if fast_serialization_enabled():
+            return json_response(compiled.dump(rows))
+        return compiled.schema(many=True).jsonify(as_records(columns, rows)), 200
+
+    try:
+        page, per_page, count = get_page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows, total, pages, has_next = fetch_page(columns, Inventory.id, page, per_page, count)
+    if fast_serialization_enabled():
+        items = compiled.dump(rows)
+    else:
+        items = compiled.schema(many=True).dump(as_records(columns, rows))
+    return json_response(page_payload(items, page, per_page, total, pages, has_next))
+
+
+@inventory_bp.route("/export", methods=["GET"])
+def export_inventory():
+    return export_response(compiled_inventory_schema, Inventory.id, "inventory")
 
 
 @inventory_bp.route("/<int:inventory_id>", methods=["GET"])
+@conditional(row_version(Inventory, "inventory_id"))
 def get_inventory_item(inventory_id):
-    item = db.session.get(Inventory, inventory_id)
-    if not item:
+    try:
+        compiled = selected_schema(compiled_inventory_schema)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    columns = compiled.columns
+    row = fetch_one(columns, Inventory.id == inventory_id)
+    if row is None:
         return jsonify({"error": "Inventory item not found."}), 404
-    return inventory_schema.jsonify(item), 200
+    if fast_serialization_enabled():
+        return json_response(compiled.dump([row])[0])
+    return compiled.schema().jsonify(as_records(columns, [row])[0]), 200
 
 
 @inventory_bp.route("/<int:inventory_id>", methods=["PUT"])
@@ -1,12 +1,51 @@
+from marshmallow import ValidationError, fields, validate, validates_schema
+
 from application.extensions import ma
 from application.models import Inventory
+from application.serializers import CompiledSchema
+
+MAX_REPRICE_RULES = 50
 
 
 class InventorySchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Inventory
         load_instance = False
+        exclude = ("updated_at",)
+
+
+class RepriceRuleSchema(ma.Schema):
+    match = fields.String(required=True, validate=validate.Length(min=1, max=255))
+    markup_percent = fields.Float(validate=validate.Range(min=-100, min_inclusive=False))
+    ending = fields.Float(validate=validate.Range(min=0, max=1, max_inclusive=False))
+    min_price = fields.Float(validate=validate.Range(min=0))
+    max_price = fields.Float(validate=validate.Range(min=0))
+
+    @validates_schema
+    def validate_bounds(self, data, **kwargs):
+        if data.get("min_price", 0) > data.get("max_price", float("inf")):
+            raise ValidationError("min_price must not be greater than max_price.", "min_price")
+
+
+class RepriceSchema(ma.Schema):
+    prices = fields.Dict(
+        keys=fields.Integer(validate=validate.Range(min=1)),
+        values=fields.Float(validate=validate.Range(min=0)),
+        load_default=dict,
+    )
+    rules = fields.List(
+        fields.Nested(RepriceRuleSchema),
+        validate=validate.Length(max=MAX_REPRICE_RULES),
+        load_default=list,
+    )
+
+    @validates_schema
+    def validate_not_empty(self, data, **kwargs):
+        if not data.get("prices") and not data.get("rules"):
+            raise ValidationError("Give prices, rules or both.", "_schema")
 
 
 inventory_schema = InventorySchema()
 inventories_schema = InventorySchema(many=True)
+compiled_inventory_schema = CompiledSchema(InventorySchema)
+reprice_schema = RepriceSchema()
@@ -1,10 +1,21 @@
 from flask import request, jsonify
 from marshmallow import ValidationError
 
+from application.bulk import bulk_create, unique_conflicts
+from application.caching import versioned_cached
+from application.conditional import conditional, table_version
+from application.export import export_response
 from application.extensions import db
-from application.models import Mechanic, service_ticket_mechanic
+from application.models import Mechanic
 from application.blueprints.mechanic import mechanic_bp
-from application.blueprints.mechanic.schemas import mechanic_schema, mechanics_schema
+from application.blueprints.mechanic.schemas import (
+    compiled_mechanic_leaderboard_schema,
+    compiled_mechanic_schema,
+    mechanic_schema,
+)
+from application.pagination import get_page_args
+from application.readonly import as_records, fetch_all, fetch_page, page_payload
+from application.serializers import fast_serialization_enabled, json_response, selected_schema
 
 
 @mechanic_bp.route("/", methods=["POST"])
@@ -20,25 +31,75 @@ def create_mechanic():
     return mechanic_schema.jsonify(new_mechanic), 201
 
 
+@mechanic_bp.route("/bulk", methods=["POST"])
+def bulk_create_mechanics():
+    return bulk_create(
+        Mechanic,
+        mechanic_schema,
+        lambda entries: unique_conflicts(entries, Mechanic.email),
+    )
+
+
 @mechanic_bp.route("/", methods=["GET"])
+@conditional(table_version(Mechanic))
+@versioned_cached("mechanics")
 def get_mechanics():
-    mechanics = db.session.query(Mechanic).all()
-    return mechanics_schema.jsonify(mechanics), 200
+    try:
+        compiled = selected_schema(compiled_mechanic_schema)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    columns = compiled.columns
+    # Without page or per_page the whole list is returned, as before.
+    if "page" not in request.args and "per_page" not in request.args:
+        rows = fetch_all(columns, order_by=Mechanic.id)
+        if fast_serialization_enabled():
+            return json_response(compiled.dump(rows))
+        return compiled.schema(many=True).jsonify(as_records(columns, rows)), 200
+
+    try:
+        page, per_page, count = get_page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows, total, pages, has_next = fetch_page(columns, Mechanic.id, page, per_page, count)
+    if fast_serialization_enabled():
+        items = compiled.dump(rows)
+    else:
+        items = compiled.schema(many=True).dump(as_records(columns, rows))
+    return json_response(page_payload(items, page, per_page, total, pages, has_next))
+
+
+@mechanic_bp.route("/export", methods=["GET"])
+def export_mechanics():
+    return export_response(compiled_mechanic_schema, Mechanic.id, "mechanics")
 
 
 @mechanic_bp.route("/by-tickets", methods=["GET"])
+@conditional(table_version(Mechanic))
+@versioned_cached("mechanics")
 def get_mechanics_by_tickets():
-    mechanics = (
-        db.session.query(Mechanic)
-        .outerjoin(
-            service_ticket_mechanic,
-            Mechanic.id == service_ticket_mechanic.c.mechanic_id,
-        )
-        .group_by(Mechanic.id)
-        .order_by(db.func.count(service_ticket_mechanic.c.service_ticket_id).desc())
-        .all()
+    limit = request.args.get("limit", type=int)
+    page = request.args.get("page", 1, type=int)
+    if (limit is not None and limit < 1) or page < 1:
+        return jsonify({"error": "limit and page must be positive integers."}), 400
+    if limit is None and "page" in request.args:
+        return jsonify({"error": "page requires limit."}), 400
+    try:
+        compiled = selected_schema(compiled_mechanic_leaderboard_schema)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Walks ix_mechanics_ticket_count_id backwards; no join or GROUP BY.
+    columns = compiled.columns
+    rows = fetch_all(
+        columns,
+        order_by=(Mechanic.ticket_count.desc(), Mechanic.id.desc()),
+        limit=limit,
+        offset=(page - 1) * limit if limit else None,
     )
-    return mechanics_schema.jsonify(mechanics), 200
+    if fast_serialization_enabled():
+        return json_response(compiled.dump(rows))
+    return compiled.schema(many=True).jsonify(as_records(columns, rows)), 200
 
 
 @mechanic_bp.route("/<int:mechanic_id>", methods=["PUT"])
@@ -1,12 +1,26 @@
+from marshmallow import fields
+
 from application.extensions import ma
 from application.models import Mechanic
+from application.serializers import CompiledSchema
 
 
 class MechanicSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Mechanic
         load_instance = False
+        exclude = ("ticket_count", "updated_at")
+
+
+class MechanicLeaderboardSchema(MechanicSchema):
+    ticket_count = fields.Integer(dump_only=True)
+
+    class Meta(MechanicSchema.Meta):
+        exclude = ("updated_at",)
 
 
 mechanic_schema = MechanicSchema()
 mechanics_schema = MechanicSchema(many=True)
+mechanic_leaderboard_schema = MechanicLeaderboardSchema(many=True)
+compiled_mechanic_schema = CompiledSchema(MechanicSchema)
+compiled_mechanic_leaderboard_schema = CompiledSchema(MechanicLeaderboardSchema)
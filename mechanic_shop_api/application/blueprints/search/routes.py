@@ -0,0 +1,32 @@
+from flask import request, jsonify
+
+from application.caching import versioned_cached
+from application.conditional import conditional, table_version
+from application.models import Inventory, ServiceTicket
+from application.pagination import MAX_PAGE_LIMIT, get_page_args
+from application.readonly import page_payload
+from application.search import INDEX_TABLES, SOURCES, search
+from application.blueprints.search import search_bp
+
+
+@search_bp.route("/", methods=["GET"])
+@conditional(table_version(ServiceTicket, Inventory))
+@versioned_cached("service_tickets", "inventory", *INDEX_TABLES)
+def search_documents():
+    try:
+        page, per_page, _ = get_page_args(default_per_page=20)
+        page, per_page = max(page, 1), min(max(per_page, 1), MAX_PAGE_LIMIT)
+        kinds = [kind for kind in request.args.get("type", "").split(",") if kind]
+        unknown = sorted(set(kinds) - set(SOURCES))
+        if unknown:
+            raise ValueError(f"Unknown type: {', '.join(unknown)}. Use {', '.join(SOURCES)}.")
+        # One extra row tells whether there is a next page.
+        rows = search(request.args.get("q", ""), kinds, per_page + 1, (page - 1) * per_page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    items = [
+        {"type": row.kind, "id": row.id, "score": float(row.score), "text": row.text}
+        for row in rows[:per_page]
+    ]
+    return jsonify(page_payload(items, page, per_page, None, None, len(rows) > per_page)), 200
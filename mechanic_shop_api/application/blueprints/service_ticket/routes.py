@@ -1,14 +1,36 @@
-from flask import request, jsonify
+from collections import Counter
+
+from flask import current_app, request, jsonify
 from marshmallow import ValidationError
 
+from application.bulk import bulk_create, missing_references
+from application.caching import versioned_cached
+from application.conditional import conditional, table_version
+from application.counters import adjust_mechanic_ticket_counts, adjust_parts_total
+from application.export import export_response
 from application.extensions import db
-from application.models import Inventory, Mechanic, ServiceTicket
+from application.models import (
+    Customer,
+    Inventory,
+    Mechanic,
+    ServiceTicket,
+    service_ticket_inventory,
+    service_ticket_mechanic,
+    utcnow,
+)
+from application.pagination import decode_key_cursor, get_keyset_args, keyset_page, keyset_page_by
+from application.serializers import fast_serialization_enabled, json_response, selected_schema
+from application.singleflight import single_flight
+from application.vin import VIN_LENGTH, normalize_vin, vin_prefix_range
 from application.blueprints.service_ticket import service_ticket_bp
 from application.blueprints.service_ticket.schemas import (
+    compiled_service_ticket_schema,
     service_ticket_schema,
     service_tickets_schema,
 )
 
+TICKET_SORTS = ("id", "parts_total", "-parts_total")
+
 
 @service_ticket_bp.route("/", methods=["POST"])
 def create_service_ticket():
@@ -16,6 +38,9 @@ def create_service_ticket():
         ticket_data = service_ticket_schema.load(request.json)
     except ValidationError as e:
         return jsonify(e.messages), 400
+    # SQLite enforces the foreign key, so check it here rather than fail the INSERT.
+    if db.session.get(Customer, ticket_data["customer_id"]) is None:
+        return jsonify({"customer_id": ["Customer not found."]}), 404
 
     new_ticket = ServiceTicket(**ticket_data)
     db.session.add(new_ticket)
@@ -23,10 +48,134 @@ def create_service_ticket():
     return service_ticket_schema.jsonify(new_ticket), 201
 
 
+@service_ticket_bp.route("/bulk", methods=["POST"])
+def bulk_create_service_tickets():
+    return bulk_create(
+        ServiceTicket,
+        service_ticket_schema,
+        lambda entries: missing_references(entries, "customer_id", Customer.id, "Customer not found."),
+    )
+
+
+def _tickets_query(compiled, fast, *required):
+    """Select the tickets' ``compiled`` field set, plus the ``required`` columns."""
+    columns = list(compiled.columns)
+    columns += [column for column in required if column not in columns]
+    if fast:
+        return db.select(*columns)
+    # Load only the selected columns, and selectinload only the selected
+    # relationships, at one query each per page.
+    return db.select(ServiceTicket).options(
+        db.load_only(*(getattr(ServiceTicket, column.key) for column in columns)),
+        *(db.selectinload(relationship.class_attribute) for relationship in compiled.relationships),
+    )
+
+
+def _tickets_response(compiled, fast, tickets, next_cursor):
+    if fast:
+        response = json_response(compiled.dump(tickets))
+    else:
+        response = compiled.schema(many=True).jsonify(tickets)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, 200
+
+
 @service_ticket_bp.route("/", methods=["GET"])
+@conditional(table_version(ServiceTicket, Mechanic, Inventory))
+@versioned_cached(
+    "service_tickets",
+    "service_ticket_mechanic",
+    "service_ticket_inventory",
+    "mechanics",
+    "inventory",
+)
+@single_flight
 def get_service_tickets():
-    tickets = db.session.query(ServiceTicket).all()
-    return service_tickets_schema.jsonify(tickets), 200
+    sort = request.args.get("sort", "id")
+    try:
+        if sort not in TICKET_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(TICKET_SORTS)}.")
+        if sort == "id":
+            after, limit = get_keyset_args()
+        else:
+            after, limit = get_keyset_args(lambda token: decode_key_cursor(token, float, int), None)
+        compiled = selected_schema(compiled_service_ticket_schema)
+        vin = request.args.get("vin")
+        if vin:
+            vin = normalize_vin(vin)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    customer_id = request.args.get("customer_id", type=int)
+    mechanic_id = request.args.get("mechanic_id", type=int)
+    min_parts_total = request.args.get("min_parts_total", type=float)
+    max_parts_total = request.args.get("max_parts_total", type=float)
+
+    fast = fast_serialization_enabled()
+    query = _tickets_query(compiled, fast, ServiceTicket.parts_total) if sort != "id" else _tickets_query(compiled, fast)
+    if customer_id is not None:
+        query = query.where(ServiceTicket.customer_id == customer_id)
+    if vin:
+        query = query.where(ServiceTicket.vin == vin)
+    if mechanic_id is not None:
+        query = query.where(ServiceTicket.mechanics.any(Mechanic.id == mechanic_id))
+    if min_parts_total is not None:
+        query = query.where(ServiceTicket.parts_total >= min_parts_total)
+    if max_parts_total is not None:
+        query = query.where(ServiceTicket.parts_total <= max_parts_total)
+
+    if sort == "id":
+        tickets, next_cursor = keyset_page(query, ServiceTicket.id, after, limit, scalars=not fast)
+    else:
+        # Billing lists: walk the (parts_total, id) index in either direction.
+        tickets, next_cursor = keyset_page_by(
+            query,
+            (ServiceTicket.parts_total, ServiceTicket.id),
+            after,
+            limit,
+            scalars=not fast,
+            descending=sort.startswith("-"),
+        )
+    return _tickets_response(compiled, fast, tickets, next_cursor)
+
+
+@service_ticket_bp.route("/by-vin/<vin>", methods=["GET"])
+@conditional(table_version(ServiceTicket, Mechanic, Inventory))
+@versioned_cached(
+    "service_tickets",
+    "service_ticket_mechanic",
+    "service_ticket_inventory",
+    "mechanics",
+    "inventory",
+)
+def get_service_tickets_by_vin(vin):
+    try:
+        vin = normalize_vin(vin, partial=True)
+        after_key, limit = get_keyset_args(lambda token: decode_key_cursor(token, str, int), None)
+        compiled = selected_schema(compiled_service_ticket_schema)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    fast = fast_serialization_enabled()
+    # Paging on (vin, id) keeps a prefix search on the index too, with
+    # each vehicle's tickets together in id order.
+    query = _tickets_query(compiled, fast, ServiceTicket.vin)
+    if len(vin) == VIN_LENGTH:
+        query = query.where(ServiceTicket.vin == vin)
+    else:
+        low, high = vin_prefix_range(vin)
+        query = query.where(ServiceTicket.vin >= low, ServiceTicket.vin < high)
+
+    tickets, next_cursor = keyset_page_by(
+        query, (ServiceTicket.vin, ServiceTicket.id), after_key, limit, scalars=not fast
+    )
+    return _tickets_response(compiled, fast, tickets, next_cursor)
+
+
+@service_ticket_bp.route("/export", methods=["GET"])
+def export_service_tickets():
+    return export_response(compiled_service_ticket_schema, ServiceTicket.id, "service_tickets")
 
 
 @service_ticket_bp.route("/<int:ticket_id>/assign-mechanic/<int:mechanic_id>", methods=["PUT"])
@@ -59,6 +208,78 @@ def remove_mechanic(ticket_id, mechanic_id):
     return service_ticket_schema.jsonify(ticket), 200
 
 
+def _id_list(payload, key):
+    ids = payload.get(key, [])
+    if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+        return None
+    return ids
+
+
+def _edit_mechanics(ticket_ids, add_ids, remove_ids):
+    """Apply add/remove mechanic lists to every ticket as set-based statements.
+
+    One SELECT checks that the mechanics exist, one reads the links that are
+    already there, then at most one INSERT and one DELETE run against
+    service_ticket_mechanic. Returns an error response, or None on success;
+    the caller commits.
+    """
+    requested_ids = set(add_ids) | set(remove_ids)
+    if not requested_ids:
+        return None
+
+    found_ids = set(db.session.scalars(
+        db.select(Mechanic.id).where(Mechanic.id.in_(requested_ids))
+    ))
+    missing_ids = sorted(requested_ids - found_ids)
+    if missing_ids:
+        return jsonify({"error": "Mechanic(s) not found.", "missing_ids": missing_ids}), 404
+
+    link = service_ticket_mechanic.c
+    existing = {
+        tuple(row) for row in db.session.execute(
+            db.select(link.service_ticket_id, link.mechanic_id).where(
+                link.service_ticket_id.in_(ticket_ids),
+                link.mechanic_id.in_(requested_ids),
+            )
+        )
+    }
+
+    # As in the per-mechanic routes, removal wins when an id is in both lists.
+    add_ids = set(add_ids) - set(remove_ids)
+    to_insert = sorted(
+        (ticket_id, mechanic_id)
+        for ticket_id in ticket_ids
+        for mechanic_id in add_ids
+        if (ticket_id, mechanic_id) not in existing
+    )
+    to_delete = [pair for pair in existing if pair[1] in set(remove_ids)]
+
+    if to_insert:
+        db.session.execute(
+            service_ticket_mechanic.insert(),
+            [{"service_ticket_id": t, "mechanic_id": m} for t, m in to_insert],
+        )
+    if to_delete:
+        db.session.execute(
+            service_ticket_mechanic.delete().where(
+                link.service_ticket_id.in_(ticket_ids),
+                link.mechanic_id.in_(remove_ids),
+            )
+        )
+
+    changed = sorted({ticket_id for ticket_id, _ in to_insert + to_delete})
+    if changed:
+        # The links bypass the ORM, so the tickets' ETags need a manual bump.
+        db.session.execute(
+            db.update(ServiceTicket).where(ServiceTicket.id.in_(changed)).values(updated_at=utcnow())
+        )
+
+    deltas = Counter(mechanic_id for _, mechanic_id in to_insert)
+    deltas.subtract(mechanic_id for _, mechanic_id in to_delete)
+    adjust_mechanic_ticket_counts(db.session, deltas)
+    return None
+
+
 @service_ticket_bp.route("/<int:ticket_id>/edit", methods=["PUT"])
 def edit_ticket_mechanics(ticket_id):
     ticket = db.session.get(ServiceTicket, ticket_id)
@@ -66,52 +287,111 @@ def edit_ticket_mechanics(ticket_id):
         return jsonify({"error": "Service ticket not found."}), 404
 
     payload = request.get_json(silent=True) or {}
-    add_ids = payload.get("add_ids", [])
-    remove_ids = payload.get("remove_ids", [])
-
-    if not isinstance(add_ids, list) or not isinstance(remove_ids, list):
-        return jsonify({"error": "add_ids and remove_ids must be lists."}), 400
-
-    if add_ids:
-        mechanics_to_add = db.session.scalars(
-            db.select(Mechanic).where(Mechanic.id.in_(add_ids))
-        ).all()
-        found_ids = {mechanic.id for mechanic in mechanics_to_add}
-        missing_ids = sorted(set(add_ids) - found_ids)
-        if missing_ids:
-            return jsonify({"error": "Mechanic(s) not found.", "missing_ids": missing_ids}), 404
-
-        for mechanic in mechanics_to_add:
-            if mechanic not in ticket.mechanics:
-                ticket.mechanics.append(mechanic)
-
-    if remove_ids:
-        mechanics_to_remove = db.session.scalars(
-            db.select(Mechanic).where(Mechanic.id.in_(remove_ids))
-        ).all()
-        found_ids = {mechanic.id for mechanic in mechanics_to_remove}
-        missing_ids = sorted(set(remove_ids) - found_ids)
-        if missing_ids:
-            return jsonify({"error": "Mechanic(s) not found.", "missing_ids": missing_ids}), 404
-
-        for mechanic in mechanics_to_remove:
-            if mechanic in ticket.mechanics:
-                ticket.mechanics.remove(mechanic)
+    add_ids = _id_list(payload, "add_ids")
+    remove_ids = _id_list(payload, "remove_ids")
+    if add_ids is None or remove_ids is None:
+        return jsonify({"error": "add_ids and remove_ids must be lists of integers."}), 400
+
+    error = _edit_mechanics([ticket_id], add_ids, remove_ids)
+    if error:
+        db.session.rollback()
+        return error
 
     db.session.commit()
     return service_ticket_schema.jsonify(ticket), 200
 
 
+@service_ticket_bp.route("/bulk-edit", methods=["PUT"])
+def bulk_edit_ticket_mechanics():
+    payload = request.get_json(silent=True) or {}
+    ticket_ids = _id_list(payload, "ticket_ids")
+    add_ids = _id_list(payload, "add_ids")
+    remove_ids = _id_list(payload, "remove_ids")
+    if ticket_ids is None or add_ids is None or remove_ids is None:
+        return jsonify({"error": "ticket_ids, add_ids and remove_ids must be lists of integers."}), 400
+
+    ticket_ids = sorted(set(ticket_ids))
+    max_tickets = current_app.config["BULK_EDIT_MAX_TICKETS"]
+    if not ticket_ids or len(ticket_ids) > max_tickets:
+        return jsonify({"error": f"ticket_ids must contain between 1 and {max_tickets} ids."}), 400
+
+    found_ids = set(db.session.scalars(
+        db.select(ServiceTicket.id).where(ServiceTicket.id.in_(ticket_ids))
+    ))
+    missing_ids = sorted(set(ticket_ids) - found_ids)
+    if missing_ids:
+        return jsonify({"error": "Service ticket(s) not found.", "missing_ids": missing_ids}), 404
+
+    error = _edit_mechanics(ticket_ids, add_ids, remove_ids)
+    if error:
+        db.session.rollback()
+        return error
+
+    db.session.commit()
+    tickets = db.session.scalars(
+        db.select(ServiceTicket)
+        .where(ServiceTicket.id.in_(ticket_ids))
+        .options(
+            db.selectinload(ServiceTicket.mechanics),
+            db.selectinload(ServiceTicket.inventory_items),
+        )
+        .order_by(ServiceTicket.id)
+    ).all()
+    return service_tickets_schema.jsonify(tickets), 200
+
+
+def _set_part_quantity(ticket, inventory_item, quantity):
+    """Set how many of a part a ticket uses; 0 removes it, None keeps it or adds one.
+
+    The link is written directly and ``parts_total`` moves by the change in
+    quantity times the price, so nothing is summed again.
+    """
+    link = service_ticket_inventory.c
+    where = (link.service_ticket_id == ticket.id, link.inventory_id == inventory_item.id)
+    current = db.session.scalar(db.select(link.quantity).where(*where)) or 0
+    if quantity is None:
+        quantity = current or 1
+    if quantity == current:
+        return
+
+    if not current:
+        db.session.execute(service_ticket_inventory.insert().values(
+            service_ticket_id=ticket.id, inventory_id=inventory_item.id, quantity=quantity
+        ))
+    elif not quantity:
+        db.session.execute(service_ticket_inventory.delete().where(*where))
+    else:
+        db.session.execute(service_ticket_inventory.update().where(*where).values(quantity=quantity))
+    # Also bumps the ticket's updated_at, and so its ETag.
+    adjust_parts_total(db.session, ticket.id, (quantity - current) * inventory_item.price)
+
+
+def _ticket_and_part(ticket_id, inventory_id):
+    return db.session.get(ServiceTicket, ticket_id), db.session.get(Inventory, inventory_id)
+
+
 @service_ticket_bp.route("/<int:ticket_id>/add-part/<int:inventory_id>", methods=["PUT"])
 def add_part_to_ticket(ticket_id, inventory_id):
-    ticket = db.session.get(ServiceTicket, ticket_id)
-    inventory_item = db.session.get(Inventory, inventory_id)
-
+    ticket, inventory_item = _ticket_and_part(ticket_id, inventory_id)
     if not ticket or not inventory_item:
         return jsonify({"error": "Service ticket or inventory item not found."}), 404
 
-    if inventory_item not in ticket.inventory_items:
-        ticket.inventory_items.append(inventory_item)
-        db.session.commit()
+    payload = request.get_json(silent=True) or {}
+    quantity = payload.get("quantity")
+    if quantity is not None and (type(quantity) is not int or quantity < 1):
+        return jsonify({"error": "quantity must be a positive integer."}), 400
 
+    _set_part_quantity(ticket, inventory_item, quantity)
+    db.session.commit()
+    return service_ticket_schema.jsonify(ticket), 200
+
+
+@service_ticket_bp.route("/<int:ticket_id>/remove-part/<int:inventory_id>", methods=["PUT"])
+def remove_part_from_ticket(ticket_id, inventory_id):
+    ticket, inventory_item = _ticket_and_part(ticket_id, inventory_id)
+    if not ticket or not inventory_item:
+        return jsonify({"error": "Service ticket or inventory item not found."}), 404
+
+    _set_part_quantity(ticket, inventory_item, 0)
+    db.session.commit()
     return service_ticket_schema.jsonify(ticket), 200
@@ -1,9 +1,11 @@
-from marshmallow import fields
+from marshmallow import ValidationError, fields, pre_load
 
 from application.blueprints.inventory.schemas import InventorySchema
 from application.blueprints.mechanic.schemas import MechanicSchema
 from application.extensions import ma
 from application.models import ServiceTicket
+from application.serializers import CompiledSchema
+from application.vin import normalize_vin
 
 
 class ServiceTicketSchema(ma.SQLAlchemyAutoSchema):
@@ -14,7 +16,19 @@ class ServiceTicketSchema(ma.SQLAlchemyAutoSchema):
         model = ServiceTicket
         load_instance = False
         include_fk = True
+        exclude = ("updated_at",)
+        dump_only = ("parts_total",)
+
+    @pre_load
+    def normalize_vin(self, data, **kwargs):
+        if isinstance(data, dict) and data.get("vin") is not None:
+            try:
+                data = {**data, "vin": normalize_vin(data["vin"])}
+            except ValueError as e:
+                raise ValidationError(str(e), "vin")
+        return data
 
 
 service_ticket_schema = ServiceTicketSchema()
 service_tickets_schema = ServiceTicketSchema(many=True)
+compiled_service_ticket_schema = CompiledSchema(ServiceTicketSchema)
@@ -0,0 +1,254 @@
+"""Bulk create endpoints.
+
+The request body is a JSON array that is decoded one entry at a time from
+the request stream, so a large import is never held in memory as a single
+document. Entries are validated with the resource's schema and inserted in
+executemany chunks; every chunk runs in the same transaction, which is
+committed once at the end. Each entry gets its own result.
+"""
+import codecs
+import json
+from collections import defaultdict, deque
+from itertools import islice
+
+from flask import current_app, jsonify, request
+from marshmallow import ValidationError
+from sqlalchemy import inspect
+
+from application.extensions import db
+from application.search import index_new_rows
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = tuple(_WHITESPACE + ",]")
+_READ_SIZE = 64 * 1024
+
+
+class BulkPayloadError(ValueError):
+    pass
+
+
+class BulkPayloadTooLarge(BulkPayloadError):
+    pass
+
+
+def _read_text(stream, max_bytes):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    total = 0
+    try:
+        while True:
+            chunk = stream.read(_READ_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > max_bytes:
+                raise BulkPayloadTooLarge()
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise BulkPayloadError("Request body must be UTF-8 encoded.")
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a top-level JSON array from an iterable of text chunks.
+
+    Only the unparsed tail of the input is buffered; each element is decoded
+    as soon as it is complete. Raises BulkPayloadError on malformed input.
+    """
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    exhausted = False
+
+    def more():
+        nonlocal buffer, pos, exhausted
+        for chunk in chunks:
+            if chunk:
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                return True
+        exhausted = True
+        return False
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or not more():
+                return
+
+    def next_char():
+        nonlocal pos
+        skip_whitespace()
+        char = buffer[pos:pos + 1]
+        pos += len(char)
+        return char
+
+    if next_char() != "[":
+        raise BulkPayloadError("Request body must be a JSON array.")
+    skip_whitespace()
+    if buffer[pos:pos + 1] == "]":
+        pos += 1
+    else:
+        while True:
+            skip_whitespace()
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if more():
+                        continue
+                    raise BulkPayloadError("Request body is not valid JSON.")
+                # A number cut at a chunk boundary ("12" of "125", "1.5" of
+                # "1.5e3") decodes cleanly, so only accept one once it is
+                # followed by a delimiter.
+                if (
+                    isinstance(value, (int, float))
+                    and buffer[end:end + 1] not in _DELIMITERS
+                    and not exhausted
+                    and more()
+                ):
+                    continue
+                break
+            pos = end
+            yield value
+
+            char = next_char()
+            if char == "]":
+                break
+            if char != ",":
+                raise BulkPayloadError("Request body is not valid JSON.")
+
+    if next_char():
+        raise BulkPayloadError("Unexpected data after the JSON array.")
+
+
+def unique_conflicts(entries, column):
+    """Entries whose ``column`` value already exists, or repeats an earlier entry."""
+    key = column.key
+    values = {data[key] for _, data in entries if data.get(key) is not None}
+    taken = set(db.session.scalars(db.select(column).where(column.in_(values)))) if values else set()
+
+    conflicts = {}
+    for index, data in entries:
+        value = data.get(key)
+        if value in taken:
+            conflicts[index] = (409, {key: [f"{key} already exists."]})
+        elif value is not None:
+            taken.add(value)
+    return conflicts
+
+
+def missing_references(entries, key, column, message):
+    """Entries whose ``key`` does not match a row in ``column``."""
+    values = {data[key] for _, data in entries if data.get(key) is not None}
+    found = set(db.session.scalars(db.select(column).where(column.in_(values)))) if values else set()
+    return {
+        index: (404, {key: [message]})
+        for index, data in entries
+        if data.get(key) not in found
+    }
+
+
+def _insert(model, rows):
+    """Insert ``rows`` with executemany and return their primary keys in order."""
+    mapper = inspect(model)
+    pk = mapper.primary_key[0]
+    if db.engine.dialect.insert_executemany_returning:
+        # Asking for RETURNING in parameter order makes SQLite fall back to
+        # one INSERT per row (it has no implicit sentinel), so return the
+        # inserted values too and match each row to its parameters. Entries
+        # with identical values are interchangeable.
+        keys = sorted({key for row in rows for key in row})
+        pending = defaultdict(deque)
+        for position, row in enumerate(rows):
+            pending[tuple(row.get(key) for key in keys)].append(position)
+
+        ids = [None] * len(rows)
+        statement = db.insert(model).returning(pk, *(mapper.columns[key] for key in keys))
+        for returned in db.session.execute(statement, rows):
+            ids[pending[tuple(returned[1:])].popleft()] = returned[0]
+        # The unit of work, which would fire the search index's mapper events, was bypassed.
+        index_new_rows(model, [dict(row, id=new_id) for row, new_id in zip(rows, ids)])
+        return ids
+
+    # Backends without INSERT .. RETURNING (MySQL): let the unit of work
+    # batch the inserts and read back the generated keys.
+    objects = [model(**row) for row in rows]
+    db.session.add_all(objects)
+    db.session.flush()
+    return [getattr(obj, pk.key) for obj in objects]
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def bulk_create(model, schema, prepare=None):
+    """Create one ``model`` row per entry of the JSON array in the request body.
+
+    ``prepare(entries)`` receives the ``(index, data)`` pairs that passed
+    schema validation, may modify ``data`` in place, and returns
+    ``{index: (status, errors)}`` for entries that must be skipped.
+    """
+    config = current_app.config
+    max_bytes = config["BULK_MAX_BYTES"]
+    max_items = config["BULK_MAX_ITEMS"]
+    if request.content_length is not None and request.content_length > max_bytes:
+        return _too_large(max_bytes, max_items)
+
+    pk = inspect(model).primary_key[0].key
+    results = []
+    created = 0
+    try:
+        entries = enumerate(iter_json_array(_read_text(request.stream, max_bytes)))
+        for chunk in _batched(entries, config["BULK_CHUNK_SIZE"]):
+            if chunk[-1][0] >= max_items:
+                raise BulkPayloadTooLarge()
+
+            chunk_results = {}
+            valid = []
+            for index, item in chunk:
+                try:
+                    data = schema.load(item)
+                except ValidationError as e:
+                    chunk_results[index] = {"index": index, "status": 400, "errors": e.messages}
+                    continue
+                # Keys are always assigned by the database.
+                data.pop(pk, None)
+                valid.append((index, data))
+
+            if valid and prepare is not None:
+                for index, (status, errors) in prepare(valid).items():
+                    chunk_results[index] = {"index": index, "status": status, "errors": errors}
+                valid = [(index, data) for index, data in valid if index not in chunk_results]
+
+            if valid:
+                ids = _insert(model, [data for _, data in valid])
+                for (index, _), new_id in zip(valid, ids):
+                    chunk_results[index] = {"index": index, "status": 201, "id": new_id}
+                created += len(valid)
+
+            results.extend(chunk_results[index] for index, _ in chunk)
+    except BulkPayloadTooLarge:
+        db.session.rollback()
+        return _too_large(max_bytes, max_items)
+    except BulkPayloadError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        db.session.rollback()
+        raise
+
+    db.session.commit()
+    failed = len(results) - created
+    return jsonify({"created": created, "failed": failed, "results": results}), 207 if failed else 201
+
+
+def _too_large(max_bytes, max_items):
+    return jsonify({
+        "error": f"Bulk requests are limited to {max_bytes} bytes and {max_items} entries."
+    }), 413
@@ -0,0 +1,204 @@
+import hashlib
+import time
+import uuid
+from functools import cache as memoize
+from urllib.parse import urlencode
+
+from flask import current_app, g, has_app_context, request
+from flask_caching.backends import SimpleCache
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from application.extensions import cache, db
+from application.replicas import used_replica
+
+GENERATION_KEY = "generation/%s"
+
+
+# Every table gets a generation token that changes whenever a commit touches
+# it. Cached views fold the generations of the tables they read into their
+# cache key, so a write makes the old entries unreachable instead of
+# requiring them to be found and deleted.
+def _new_generation():
+    # The timestamp prefix records when the table was last written.
+    return f"{time.time():.3f}:{uuid.uuid4().hex}"
+
+
+def written_within(generations, seconds):
+    cutoff = time.time() - seconds
+    for value in generations.values():
+        written_at, _, _ = str(value).partition(":")
+        try:
+            if float(written_at) > cutoff:
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def get_generations(tables):
+    keys = [GENERATION_KEY % table for table in tables]
+    values = cache.get_many(*keys)
+
+    generations = {}
+    for table, key, value in zip(tables, keys, values):
+        if value is None:
+            # Never treat a missing generation as a fixed value: an evicted
+            # counter would otherwise make stale entries reachable again.
+            cache.add(key, _new_generation(), timeout=0)
+            value = cache.get(key)
+        generations[table] = value
+    return generations
+
+
+def bump_generations(tables):
+    for table in tables:
+        cache.set(GENERATION_KEY % table, _new_generation(), timeout=0)
+
+
+def request_cache_key():
+    """Key for this request's path and query string, whatever the generations."""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+
+
+def versioned_cache_key(tables):
+    generations = get_generations(tables)
+    g.cache_generations = generations
+    query = urlencode(sorted(request.args.items(multi=True)))
+    versions = ",".join(f"{table}={generations[table]}" for table in tables)
+    # Set by application.conditional from the rows' updated_at; it changes
+    # even when a write bypassed the generation bump.
+    raw = f"{request.path}?{query}|{versions}|{g.get('etag', '')}"
+    g.cache_key = "view/" + hashlib.md5(raw.encode()).hexdigest()
+    return g.cache_key
+
+
+def _is_success(rv):
+    status = rv[1] if isinstance(rv, tuple) and len(rv) > 1 else getattr(rv, "status_code", 200)
+    return status == 200
+
+
+def should_cache(rv):
+    """Whether a view's return value may be stored under this request's key."""
+    if not _is_success(rv):
+        return False
+    # A replica may not have applied a write that just bumped a generation;
+    # caching its answer would keep serving the stale data until the next
+    # write, so skip caching until the write is older than the allowed lag.
+    max_lag = current_app.config.get("REPLICA_MAX_LAG", 0)
+    if max_lag and used_replica(db.session):
+        return not written_within(g.get("cache_generations", {}), max_lag)
+    return True
+
+
+def view_timeout(timeout):
+    """How long a versioned view entry may live with this app's cache backend.
+
+    A per-process cache also keeps per-process generations, so a write
+    through one worker leaves the other workers' entries reachable until
+    they expire; there the TTL is capped at ``CACHE_LOCAL_VIEW_TIMEOUT``.
+    """
+    if isinstance(cache.cache, SimpleCache):
+        return min(timeout, current_app.config.get("CACHE_LOCAL_VIEW_TIMEOUT", 30))
+    return timeout
+
+
+def _store_filter(rv):
+    # The single-flight layer stores the value itself, or returned a value
+    # that is already cached or stale; either way there is nothing to store.
+    if g.get("cache_handled") or not should_cache(rv):
+        return False
+    # Flask-Caching's timeout is fixed when the view is decorated, but this
+    # one depends on the app's backend, so the entry is stored here.
+    try:
+        cache.set(g.cache_key, rv, timeout=g.cache_timeout)
+    except Exception:
+        current_app.logger.exception("Exception possibly due to cache backend.")
+    return False
+
+
+def versioned_cached(*tables, timeout=3600):
+    """Cache a GET view until any of ``tables`` is written to.
+
+    Entries can live for a long time on a shared backend because a commit
+    touching one of the tables changes the cache key rather than relying on
+    the TTL; see ``view_timeout`` for per-process caches.
+    """
+    def make_cache_key(*args, **kwargs):
+        g.cache_timeout = view_timeout(timeout)
+        return versioned_cache_key(tables)
+
+    def decorator(view_func):
+        cached_view = cache.cached(
+            timeout=timeout,
+            make_cache_key=make_cache_key,
+            response_filter=_store_filter,
+        )(view_func)
+        cached_view.cache_tables = tables
+        return cached_view
+
+    return decorator
+
+
+@memoize
+def cascaded_tables(table):
+    """Tables the database deletes rows from, by ON DELETE CASCADE, along with ``table``'s."""
+    found = set()
+    pending = [table]
+    while pending:
+        parent = pending.pop()
+        for child in db.metadata.tables.values():
+            if child.name in found:
+                continue
+            if any(
+                fk.column.table.name == parent and (fk.ondelete or "").upper() == "CASCADE"
+                for fk in child.foreign_keys
+            ):
+                found.add(child.name)
+                pending.append(child.name)
+    return frozenset(found)
+
+
+def _mark_tables(session, tables):
+    session.info.setdefault("dirty_tables", set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_tables(session, flush_context):
+    tables = set()
+    for obj in session.new | session.dirty | session.deleted:
+        state = inspect(obj)
+        tables.add(state.mapper.local_table.name)
+        if obj in session.deleted:
+            tables.update(cascaded_tables(state.mapper.local_table.name))
+        for relationship in state.mapper.relationships:
+            if relationship.secondary is None:
+                continue
+            if state.attrs[relationship.key].history.has_changes():
+                tables.add(relationship.secondary.name)
+    _mark_tables(session, tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_executed_dml(orm_execute_state):
+    # Core-style insert()/update()/delete() statements bypass the flush.
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and getattr(table, "name", None):
+            tables = {table.name}
+            if orm_execute_state.is_delete:
+                tables.update(cascaded_tables(table.name))
+            _mark_tables(orm_execute_state.session, tables)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    tables = session.info.pop("dirty_tables", None)
+    if tables and has_app_context():
+        bump_generations(sorted(tables))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session):
+    session.info.pop("dirty_tables", None)
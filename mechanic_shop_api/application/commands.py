@@ -0,0 +1,120 @@
+import sqlite3
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.engine import make_url
+
+from application.counters import rebuild_mechanic_ticket_counts, rebuild_parts_totals
+from application.extensions import cache, db
+from application.models import ServiceTicket
+from application.schema import SchemaUpgradeError, upgrade_schema
+from application.search import rebuild_search_index
+
+
+@click.command("rebuild-ticket-counts")
+@with_appcontext
+def rebuild_ticket_counts_command():
+    """Recompute Mechanic.ticket_count from service_ticket_mechanic."""
+    mismatched = rebuild_mechanic_ticket_counts()
+    click.echo(f"Rebuilt mechanic ticket counts ({mismatched} were out of date).")
+
+
+@click.command("rebuild-parts-totals")
+@with_appcontext
+def rebuild_parts_totals_command():
+    """Recompute ServiceTicket.parts_total from part quantities and current prices."""
+    mismatched = rebuild_parts_totals()
+    click.echo(f"Rebuilt ticket parts totals ({mismatched} were out of date).")
+
+
+@click.command("normalize-vins")
+@with_appcontext
+def normalize_vins_command():
+    """Uppercase and trim VINs stored before they were normalized on write."""
+    normalized = db.func.upper(db.func.trim(ServiceTicket.vin))
+    result = db.session.execute(
+        db.update(ServiceTicket)
+        .where(ServiceTicket.vin != normalized)
+        .values(vin=normalized)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    click.echo(f"Normalized {result.rowcount} VINs.")
+
+
+@click.command("rebuild-search-index")
+@click.option("--batch-size", type=click.IntRange(min=1), help="Rows per transaction (default: SEARCH_REINDEX_BATCH_SIZE).")
+@with_appcontext
+def rebuild_search_index_command(batch_size):
+    """Reindex every ticket description and inventory name for /search."""
+    indexed = rebuild_search_index(batch_size or current_app.config["SEARCH_REINDEX_BATCH_SIZE"])
+    for kind, count in indexed.items():
+        click.echo(f"Indexed {count} {kind} rows.")
+
+
+@click.command("upgrade-db")
+@with_appcontext
+def upgrade_db_command():
+    """Bring a database created by an older version up to the models, then rebuild derived data."""
+    try:
+        changes = upgrade_schema()
+    except SchemaUpgradeError as e:
+        raise click.ClickException(str(e))
+    for change in changes:
+        click.echo(change)
+    if not changes:
+        click.echo("Schema is up to date.")
+
+    # Columns added by the upgrade start at their defaults, and the search
+    # index may have been created empty at startup.
+    mismatched = rebuild_mechanic_ticket_counts()
+    click.echo(f"Rebuilt mechanic ticket counts ({mismatched} were out of date).")
+    mismatched = rebuild_parts_totals()
+    click.echo(f"Rebuilt ticket parts totals ({mismatched} were out of date).")
+    indexed = rebuild_search_index(current_app.config["SEARCH_REINDEX_BATCH_SIZE"])
+    for kind, count in indexed.items():
+        click.echo(f"Indexed {count} {kind} rows.")
+    cache.clear()
+
+
+@click.command("sync-replicas")
+@with_appcontext
+def sync_replicas_command():
+    """Copy the SQLite primary over every SQLite replica, for local testing."""
+    primary = make_url(current_app.config["SQLALCHEMY_DATABASE_URI"])
+    if primary.get_backend_name() != "sqlite":
+        raise click.ClickException("sync-replicas only copies SQLite databases.")
+
+    # The online backup API gives a consistent copy even while the app writes.
+    with db.engine.connect() as connection:
+        source = connection.connection.dbapi_connection
+        for url in current_app.config.get("SQLALCHEMY_REPLICAS") or ():
+            replica = make_url(url)
+            if replica.get_backend_name() != "sqlite":
+                click.echo(f"Skipping {replica.render_as_string()}: not SQLite.")
+                continue
+            target = sqlite3.connect(replica.database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            click.echo(f"Copied primary to {replica.database}.")
+
+
+@click.command("clear-cache")
+@with_appcontext
+def clear_cache_command():
+    """Empty the response cache, e.g. after restoring the database from a backup."""
+    cache.clear()
+    click.echo("Cleared the response cache.")
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_ticket_counts_command)
+    app.cli.add_command(rebuild_parts_totals_command)
+    app.cli.add_command(normalize_vins_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(sync_replicas_command)
+    app.cli.add_command(clear_cache_command)
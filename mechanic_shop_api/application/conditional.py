@@ -0,0 +1,121 @@
+"""Conditional GET: ETag and Last-Modified validators from ``updated_at``.
+
+A view decorated with ``conditional`` first runs a version query, which is
+one indexed read. For a single row it reads that row's ``updated_at``. For
+a list it reads ``max(updated_at)`` and the row count (from
+``application.counts``) of each table the response is built from. The
+count is there so that deleting a row changes the version even though
+max(updated_at) does not.
+
+If the client's ``If-None-Match`` or ``If-Modified-Since`` still matches,
+the view answers 304 without loading or serializing any row. Otherwise it
+runs as usual and its 200 response carries the validators. The ETag also
+covers the path and query string, so every page and field set has its own.
+
+``versioned_cached`` folds the same ETag into its cache key, so cached
+bodies and 304s always agree, even after writes made outside the app.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, g, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from application.counts import count_rows
+from application.extensions import db
+from application.models import utcnow
+
+
+def table_version(*models):
+    """Version of list responses built from ``models``: max(updated_at) and count of each."""
+    def version(**kwargs):
+        parts, last_modified = [], None
+        for model in models:
+            latest = db.session.scalar(db.select(db.func.max(model.updated_at)))
+            total = count_rows(db.select(model.id), model.__tablename__)
+            parts.append(f"{model.__tablename__}:{latest}:{total}")
+            if latest is not None and (last_modified is None or latest > last_modified):
+                last_modified = latest
+        return parts, last_modified
+
+    return version
+
+
+def row_version(model, id_arg):
+    """Version of one ``model`` row, whose id is the view argument ``id_arg``."""
+    def version(**kwargs):
+        row_id = kwargs[id_arg]
+        latest = db.session.scalar(db.select(model.updated_at).where(model.id == row_id))
+        if latest is None:
+            return None
+        return [f"{model.__tablename__}:{row_id}:{latest}"], latest
+
+    return version
+
+
+def _etag(parts):
+    query = urlencode(sorted(request.args.items(multi=True)))
+    raw = f"{request.path}?{query}|{'|'.join(parts)}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since (RFC 9110, 13.2.2).
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(microsecond=0)
+    return response
+
+
+def conditional(version):
+    """Answer conditional GETs from ``version`` before running the view.
+
+    ``version(**view_kwargs)`` returns ``(parts, last_modified)``, or None
+    when the resource does not exist, in which case the view runs and
+    reports the 404 itself.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(*args, **kwargs):
+            current = version(**kwargs)
+            if current is None:
+                return view_func(*args, **kwargs)
+
+            parts, last_modified = current
+            etag = g.etag = _etag(parts)
+            if _not_modified(etag, last_modified):
+                return _with_validators(current_app.response_class(status=304), etag, last_modified)
+
+            response = current_app.make_response(view_func(*args, **kwargs))
+            if response.status_code == 200 and not g.get("served_stale"):
+                _with_validators(response, etag, last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+@event.listens_for(Session, "before_flush")
+def _touch_changed_collections(session, flush_context, instances):
+    # Adding or removing a many-to-many link only writes the association
+    # table, so bump updated_at on the owning rows by hand.
+    now = utcnow()
+    for obj in session.dirty:
+        state = inspect(obj)
+        if "updated_at" not in state.mapper.columns:
+            continue
+        for relationship in state.mapper.relationships:
+            if relationship.secondary is not None and state.attrs[relationship.key].history.has_changes():
+                obj.updated_at = now
+                break
@@ -0,0 +1,211 @@
+from collections import Counter
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from application.extensions import db
+from application.models import (
+    Customer,
+    Inventory,
+    Mechanic,
+    ServiceTicket,
+    service_ticket_inventory,
+    service_ticket_mechanic,
+)
+
+
+def adjust_mechanic_ticket_counts(session, deltas):
+    """Apply ``{mechanic_id: delta}`` to ``Mechanic.ticket_count``.
+
+    Mechanics sharing the same delta are updated with one statement.
+    """
+    by_delta = {}
+    for mechanic_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(mechanic_id)
+
+    for delta, mechanic_ids in by_delta.items():
+        session.execute(
+            db.update(Mechanic)
+            .where(Mechanic.id.in_(mechanic_ids))
+            .values(ticket_count=Mechanic.ticket_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def release_mechanic_ticket_counts(session, tickets_clause):
+    """Decrement ``ticket_count`` for the links of the tickets matching ``tickets_clause``.
+
+    Call it before the database deletes those tickets by cascade, which
+    removes their service_ticket_mechanic rows without the ORM seeing them.
+    One statement, however many tickets and mechanics are involved.
+    """
+    links = (
+        service_ticket_mechanic.join(ServiceTicket, ServiceTicket.id == service_ticket_mechanic.c.service_ticket_id)
+    )
+    removed = (
+        db.select(db.func.count())
+        .select_from(links)
+        .where(service_ticket_mechanic.c.mechanic_id == Mechanic.id, tickets_clause)
+        .scalar_subquery()
+    )
+    session.execute(
+        db.update(Mechanic)
+        .where(Mechanic.id.in_(
+            db.select(service_ticket_mechanic.c.mechanic_id).select_from(links).where(tickets_clause)
+        ))
+        .values(ticket_count=Mechanic.ticket_count - removed)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _count_ticket_mechanic_changes(session, flush_context, instances):
+    # Collection changes made through the ORM; set-based writes to
+    # service_ticket_mechanic call adjust_mechanic_ticket_counts themselves.
+    deltas = Counter()
+    with session.no_autoflush:
+        for obj in session.new | session.dirty:
+            if isinstance(obj, ServiceTicket):
+                history = inspect(obj).attrs.mechanics.history
+                for mechanic in history.added:
+                    deltas[mechanic.id] += 1
+                for mechanic in history.deleted:
+                    deltas[mechanic.id] -= 1
+        for obj in session.deleted:
+            if isinstance(obj, ServiceTicket):
+                history = inspect(obj).attrs.mechanics.load_history()
+                for mechanic in list(history.unchanged) + list(history.deleted):
+                    deltas[mechanic.id] -= 1
+
+    deltas.pop(None, None)
+    if deltas:
+        adjust_mechanic_ticket_counts(session, deltas)
+
+    # Tickets of a deleted customer that the ORM is not deleting itself
+    # (Customer.service_tickets has passive_deletes) go by cascade.
+    customer_ids = [obj.id for obj in session.deleted if isinstance(obj, Customer)]
+    if customer_ids:
+        clause = ServiceTicket.customer_id.in_(customer_ids)
+        ticket_ids = [obj.id for obj in session.deleted if isinstance(obj, ServiceTicket)]
+        if ticket_ids:
+            clause = clause & ServiceTicket.id.not_in(ticket_ids)
+        release_mechanic_ticket_counts(session, clause)
+
+
+def rebuild_mechanic_ticket_counts():
+    """Recompute every ``ticket_count`` from the association table.
+
+    Returns the number of mechanics whose stored count was wrong.
+    """
+    actual = (
+        db.select(db.func.count())
+        .where(service_ticket_mechanic.c.mechanic_id == Mechanic.id)
+        .scalar_subquery()
+    )
+    mismatched = db.session.scalar(
+        db.select(db.func.count()).select_from(Mechanic).where(Mechanic.ticket_count != actual)
+    )
+    db.session.execute(
+        db.update(Mechanic)
+        .values(ticket_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return mismatched
+
+
+def _actual_parts_total():
+    # Correlated to the service_tickets row being updated.
+    link = service_ticket_inventory.c
+    return db.func.coalesce(
+        db.select(db.func.sum(link.quantity * Inventory.price))
+        .select_from(service_ticket_inventory.join(Inventory, Inventory.id == link.inventory_id))
+        .where(link.service_ticket_id == ServiceTicket.id)
+        .scalar_subquery(),
+        0,
+    )
+
+
+def adjust_parts_total(session, ticket_id, delta):
+    """Add ``delta`` to one ticket's ``parts_total``."""
+    session.execute(
+        db.update(ServiceTicket)
+        .where(ServiceTicket.id == ticket_id)
+        .values(parts_total=ServiceTicket.parts_total + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_parts_totals(session, tickets_clause):
+    """Recompute ``parts_total`` of the tickets matching ``tickets_clause``, in one UPDATE."""
+    session.execute(
+        db.update(ServiceTicket)
+        .where(tickets_clause)
+        .values(parts_total=_actual_parts_total())
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_parts_changes(session, flush_context, instances):
+    # Parts added or removed through ServiceTicket.inventory_items, prices
+    # changed and parts deleted through the ORM. The totals are recomputed
+    # after the flush, once the links and prices are written; the routes
+    # that write service_ticket_inventory directly adjust them themselves.
+    tickets = session.info.setdefault("parts_tickets", set())
+    repriced = session.info.setdefault("parts_repriced", set())
+    with session.no_autoflush:
+        for obj in session.new | session.dirty:
+            if isinstance(obj, ServiceTicket) and inspect(obj).attrs.inventory_items.history.has_changes():
+                tickets.add(obj)
+            elif isinstance(obj, Inventory) and obj.id is not None and inspect(obj).attrs.price.history.has_changes():
+                repriced.add(obj.id)
+        deleted_parts = [obj.id for obj in session.deleted if isinstance(obj, Inventory)]
+        if deleted_parts:
+            # Their links are about to go, so find the tickets now.
+            session.info.setdefault("parts_ticket_ids", set()).update(session.scalars(
+                db.select(service_ticket_inventory.c.service_ticket_id)
+                .where(service_ticket_inventory.c.inventory_id.in_(deleted_parts))
+            ))
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_changed_parts_totals(session, flush_context):
+    tickets = session.info.pop("parts_tickets", set())
+    repriced = session.info.pop("parts_repriced", set())
+    ticket_ids = session.info.pop("parts_ticket_ids", set())
+    ticket_ids.update(ticket.id for ticket in tickets if ticket not in session.deleted)
+    clauses = []
+    if ticket_ids:
+        clauses.append(ServiceTicket.id.in_(ticket_ids))
+    if repriced:
+        # Every ticket holding a repriced part, with one statement.
+        clauses.append(ServiceTicket.id.in_(
+            db.select(service_ticket_inventory.c.service_ticket_id)
+            .where(service_ticket_inventory.c.inventory_id.in_(repriced))
+        ))
+    if clauses:
+        refresh_parts_totals(session, db.or_(*clauses))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_parts_changes(session):
+    for key in ("parts_tickets", "parts_ticket_ids", "parts_repriced"):
+        session.info.pop(key, None)
+
+
+def rebuild_parts_totals():
+    """Recompute every ``parts_total`` from service_ticket_inventory and prices.
+
+    Returns the number of tickets whose stored total was off by a cent or more.
+    """
+    actual = _actual_parts_total()
+    mismatched = db.session.scalar(
+        db.select(db.func.count())
+        .select_from(ServiceTicket)
+        .where(db.func.abs(ServiceTicket.parts_total - actual) >= 0.005)
+    )
+    refresh_parts_totals(db.session, db.true())
+    db.session.commit()
+    return mismatched
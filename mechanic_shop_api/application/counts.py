@@ -0,0 +1,158 @@
+"""Row counts for paginated listings without a COUNT(*) per request.
+
+A table's unfiltered total is cached under ``count/<table>``. It is
+adjusted after each commit by the number of ORM inserts minus deletes,
+so a new row costs an increment and not a recount. The increment must
+not recreate a total that expired, so it needs a backend that checks and
+increments in one operation (``SharedCache.inc_existing``); with any
+other backend the total is dropped and counted again. Core insert or
+delete statements, such as the bulk endpoints, do not report how many
+rows they touched, so they drop the cached total instead, as does any
+delete that the database cascades to other tables.
+
+Filtered totals are cached under the filter's SQL and the table's cache
+generation, so any write to the table makes them unreachable.
+
+Every cached total also expires after ``COUNT_CACHE_TIMEOUT`` seconds,
+which bounds the drift from writes made outside the app.
+
+Clients choose the mode with ``?count=``:
+
+* ``cached`` (default): the cached total, counted once on a miss.
+* ``exact``: always run COUNT(*), and refresh the cache with the result.
+* ``estimate``: the cached total if there is one. Otherwise, for an
+  unfiltered list, the database's own estimate, which reads no rows.
+* ``none``: no total at all; responses still say whether a next page exists.
+"""
+import hashlib
+from collections import Counter
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from application.caching import cascaded_tables, get_generations, written_within
+from application.extensions import cache, db
+from application.replicas import used_replica
+
+COUNT_MODES = ("cached", "exact", "estimate", "none")
+COUNT_KEY = "count/%s"
+
+
+def _count_key(statement, table):
+    if statement.whereclause is None:
+        return COUNT_KEY % table
+    compiled = statement.compile(dialect=db.session.get_bind().dialect)
+    params = sorted((key, repr(value)) for key, value in compiled.params.items())
+    generation = get_generations([table])[table]
+    raw = f"{compiled}|{params}|{generation}"
+    return COUNT_KEY % f"{table}/{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def _count(statement):
+    return db.session.scalar(db.select(db.func.count()).select_from(statement.subquery()))
+
+
+def _store(key, table, total):
+    # A replica may still be missing rows from a write that just changed
+    # the cached total; do not cache its older count over it.
+    if used_replica(db.session):
+        max_lag = current_app.config.get("REPLICA_MAX_LAG", 0)
+        if written_within(get_generations([table]), max_lag):
+            return
+    cache.set(key, total, timeout=current_app.config.get("COUNT_CACHE_TIMEOUT", 300))
+
+
+def estimate_rows(table):
+    """The database's estimate of a table's row count; reads no rows."""
+    sa_table = db.metadata.tables[table]
+    dialect = db.session.get_bind().dialect.name
+    estimate = None
+    if dialect == "postgresql":
+        estimate = db.session.scalar(
+            db.text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": table},
+        )
+    elif dialect in ("mysql", "mariadb"):
+        estimate = db.session.scalar(
+            db.text(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = :name"
+            ),
+            {"name": table},
+        )
+    if estimate is None or estimate < 0:
+        # Ids are mostly dense, so the id range is close; max/min use the
+        # primary key index.
+        pk = sa_table.primary_key.columns.values()[0]
+        low, high = db.session.execute(db.select(db.func.min(pk), db.func.max(pk))).one()
+        estimate = high - low + 1 if high is not None else 0
+    return int(estimate)
+
+
+def count_rows(statement, table, mode="cached"):
+    """Total rows ``statement`` selects from ``table``, or None for ``mode="none"``."""
+    if mode == "none":
+        return None
+    statement = statement.order_by(None)
+    key = _count_key(statement, table)
+
+    if mode != "exact":
+        total = cache.get(key)
+        if total is not None:
+            return total
+        if mode == "estimate" and statement.whereclause is None:
+            return estimate_rows(table)
+
+    total = _count(statement)
+    _store(key, table, total)
+    return total
+
+
+@event.listens_for(Session, "after_flush")
+def _track_row_deltas(session, flush_context):
+    deltas = session.info.setdefault("count_deltas", Counter())
+    for obj in session.new:
+        deltas[inspect(obj).mapper.local_table.name] += 1
+    invalid = set()
+    for obj in session.deleted:
+        table = inspect(obj).mapper.local_table.name
+        deltas[table] -= 1
+        invalid.update(cascaded_tables(table))
+    if invalid:
+        session.info.setdefault("count_invalid", set()).update(invalid)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_executed_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and getattr(table, "name", None):
+            invalid = orm_execute_state.session.info.setdefault("count_invalid", set())
+            invalid.add(table.name)
+            if orm_execute_state.is_delete:
+                invalid.update(cascaded_tables(table.name))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_row_deltas(session):
+    deltas = session.info.pop("count_deltas", None) or Counter()
+    invalid = session.info.pop("count_invalid", None) or set()
+    if not has_app_context():
+        return
+    for table in invalid:
+        cache.delete(COUNT_KEY % table)
+    inc_existing = getattr(cache.cache, "inc_existing", None)
+    for table, delta in deltas.items():
+        if not delta or table in invalid:
+            continue
+        if inc_existing is not None:
+            inc_existing(COUNT_KEY % table, delta)
+        else:
+            cache.delete(COUNT_KEY % table)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_row_deltas(session):
+    session.info.pop("count_deltas", None)
+    session.info.pop("count_invalid", None)
@@ -0,0 +1,89 @@
+"""Engine setup for each database backend.
+
+SQLite gets its pragmas on every new connection. Server databases get
+connection pool sizing through ``SQLALCHEMY_ENGINE_OPTIONS``. Every value
+comes from the ``Config`` class. A SQLite pragma set to ``None`` is left
+at SQLite's default, and explicit ``SQLALCHEMY_ENGINE_OPTIONS`` entries
+take precedence over the generated ones.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from application.extensions import db
+
+# MySQL servers commonly drop idle connections well before the 8 hour
+# wait_timeout default (300s on many hosted plans).
+DEFAULT_POOL_RECYCLE = {
+    "mysql": 280,
+    "mariadb": 280,
+    "postgresql": 1800,
+}
+
+SQLITE_PRAGMAS = (
+    ("journal_mode", "SQLITE_JOURNAL_MODE"),
+    ("synchronous", "SQLITE_SYNCHRONOUS"),
+    ("busy_timeout", "SQLITE_BUSY_TIMEOUT_MS"),
+    ("mmap_size", "SQLITE_MMAP_SIZE"),
+    ("cache_size", "SQLITE_CACHE_SIZE"),
+    ("foreign_keys", "SQLITE_FOREIGN_KEYS"),
+)
+
+
+def engine_options(config, uri):
+    """Pool options for the engine behind ``uri``."""
+    backend = make_url(uri).get_backend_name()
+    if backend == "sqlite":
+        return {}
+
+    pool_recycle = config.get("DATABASE_POOL_RECYCLE")
+    if pool_recycle is None:
+        pool_recycle = DEFAULT_POOL_RECYCLE.get(backend, -1)
+    return {
+        "pool_size": config["DATABASE_POOL_SIZE"],
+        "max_overflow": config["DATABASE_MAX_OVERFLOW"],
+        "pool_timeout": config["DATABASE_POOL_TIMEOUT"],
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": config["DATABASE_POOL_PRE_PING"],
+    }
+
+
+def configure_engine_options(app):
+    """Fill in ``SQLALCHEMY_ENGINE_OPTIONS``; call before ``db.init_app``."""
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI")
+    if not uri:
+        return
+    options = engine_options(app.config, uri)
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def sqlite_pragmas(config):
+    return [
+        (pragma, config[key])
+        for pragma, key in SQLITE_PRAGMAS
+        if config.get(key) is not None
+    ]
+
+
+def listen_sqlite_pragmas(engine, config):
+    """Apply the configured pragmas to each new connection of a SQLite ``engine``."""
+    pragmas = sqlite_pragmas(config)
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas:
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+    event.listen(engine, "connect", set_pragmas)
+
+
+def register_sqlite_pragmas(app):
+    """Set up pragmas on every SQLite engine of ``db``; call after ``db.init_app``."""
+    with app.app_context():
+        for engine in db.engines.values():
+            listen_sqlite_pragmas(engine, app.config)
@@ -0,0 +1,89 @@
+"""Chunked customer deletes, for customers with too many tickets to drop at once.
+
+Deleting a customer normally takes one DELETE. The database cascades it to
+the customer's tickets and their links. That is a handful of statements,
+but for a fleet customer it is also one long transaction holding locks on
+every affected row. ``DELETE /customers/<id>?async=true`` answers 202
+instead and deletes the tickets in a background thread,
+``CUSTOMER_DELETE_CHUNK_SIZE`` at a time, one short transaction per chunk,
+before deleting the customer itself.
+"""
+import logging
+import threading
+
+from flask import current_app
+
+from application.counters import release_mechanic_ticket_counts
+from application.extensions import db
+from application.models import Customer, ServiceTicket
+
+logger = logging.getLogger(__name__)
+
+_running = set()
+_lock = threading.Lock()
+
+
+def delete_customer_in_chunks(customer_id, chunk_size):
+    """Delete a customer's tickets ``chunk_size`` at a time, then the customer.
+
+    Returns the number of tickets deleted. Needs an app context.
+    """
+    deleted = 0
+    while True:
+        ticket_ids = db.session.scalars(
+            db.select(ServiceTicket.id)
+            .where(ServiceTicket.customer_id == customer_id)
+            .order_by(ServiceTicket.id)
+            .limit(chunk_size)
+        ).all()
+        if not ticket_ids:
+            break
+        chunk = ServiceTicket.id.in_(ticket_ids)
+        release_mechanic_ticket_counts(db.session, chunk)
+        # Their service_ticket_mechanic and service_ticket_inventory rows go by cascade.
+        db.session.execute(db.delete(ServiceTicket).where(chunk))
+        db.session.commit()
+        deleted += len(ticket_ids)
+
+    customer = db.session.get(Customer, customer_id)
+    if customer is not None:
+        db.session.delete(customer)
+        db.session.commit()
+    return deleted
+
+
+def start_customer_delete(customer_id):
+    """Run ``delete_customer_in_chunks`` in a background thread.
+
+    Returns False if a delete of this customer is already running.
+    """
+    with _lock:
+        if customer_id in _running:
+            return False
+        _running.add(customer_id)
+
+    app = current_app._get_current_object()
+    chunk_size = app.config["CUSTOMER_DELETE_CHUNK_SIZE"]
+
+    def run():
+        try:
+            with app.app_context():
+                try:
+                    deleted = delete_customer_in_chunks(customer_id, chunk_size)
+                    logger.info("Deleted customer %s and %s tickets.", customer_id, deleted)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Deleting customer %s failed.", customer_id)
+                finally:
+                    db.session.remove()
+        finally:
+            with _lock:
+                _running.discard(customer_id)
+
+    threading.Thread(target=run, name=f"delete-customer-{customer_id}", daemon=True).start()
+    return True
+
+
+def delete_running(customer_id):
+    with _lock:
+        return customer_id in _running
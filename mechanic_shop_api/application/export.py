@@ -0,0 +1,81 @@
+import csv
+import io
+
+from flask import Response, jsonify, request, stream_with_context
+
+from application.extensions import db
+from application.serializers import dumps, selected_schema
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _csv_value(value):
+    # Nested collections are flattened to their ids, e.g. "1;4;7".
+    if isinstance(value, list):
+        return ";".join(str(child["id"]) for child in value)
+    return value
+
+
+def _chunks(compiled_schema, id_column, after_id, max_id):
+    # Each chunk is its own keyset query, so no cursor stays open while the
+    # nested children of a chunk are loaded, and a client that drops the
+    # connection can resume from the last id it received with ?after_id=.
+    while True:
+        statement = compiled_schema.select().where(id_column > after_id)
+        if max_id is not None:
+            statement = statement.where(id_column <= max_id)
+        statement = statement.order_by(id_column).limit(EXPORT_CHUNK_SIZE)
+
+        rows = db.session.execute(statement).all()
+        if not rows:
+            return
+        yield compiled_schema.dump(rows)
+        after_id = rows[-1].id
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+
+
+def export_response(compiled_schema, id_column, filename):
+    """Stream every row of ``compiled_schema`` as NDJSON or CSV.
+
+    ``?after_id=`` and ``?max_id=`` restrict the export to an id range so an
+    interrupted export can be resumed. ``?fields=`` and ``?include=`` select
+    the exported fields as on the list endpoints.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be one of: ndjson, csv."}), 400
+    try:
+        compiled_schema = selected_schema(compiled_schema)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    after_id = request.args.get("after_id", 0, type=int)
+    max_id = request.args.get("max_id", type=int)
+
+    def generate_ndjson():
+        for items in _chunks(compiled_schema, id_column, after_id, max_id):
+            yield b"".join(dumps(item) + b"\n" for item in items)
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(compiled_schema.keys)
+        for items in _chunks(compiled_schema, id_column, after_id, max_id):
+            for item in items:
+                writer.writerow([_csv_value(item[key]) for key in compiled_schema.keys])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    generate = generate_csv if export_format == "csv" else generate_ndjson
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"},
+    )
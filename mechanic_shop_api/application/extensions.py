@@ -4,8 +4,11 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
 
+from application.ratelimit import SQLiteStorage  # noqa: F401 - registers the sqlite:// rate limit storage
+from application.session import RoutingSession
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 ma = Marshmallow()
 limiter = Limiter(key_func=get_remote_address)
 cache = Cache()
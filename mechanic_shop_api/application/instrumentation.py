@@ -0,0 +1,225 @@
+import glob
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import Response, g, has_request_context, request, request_finished, request_started
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.interfaces import ExecuteStyle
+
+from application.auth import token_cache
+from application.extensions import cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_request_duration_seconds": ("histogram", "Request latency by route."),
+    "http_requests_total": ("counter", "Requests served by route and status."),
+    "http_request_sql_statements_total": ("counter", "SQL statements executed by route."),
+    "http_request_db_seconds_total": ("counter", "Time spent in the database by route."),
+    "http_response_bytes_total": ("counter", "Serialized response bytes by route."),
+    "http_request_n_plus_one_total": ("counter", "Requests that repeated one SQL statement too often."),
+    "token_cache_hits_total": ("counter", "Verified token cache hits."),
+    "token_cache_misses_total": ("counter", "Verified token cache misses."),
+    "response_cache_hits_total": ("counter", "Shared response cache hits."),
+    "response_cache_misses_total": ("counter", "Shared response cache misses."),
+    "response_cache_evictions_total": ("counter", "Shared response cache entries evicted for space."),
+}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Instrumentation:
+    """Per-route latency, SQL and response-size metrics.
+
+    Each process keeps its own totals. When ``METRICS_DIR`` is set every
+    process also writes a snapshot there, and ``/metrics`` sums all snapshots
+    so the scrape covers every gunicorn worker instead of whichever one
+    answered it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._histograms = {}
+        self._last_flush = 0.0
+        self.metrics_dir = None
+        self.flush_interval = 1.0
+        self.n_plus_one_threshold = 10
+
+    def init_app(self, app):
+        self.metrics_dir = app.config.get("METRICS_DIR")
+        self.flush_interval = app.config.get("METRICS_FLUSH_INTERVAL", self.flush_interval)
+        self.n_plus_one_threshold = app.config.get("N_PLUS_ONE_THRESHOLD", self.n_plus_one_threshold)
+        if self.metrics_dir:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+        request_started.connect(self._request_started, app)
+        request_finished.connect(self._request_finished, app)
+        app.add_url_rule("/metrics", "metrics", self.metrics_view, methods=["GET"])
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _request_started(self, sender, **extra):
+        g._metrics_start = time.perf_counter()
+        g._sql_count = 0
+        g._sql_time = 0.0
+        g._sql_statements = Counter()
+
+    def _request_finished(self, sender, response, **extra):
+        start = g.get("_metrics_start")
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        labels = (("method", request.method), ("route", route))
+        size = 0 if response.is_streamed else (response.calculate_content_length() or 0)
+
+        statement, repeats = (None, 0)
+        if g._sql_statements:
+            statement, repeats = g._sql_statements.most_common(1)[0]
+        if repeats > self.n_plus_one_threshold:
+            sender.logger.warning(
+                "Possible N+1 query on %s %s: statement ran %d times: %s",
+                request.method, route, repeats, statement,
+            )
+
+        with self._lock:
+            self._counters[("http_requests_total", labels + (("status", response.status_code),))] += 1
+            self._counters[("http_request_sql_statements_total", labels)] += g._sql_count
+            self._counters[("http_request_db_seconds_total", labels)] += g._sql_time
+            self._counters[("http_response_bytes_total", labels)] += size
+            if repeats > self.n_plus_one_threshold:
+                self._counters[("http_request_n_plus_one_total", labels)] += 1
+            self._observe("http_request_duration_seconds", labels, elapsed)
+
+        self._maybe_flush()
+
+    def _observe(self, name, labels, value):
+        buckets = self._histograms.setdefault((name, labels), [0] * len(LATENCY_BUCKETS) + [0.0, 0])
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+        buckets[-2] += value
+        buckets[-1] += 1
+
+    def _snapshot(self):
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, list(labels), list(values)] for (name, labels), values in self._histograms.items()]
+        stats = token_cache.stats()
+        counters.append(["token_cache_hits_total", [], stats["hits"]])
+        counters.append(["token_cache_misses_total", [], stats["misses"]])
+        # Only backends that keep statistics, such as SharedCache, report them.
+        cache_stats = getattr(cache.cache, "stats", None)
+        if cache_stats is not None:
+            stats = cache_stats()
+            for name in ("hits", "misses", "evictions"):
+                counters.append([f"response_cache_{name}_total", [], stats[name]])
+        return {"counters": counters, "histograms": histograms}
+
+    def _maybe_flush(self, force=False):
+        if not self.metrics_dir:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        path = os.path.join(self.metrics_dir, f"metrics-{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _collect(self):
+        if self.metrics_dir:
+            self._maybe_flush(force=True)
+            snapshots = []
+            for path in glob.glob(os.path.join(self.metrics_dir, "metrics-*.json")):
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots = [self._snapshot()]
+
+        counters = Counter()
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot["counters"]:
+                counters[(name, tuple(tuple(pair) for pair in labels))] += value
+            for name, labels, values in snapshot["histograms"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                totals = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self._collect()
+        lines = []
+        seen = set()
+
+        def header(name):
+            if name not in seen:
+                seen.add(name)
+                metric_type, help_text = HELP[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), values in sorted(histograms.items()):
+            header(name)
+            for bound, count in zip(LATENCY_BUCKETS, values):
+                bucket_labels = labels + (("le", bound),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "_sql_statements" in g:
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "_sql_statements" in g:
+        starts = conn.info.get("_query_start")
+        if starts:
+            g._sql_time += time.perf_counter() - starts.pop()
+        g._sql_count += 1
+        # One executemany is split into several batched INSERTs; those
+        # batches are not repeated queries.
+        if context is None or context.execute_style is not ExecuteStyle.INSERTMANYVALUES:
+            g._sql_statements[statement] += 1
+
+
+instrumentation = Instrumentation()
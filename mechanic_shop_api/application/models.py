@@ -1,16 +1,40 @@
+from datetime import datetime, timezone
+
 from application.extensions import db
+from application.vin import normalize_vin
+
+
+def utcnow():
+    # Naive UTC, which every backend stores the same way.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def updated_at_column():
+    """Last write time of a row; ETags and Last-Modified headers are built from it."""
+    return db.Column(
+        db.DateTime,
+        nullable=False,
+        default=utcnow,
+        onupdate=utcnow,
+        # Rows inserted outside the ORM and Core still get a timestamp.
+        server_default=db.func.current_timestamp(),
+        index=True,
+    )
 
 
 service_ticket_mechanic = db.Table(
     "service_ticket_mechanic",
-    db.Column("service_ticket_id", db.Integer, db.ForeignKey("service_tickets.id"), primary_key=True),
+    db.Column("service_ticket_id", db.Integer, db.ForeignKey("service_tickets.id", ondelete="CASCADE"), primary_key=True),
     db.Column("mechanic_id", db.Integer, db.ForeignKey("mechanics.id"), primary_key=True),
 )
 
 service_ticket_inventory = db.Table(
     "service_ticket_inventory",
-    db.Column("service_ticket_id", db.Integer, db.ForeignKey("service_tickets.id"), primary_key=True),
+    db.Column("service_ticket_id", db.Integer, db.ForeignKey("service_tickets.id", ondelete="CASCADE"), primary_key=True),
     db.Column("inventory_id", db.Integer, db.ForeignKey("inventory.id"), primary_key=True),
+    db.Column("quantity", db.Integer, nullable=False, default=1, server_default="1"),
+    # The tickets holding a part, for repricing them when its price changes.
+    db.Index("ix_service_ticket_inventory_inventory_id", "inventory_id", "service_ticket_id"),
 )
 
 
@@ -23,8 +47,16 @@ class Customer(db.Model):
     password = db.Column(db.String(255), nullable=False)
     phone = db.Column(db.String(50))
     address = db.Column(db.String(255))
+    updated_at = updated_at_column()
 
-    service_tickets = db.relationship("ServiceTicket", back_populates="customer", cascade="all, delete")
+    # The database deletes a customer's tickets (and their links) by itself,
+    # so deleting a customer never loads them; see application.counters.
+    service_tickets = db.relationship(
+        "ServiceTicket",
+        back_populates="customer",
+        cascade="all, delete",
+        passive_deletes=True,
+    )
 
 
 class Mechanic(db.Model):
@@ -36,6 +68,9 @@ class Mechanic(db.Model):
     phone = db.Column(db.String(50))
     address = db.Column(db.String(255))
     salary = db.Column(db.Float)
+    # Maintained by application.counters; rebuild with `flask rebuild-ticket-counts`.
+    ticket_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = updated_at_column()
 
     service_tickets = db.relationship(
         "ServiceTicket",
@@ -43,6 +78,10 @@ class Mechanic(db.Model):
         back_populates="mechanics",
     )
 
+    __table_args__ = (
+        db.Index("ix_mechanics_ticket_count_id", "ticket_count", "id"),
+    )
+
 
 class Inventory(db.Model):
     __tablename__ = "inventory"
@@ -50,6 +89,7 @@ class Inventory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     price = db.Column(db.Float, nullable=False)
+    updated_at = updated_at_column()
 
     service_tickets = db.relationship(
         "ServiceTicket",
@@ -64,16 +104,37 @@ class ServiceTicket(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(255), nullable=False)
     vin = db.Column(db.String(17), nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey("customers.id"), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customers.id", ondelete="CASCADE"), nullable=False)
+    # Sum of quantity * price over the ticket's parts. Maintained by
+    # application.counters; rebuild with `flask rebuild-parts-totals`.
+    parts_total = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    updated_at = updated_at_column()
 
     customer = db.relationship("Customer", back_populates="service_tickets")
     mechanics = db.relationship(
         "Mechanic",
         secondary=service_ticket_mechanic,
         back_populates="service_tickets",
+        order_by="Mechanic.id",
+        passive_deletes=True,
     )
     inventory_items = db.relationship(
         "Inventory",
         secondary=service_ticket_inventory,
         back_populates="service_tickets",
+        order_by="Inventory.id",
+        passive_deletes=True,
     )
+
+    __table_args__ = (
+        # Vehicle history (GET /service-tickets/by-vin/<vin>) and a customer's
+        # tickets, both in id order; the second also serves ON DELETE CASCADE.
+        db.Index("ix_service_tickets_vin_id", "vin", "id"),
+        db.Index("ix_service_tickets_customer_id_id", "customer_id", "id"),
+        # Billing lists sorted or filtered by parts_total.
+        db.Index("ix_service_tickets_parts_total_id", "parts_total", "id"),
+    )
+
+    @db.validates("vin")
+    def _normalize_vin(self, key, value):
+        return normalize_vin(value)
@@ -0,0 +1,145 @@
+import base64
+import binascii
+import json
+from math import ceil
+
+from flask import request
+
+from application.counts import COUNT_MODES, count_rows
+from application.extensions import db
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    # Cursors are opaque to clients but are just the last id seen, base64 encoded.
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        last_id = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor.")
+    if last_id < 0:
+        raise ValueError("Invalid cursor.")
+    return last_id
+
+
+def encode_key_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_key_cursor(token, *types):
+    """Decode a cursor made by ``encode_key_cursor`` whose values have ``types``."""
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor.")
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(type(value) is type_ for value, type_ in zip(values, types))
+    ):
+        raise ValueError("Invalid cursor.")
+    return tuple(values)
+
+
+def get_keyset_args(decode=decode_cursor, default=0):
+    """Read ``cursor`` and ``limit`` from the query string.
+
+    The cursor is read with ``decode``, and is ``default`` when absent.
+    Raises ValueError with a client-facing message when either is invalid.
+    """
+    limit = request.args.get("limit", DEFAULT_PAGE_LIMIT, type=int)
+    if limit < 1:
+        raise ValueError("limit must be a positive integer.")
+    limit = min(limit, MAX_PAGE_LIMIT)
+
+    cursor = request.args.get("cursor")
+    after = decode(cursor) if cursor else default
+    return after, limit
+
+
+def keyset_page(statement, id_column, after_id, limit, scalars=True):
+    """Fetch one page of ``statement`` ordered by ``id_column``.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    One extra row is fetched to know whether another page exists without a COUNT.
+    Pass ``scalars=False`` for column selects, whose rows must include ``id``.
+    """
+    statement = statement.where(id_column > after_id).order_by(id_column).limit(limit + 1)
+    result = db.session.execute(statement)
+    rows = result.scalars().all() if scalars else result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return rows, next_cursor
+
+
+def keyset_page_by(statement, key_columns, after_key, limit, scalars=True, descending=False):
+    """Like ``keyset_page``, ordered by the tuple ``key_columns``, e.g. ``(vin, id)``.
+
+    ``after_key`` is the last key of the previous page, or None for the first
+    page. The cursor holds the whole key, so an index on ``key_columns``
+    serves every page, in either direction. Rows must include every key column.
+    """
+    if after_key is not None:
+        key, after = db.tuple_(*key_columns), db.tuple_(*after_key)
+        statement = statement.where(key < after if descending else key > after)
+    if descending:
+        statement = statement.order_by(*(column.desc() for column in key_columns))
+    else:
+        statement = statement.order_by(*key_columns)
+    statement = statement.limit(limit + 1)
+    result = db.session.execute(statement)
+    rows = result.scalars().all() if scalars else result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_key_cursor(*(getattr(rows[-1], column.key) for column in key_columns))
+    return rows, next_cursor
+
+
+def get_page_args(default_per_page=10):
+    """Read ``page``, ``per_page`` and ``count`` from the query string.
+
+    ``page`` and ``per_page`` are returned as given; ``offset_page`` clamps
+    them. Raises ValueError with a client-facing message for an unknown
+    ``count`` mode.
+    """
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", default_per_page, type=int)
+    mode = request.args.get("count", "cached")
+    if mode not in COUNT_MODES:
+        raise ValueError(f"count must be one of: {', '.join(COUNT_MODES)}.")
+    return page, per_page, mode
+
+
+def offset_page(statement, page, per_page, table=None, count="cached"):
+    """Offset-paginate a column ``select()`` the way ``db.paginate`` does.
+
+    Returns ``(rows, total, pages, has_next)``. Out-of-range arguments are
+    clamped like ``db.paginate(..., error_out=False)``. The total comes from
+    ``count_rows`` for ``table`` in the given ``count`` mode; with
+    ``count="none"`` it and ``pages`` are None. ``has_next`` is found by
+    fetching one extra row, so it never needs the total.
+    """
+    page = page if page >= 1 else 1
+    per_page = per_page if per_page >= 1 else 20
+
+    rows = db.session.execute(statement.limit(per_page + 1).offset((page - 1) * per_page)).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if table is None:
+        table = statement.get_final_froms()[0].name
+    total = count_rows(statement, table, count)
+    pages = None if total is None else (ceil(total / per_page) if total else 0)
+    return rows, total, pages, has_next
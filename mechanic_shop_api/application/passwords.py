@@ -0,0 +1,189 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _hash_chunk(passwords, method):
+    return [generate_password_hash(password, method=method) for password in passwords]
+
+
+def _check(stored_hash, password):
+    return check_password_hash(stored_hash, password)
+
+
+class PasswordHasher:
+    """Runs the password KDF in a small process pool.
+
+    At most ``max_pending`` hash/verify calls may be queued or running at once;
+    beyond that callers get PasswordHasherBusy, which the app turns into a 503
+    so a login burst sheds load instead of queueing without bound. With
+    ``workers`` set to 0 the work runs inline in the calling thread.
+    """
+
+    def __init__(self):
+        self.method = "scrypt:32768:8:1"
+        self.workers = 0
+        self.timeout = 10
+        self.retry_after = 1
+        self._slots = threading.Semaphore(4)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._method_prefix = None
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        self._method_prefix = None
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", self.workers)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", self.timeout)
+        self.retry_after = app.config.get("PASSWORD_HASH_RETRY_AFTER", self.retry_after)
+        max_pending = app.config.get("PASSWORD_HASH_MAX_PENDING", max(self.workers, 1) * 4)
+        self._slots = threading.Semaphore(max_pending)
+        self.shutdown()
+        app.register_error_handler(PasswordHasherBusy, self._busy_response)
+
+    def _busy_response(self, error):
+        response = jsonify({"error": "Server is busy, please retry shortly."})
+        response.headers["Retry-After"] = str(self.retry_after)
+        return response, 503
+
+    def _get_pool(self):
+        # Gunicorn forks workers after the app is built, so each process
+        # needs its own pool.
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_pid = None
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+
+    def _release_when_done(self, futures):
+        # A hash already running in the pool cannot be cancelled, so the slot
+        # is held until the work finishes, not until the caller gives up.
+        remaining = len(futures)
+        lock = threading.Lock()
+
+        def done(_):
+            nonlocal remaining
+            with lock:
+                remaining -= 1
+                last = remaining == 0
+            if last:
+                self._slots.release()
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def _submit(self, calls):
+        """Submit ``(func, *args)`` calls to the pool under the slot already taken."""
+        try:
+            pool = self._get_pool()
+            futures = [pool.submit(*call) for call in calls]
+        except BaseException:
+            self._slots.release()
+            raise
+        self._release_when_done(futures)
+        return futures
+
+    def _run(self, func, *args):
+        self._acquire()
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+        [future] = self._submit([(func, *args)])
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash a batch of passwords across every worker at once.
+
+        The whole batch takes a single pending slot, and the timeout is
+        scaled to the number of rounds the pool needs to get through it.
+        """
+        passwords = list(passwords)
+        if not passwords:
+            return []
+        self._acquire()
+        if not self.workers:
+            try:
+                return _hash_chunk(passwords, self.method)
+            finally:
+                self._slots.release()
+        rounds = math.ceil(len(passwords) / self.workers)
+        size = max(1, rounds // 4)
+        futures = self._submit(
+            (_hash_chunk, passwords[start:start + size], self.method)
+            for start in range(0, len(passwords), size)
+        )
+        deadline = time.monotonic() + self.timeout * rounds
+        try:
+            return [
+                hashed
+                for future in futures
+                for hashed in future.result(timeout=max(0, deadline - time.monotonic()))
+            ]
+        except FutureTimeoutError:
+            for future in futures:
+                future.cancel()
+            raise PasswordHasherBusy()
+
+    def method_prefix(self):
+        """The method as werkzeug writes it into hashes, e.g. ``scrypt:32768:8:1`` for ``scrypt``."""
+        if self._method_prefix is None:
+            # werkzeug fills in defaults for a bare method, so ask it once.
+            self._method_prefix = generate_password_hash("", method=self.method).split("$", 1)[0]
+        return self._method_prefix
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split("$", 1)[0] != self.method_prefix()
+
+    def verify(self, stored_hash, password):
+        """Check ``password`` and return ``(is_valid, new_hash)``.
+
+        ``new_hash`` is only set when the password is correct but was hashed
+        with different parameters than the configured method, and the pool
+        had room to rehash it; the upgrade is retried on a later login.
+        """
+        if not self._run(_check, stored_hash, password):
+            return False, None
+        if self.needs_rehash(stored_hash):
+            try:
+                return True, self.hash(password)
+            except PasswordHasherBusy:
+                pass
+        return True, None
+
+
+password_hasher = PasswordHasher()
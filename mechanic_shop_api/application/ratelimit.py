@@ -0,0 +1,192 @@
+"""Rate-limit storage shared by every worker on a host, kept in a SQLite file.
+
+Set ``RATELIMIT_STORAGE_URI = "sqlite:////var/run/mechanic-shop/ratelimit.db"``
+(importing this module registers the ``sqlite://`` scheme with ``limits``).
+No external service is needed. All gunicorn workers open the same file,
+so a limit applies to the host rather than to each process.
+
+With the sliding-window counter strategy, each limit key is one row
+holding the counts of the current and previous windows, which is O(1)
+per key however many hits it takes. Each hit is a single
+``BEGIN IMMEDIATE`` transaction, so the check and the increment are
+atomic across processes. A daemon thread in each process deletes expired
+rows every ``cleanup_interval`` seconds.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    window INTEGER NOT NULL,
+    current INTEGER NOT NULL,
+    previous INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_rate_limits_expires_at ON rate_limits (expires_at);
+"""
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport):
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri, wrap_exceptions=False, cleanup_interval=60, busy_timeout=5.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len("sqlite:///"):]
+        if not self.path:
+            raise ValueError("The sqlite:// rate limit storage needs a file path, e.g. sqlite:////tmp/ratelimit.db.")
+        self.cleanup_interval = float(cleanup_interval)
+        self.busy_timeout = float(busy_timeout)
+        self._local = threading.local()
+        self._cleaner_pid = None
+        self._lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # One connection per thread and process; sqlite3 connections must
+        # not cross threads, and must not survive a fork.
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Losing the last few hits on power loss is acceptable for rate limits.
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        self._start_cleaner()
+        return connection
+
+    def _transaction(self, immediate=True):
+        return _Transaction(self._connection(), immediate)
+
+    def _start_cleaner(self):
+        if self._cleaner_pid == os.getpid() or self.cleanup_interval <= 0:
+            return
+        with self._lock:
+            if self._cleaner_pid == os.getpid():
+                return
+            self._cleaner_pid = os.getpid()
+        threading.Thread(target=self._clean_forever, name="ratelimit-cleaner", daemon=True).start()
+
+    def _clean_forever(self):
+        while True:
+            time.sleep(self.cleanup_interval)
+            try:
+                self.expire()
+            except sqlite3.Error:
+                pass
+
+    def expire(self):
+        """Delete keys whose windows have all ended; returns how many were removed."""
+        with self._transaction() as connection:
+            return connection.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    # Fixed window: ``current`` is the count until ``expires_at``.
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT current, expires_at FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                count, expires_at = amount, now + expiry
+            else:
+                count, expires_at = row[0] + amount, row[1]
+            self._save(connection, key, 0, count, 0, expires_at)
+            return count
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT current FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connection().execute(
+            "SELECT expires_at FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    # Sliding window counter: ``window`` is the start of the current window,
+    # ``previous`` the count of the window before it.
+
+    def _windows(self, connection, key, expiry, now):
+        window = int(now // expiry) * expiry
+        row = connection.execute(
+            "SELECT window, current, previous FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] < window - expiry:
+            return window, 0, 0
+        if row[0] == window - expiry:
+            return window, 0, row[1]
+        return window, row[1], row[2]
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._transaction() as connection:
+            window, current, previous = self._windows(connection, key, expiry, now)
+            weight = 1 - (now - window) / expiry
+            if math.floor(previous * weight + current) + amount > limit:
+                return False
+            self._save(connection, key, window, current + amount, previous, window + 2 * expiry)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        with self._transaction(immediate=False) as connection:
+            window, current, previous = self._windows(connection, key, expiry, now)
+        remaining = window + expiry - now
+        return previous, remaining if previous else 0.0, current, remaining + expiry
+
+    def clear_sliding_window(self, key, expiry):
+        self.clear(key)
+
+    def _save(self, connection, key, window, current, previous, expires_at):
+        connection.execute(
+            "INSERT INTO rate_limits (key, window, current, previous, expires_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET window = excluded.window, current = excluded.current, "
+            "previous = excluded.previous, expires_at = excluded.expires_at",
+            (key, window, current, previous, expires_at),
+        )
+
+    def check(self):
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._transaction() as connection:
+            return connection.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key):
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+class _Transaction:
+    def __init__(self, connection, immediate=True):
+        self.connection = connection
+        self.immediate = immediate
+
+    def __enter__(self):
+        # IMMEDIATE takes the write lock up front, so two workers cannot both
+        # read the old count and then both increment it.
+        self.connection.execute("BEGIN IMMEDIATE" if self.immediate else "BEGIN")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
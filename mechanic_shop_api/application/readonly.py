@@ -0,0 +1,59 @@
+"""Read-only data access that bypasses the ORM unit of work.
+
+Everything here selects plain columns, so no instances are built or added
+to the session identity map. Results are SQLAlchemy ``Row`` tuples, or
+``__slots__`` records when the caller needs attribute access, for example
+to dump through a marshmallow schema.
+"""
+from application.extensions import db
+from application.pagination import offset_page
+
+_record_types = {}
+
+
+def record_type(columns):
+    """A ``__slots__`` class with one attribute per column, cached per column set."""
+    names = tuple(column.key for column in columns)
+    record = _record_types.get(names)
+    if record is None:
+        def __init__(self, *values):
+            for name, value in zip(names, values):
+                setattr(self, name, value)
+
+        record = type("Record", (), {"__slots__": names, "__init__": __init__})
+        _record_types[names] = record
+    return record
+
+
+def as_records(columns, rows):
+    record = record_type(columns)
+    return [record(*row) for row in rows]
+
+
+def fetch_all(columns, *criteria, order_by=(), limit=None, offset=None):
+    if not isinstance(order_by, (list, tuple)):
+        order_by = (order_by,)
+    statement = db.select(*columns).where(*criteria).order_by(*order_by)
+    if limit is not None:
+        statement = statement.limit(limit).offset(offset)
+    return db.session.execute(statement).all()
+
+
+def fetch_one(columns, *criteria):
+    return db.session.execute(db.select(*columns).where(*criteria).limit(1)).first()
+
+
+def fetch_page(columns, order_by, page, per_page, count="cached"):
+    """Return ``(rows, total, pages, has_next)`` for one offset page."""
+    return offset_page(db.select(*columns).order_by(order_by), page, per_page, count=count)
+
+
+def page_payload(items, page, per_page, total, pages, has_next):
+    return {
+        "items": items,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": pages,
+        "has_next": has_next,
+    }
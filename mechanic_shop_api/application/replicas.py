@@ -0,0 +1,155 @@
+"""Read replicas for read-only requests.
+
+``SQLALCHEMY_REPLICAS`` lists replica database URLs. GET, HEAD and OPTIONS
+requests, and views decorated with ``read_only``, read from one replica
+chosen per request. With ``REPLICA_STRATEGY = "round_robin"`` replicas are
+taken in turn; with ``"least_connections"`` the one with the fewest
+checked-out connections wins.
+
+A replica that raises an OperationalError is taken out of rotation for
+``REPLICA_RETRY_INTERVAL`` seconds. It then has to answer ``SELECT 1``
+before it gets traffic again. When no replica is available, reads go to
+the primary.
+"""
+import itertools
+import threading
+import time
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, has_request_context, request
+
+from application.database import engine_options, listen_sqlite_pragmas
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+STRATEGIES = ("round_robin", "least_connections")
+
+
+def read_only(view_func):
+    """Let a view that does not write read from a replica whatever its HTTP method."""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        return view_func(*args, **kwargs)
+
+    wrapper.read_only = True
+    return wrapper
+
+
+def is_read_only_request():
+    if not has_request_context():
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    return request.method in READ_METHODS or getattr(view, "read_only", False)
+
+
+def used_replica(session):
+    """True if ``session`` has read from a replica."""
+    return session.info.get("replica") is not None
+
+
+class Replica:
+    def __init__(self, url, engine):
+        self.url = url
+        self.engine = engine
+        self.healthy = True
+        self.retry_at = 0.0
+
+    @property
+    def connections(self):
+        checkedout = getattr(self.engine.pool, "checkedout", None)
+        return checkedout() if checkedout else 0
+
+
+class ReplicaSet:
+    def __init__(self, replicas, strategy="round_robin", retry_interval=30):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"REPLICA_STRATEGY must be one of: {', '.join(STRATEGIES)}.")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.retry_interval = retry_interval
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+        for replica in replicas:
+            sa.event.listen(replica.engine, "handle_error", self._error_handler(replica))
+
+    def _error_handler(self, replica):
+        dbapi = replica.engine.dialect.dbapi
+
+        def handle_error(context):
+            if context.is_disconnect or isinstance(context.original_exception, dbapi.OperationalError):
+                self.mark_down(replica)
+
+        return handle_error
+
+    def mark_down(self, replica):
+        with self._lock:
+            replica.healthy = False
+            replica.retry_at = time.monotonic() + self.retry_interval
+
+    def _available(self, replica):
+        if replica.healthy:
+            return True
+        with self._lock:
+            if replica.healthy or time.monotonic() < replica.retry_at:
+                return replica.healthy
+            # Only one caller probes; the others skip it until the next interval.
+            replica.retry_at = time.monotonic() + self.retry_interval
+        try:
+            with replica.engine.connect() as connection:
+                connection.execute(sa.text("SELECT 1"))
+        except sa.exc.DBAPIError:
+            return False
+        replica.healthy = True
+        return True
+
+    def choose(self):
+        """The replica to use for the next request, or None to use the primary."""
+        candidates = [replica for replica in self.replicas if self._available(replica)]
+        if not candidates:
+            return None
+        # Rotating the start also spreads ties between equally loaded replicas.
+        start = next(self._turn) % len(candidates)
+        candidates = candidates[start:] + candidates[:start]
+        if self.strategy == "least_connections":
+            return min(candidates, key=lambda replica: replica.connections)
+        return candidates[0]
+
+    def engine_for(self, session):
+        """Engine for a read in ``session``, or None to read from the primary."""
+        if not is_read_only_request():
+            return None
+        # Choose once per session so one request sees one replica's snapshot.
+        if "replica" not in session.info:
+            session.info["replica"] = self.choose()
+        replica = session.info["replica"]
+        return replica.engine if replica is not None else None
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+
+class ReplicaRouter:
+    def init_app(self, app):
+        previous = app.extensions.pop("replicas", None)
+        if previous is not None:
+            previous.dispose()
+
+        urls = app.config.get("SQLALCHEMY_REPLICAS") or ()
+        if not urls:
+            return
+
+        replicas = []
+        for url in urls:
+            engine = sa.create_engine(url, **engine_options(app.config, url))
+            listen_sqlite_pragmas(engine, app.config)
+            replicas.append(Replica(url, engine))
+        app.extensions["replicas"] = ReplicaSet(
+            replicas,
+            strategy=app.config.get("REPLICA_STRATEGY", "round_robin"),
+            retry_interval=app.config.get("REPLICA_RETRY_INTERVAL", 30),
+        )
+
+
+replica_router = ReplicaRouter()
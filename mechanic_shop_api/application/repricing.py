@@ -0,0 +1,152 @@
+"""Bulk inventory repricing, for supplier price sheets (``POST /inventory/reprice``).
+
+A price sheet is a map of explicit ``{id: price}`` changes, a list of
+rules, or both. A rule picks parts by a case-insensitive glob on their name
+(``"brake*"``) and applies, in this order, any of:
+
+* ``markup_percent``: add (or, negative, take off) a percentage;
+* ``ending``: round up to the next price ending in it, e.g. ``0.99``;
+* ``min_price`` / ``max_price``: a floor and a ceiling.
+
+Rules run in order, each on the prices the earlier ones left. Parts given
+an explicit price are set to exactly that and no rule touches them.
+
+Every part's id, name and price is read in one query and the new prices
+are computed in one pass over whole columns: NumPy arrays when NumPy is
+installed, plain lists otherwise. Both work in integer cents, rounding
+half to even, so they give the same prices. Only the name matching runs per
+row, as a compiled regular expression. The changed rows are written with
+one executemany UPDATE, and the ``parts_total`` of every ticket holding one
+of them moves by the price change times its quantity, with another.
+"""
+import fnmatch
+import re
+
+from application.extensions import db
+from application.models import Inventory, ServiceTicket, service_ticket_inventory
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+
+class UnknownParts(LookupError):
+    def __init__(self, ids):
+        super().__init__(ids)
+        self.ids = ids
+
+
+def _cents(price):
+    return round(price * 100)
+
+
+def _matcher(pattern):
+    return re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+
+
+def _reprice_lists(prices, names, rules, explicit):
+    cents = [_cents(price) for price in prices]
+    touched = [False] * len(prices)
+    for rule in rules:
+        match = _matcher(rule["match"])
+        markup = 1 + rule.get("markup_percent", 0) / 100
+        ending = _cents(rule["ending"]) if "ending" in rule else None
+        low = _cents(rule["min_price"]) if "min_price" in rule else None
+        high = _cents(rule["max_price"]) if "max_price" in rule else None
+        for i, name in enumerate(names):
+            if i in explicit or not match(name):
+                continue
+            value = round(cents[i] * markup)
+            if ending is not None:
+                value = (value - ending + 99) // 100 * 100 + ending
+            if low is not None:
+                value = max(value, low)
+            if high is not None:
+                value = min(value, high)
+            cents[i] = value
+            touched[i] = True
+    for i, price in explicit.items():
+        cents[i] = _cents(price)
+        touched[i] = True
+
+    changed = [i for i, old in enumerate(prices) if touched[i] and cents[i] / 100 != old]
+    return changed, [cents[i] / 100 for i in changed]
+
+
+def _reprice_arrays(prices, names, rules, explicit):
+    old = np.asarray(prices, dtype=np.float64)
+    cents = np.rint(old * 100).astype(np.int64)
+    touched = np.zeros(len(old), dtype=bool)
+    fixed = np.zeros(len(old), dtype=bool)
+    fixed[list(explicit)] = True
+    for rule in rules:
+        match = _matcher(rule["match"])
+        rows = np.fromiter((match(name) is not None for name in names), dtype=bool, count=len(names))
+        rows &= ~fixed
+        value = cents[rows]
+        if "markup_percent" in rule:
+            value = np.rint(value * (1 + rule["markup_percent"] / 100)).astype(np.int64)
+        if "ending" in rule:
+            ending = _cents(rule["ending"])
+            value = (value - ending + 99) // 100 * 100 + ending
+        if "min_price" in rule:
+            value = np.maximum(value, _cents(rule["min_price"]))
+        if "max_price" in rule:
+            value = np.minimum(value, _cents(rule["max_price"]))
+        cents[rows] = value
+        touched |= rows
+    cents[list(explicit)] = [_cents(price) for price in explicit.values()]
+    touched |= fixed
+
+    new = cents / 100
+    changed = np.flatnonzero(touched & (new != old))
+    return changed.tolist(), new[changed].tolist()
+
+
+def plan_reprice(prices=None, rules=()):
+    """The changes a price sheet makes, as dicts of id, name, old_price and new_price.
+
+    ``prices`` maps inventory ids to explicit prices and ``rules`` are
+    loaded ``RepriceRuleSchema`` dicts. Nothing is written. Raises
+    UnknownParts if an id in ``prices`` does not exist.
+    """
+    prices = prices or {}
+    rows = db.session.execute(
+        db.select(Inventory.id, Inventory.name, Inventory.price).order_by(Inventory.id)
+    ).all()
+    ids, names, old_prices = (list(column) for column in zip(*rows)) if rows else ([], [], [])
+
+    position = {inventory_id: i for i, inventory_id in enumerate(ids)}
+    missing = sorted(set(prices) - position.keys())
+    if missing:
+        raise UnknownParts(missing)
+    explicit = {position[inventory_id]: price for inventory_id, price in prices.items()}
+
+    reprice = _reprice_arrays if np is not None else _reprice_lists
+    changed, new_prices = reprice(old_prices, names, list(rules), explicit)
+    return [
+        {"id": ids[i], "name": names[i], "old_price": old_prices[i], "new_price": new_price}
+        for i, new_price in zip(changed, new_prices)
+    ]
+
+
+def apply_reprice(changes):
+    """Write planned ``changes`` and move the totals of the tickets holding them; the caller commits."""
+    if not changes:
+        return
+    # An executemany UPDATE by primary key; it also sets updated_at.
+    db.session.execute(
+        db.update(Inventory),
+        [{"id": change["id"], "price": change["new_price"]} for change in changes],
+    )
+    # Each ticket holding a part moves by its quantity times the price change,
+    # like adding a part does, in one more executemany UPDATE.
+    link = service_ticket_inventory.c
+    tickets = ServiceTicket.__table__
+    db.session.execute(
+        db.update(tickets)
+        .where(tickets.c.id == link.service_ticket_id, link.inventory_id == db.bindparam("part_id"))
+        .values(parts_total=tickets.c.parts_total + link.quantity * db.bindparam("delta")),
+        [{"part_id": change["id"], "delta": change["new_price"] - change["old_price"]} for change in changes],
+    )
@@ -0,0 +1,137 @@
+"""In-place upgrades for databases created by an older version of the app.
+
+``db.create_all()`` at startup only creates missing tables, so an existing
+``app.db`` keeps the columns, indexes and foreign keys it was created with.
+``upgrade_schema`` brings it up to the models and is safe to run again:
+
+* on SQLite, a table missing a column or an ``ON DELETE`` rule is rebuilt
+  (create, copy, drop, rename, the procedure SQLite documents for changes
+  ``ALTER TABLE`` cannot make), so new columns get their server defaults;
+* on other databases, missing columns are added with ``ALTER TABLE ... ADD
+  COLUMN`` and foreign keys that need a new ``ON DELETE`` rule are reported,
+  to be recreated by hand;
+* missing indexes are created everywhere.
+
+The derived columns a rebuilt table starts with are only defaults; ``flask
+upgrade-db`` recomputes them afterwards.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn, CreateTable
+
+from application.extensions import db
+
+
+class SchemaUpgradeError(RuntimeError):
+    pass
+
+
+def _missing_columns(inspector, table):
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    return [column for column in table.columns if column.name not in existing]
+
+
+def _stale_foreign_keys(inspector, table):
+    """Foreign keys whose ``ON DELETE`` rule differs from the model's."""
+    existing = {
+        (tuple(fk["constrained_columns"]), fk["referred_table"]): (fk.get("options") or {}).get("ondelete")
+        for fk in inspector.get_foreign_keys(table.name)
+    }
+    stale = []
+    for fk in table.foreign_keys:
+        key = ((fk.parent.name,), fk.column.table.name)
+        if key in existing and (existing[key] or "").upper() != (fk.ondelete or "").upper():
+            stale.append(fk)
+    return stale
+
+
+def _rebuild_sqlite_table(connection, table, missing):
+    preparer = connection.dialect.identifier_preparer
+    name = preparer.format_table(table)
+    temporary = preparer.quote(f"_upgrade_{table.name}")
+    # The model's own DDL under a temporary name; its indexes come after the
+    # old table, and the old indexes with it, are gone.
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect)).strip()
+    connection.exec_driver_sql(ddl.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {temporary} ", 1))
+
+    copied = ", ".join(preparer.quote(column.name) for column in table.columns if column not in missing)
+    connection.exec_driver_sql(f"INSERT INTO {temporary} ({copied}) SELECT {copied} FROM {name}")
+    connection.exec_driver_sql(f"DROP TABLE {name}")
+    connection.exec_driver_sql(f"ALTER TABLE {temporary} RENAME TO {name}")
+
+
+def _upgrade_sqlite_tables(outdated):
+    changes = []
+    with db.engine.connect() as connection:
+        # Foreign keys must be off while a referenced table is dropped and
+        # renamed, and the pragma is ignored inside a transaction.
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        foreign_keys = connection.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        try:
+            connection.exec_driver_sql("BEGIN")
+            try:
+                for table, missing in outdated:
+                    _rebuild_sqlite_table(connection, table, missing)
+                    added = ", ".join(column.name for column in missing)
+                    changes.append(f"Rebuilt table {table.name}" + (f" (added {added})." if added else "."))
+                violations = connection.exec_driver_sql("PRAGMA foreign_key_check").all()
+                if violations:
+                    tables = sorted({row[0] for row in violations})
+                    raise SchemaUpgradeError(
+                        f"Rows reference missing parents in {', '.join(tables)}; "
+                        "see PRAGMA foreign_key_check."
+                    )
+            except BaseException:
+                connection.exec_driver_sql("ROLLBACK")
+                raise
+            connection.exec_driver_sql("COMMIT")
+        finally:
+            connection.exec_driver_sql(f"PRAGMA foreign_keys={foreign_keys}")
+    return changes
+
+
+def upgrade_schema():
+    """Bring existing tables up to the models; returns a line per change made or needed.
+
+    Raises SchemaUpgradeError, leaving the database unchanged, if a SQLite
+    rebuild would keep rows that point at missing parents.
+    """
+    db.create_all()
+    sqlite = db.engine.dialect.name == "sqlite"
+    inspector = inspect(db.engine)
+    changes = []
+
+    outdated = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        missing = _missing_columns(inspector, table)
+        stale = _stale_foreign_keys(inspector, table)
+        if sqlite:
+            if missing or stale:
+                outdated.append((table, missing))
+            continue
+        for column in missing:
+            column_ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+            changes.append(f"Added column {table.name}.{column.name}.")
+        for fk in stale:
+            changes.append(
+                f"Foreign key {table.name}.{fk.parent.name} needs ON DELETE {fk.ondelete or 'NO ACTION'}; "
+                "recreate it by hand."
+            )
+    if outdated:
+        changes.extend(_upgrade_sqlite_tables(outdated))
+
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(connection)
+                    changes.append(f"Created index {index.name}.")
+    return changes
@@ -0,0 +1,341 @@
+"""Full-text search over ticket descriptions and inventory names.
+
+There are two index backends behind the same functions:
+
+* ``fts5``: on SQLite, one FTS5 virtual table per source table, keyed by
+  the source row's id and ranked with bm25.
+* ``postings``: on any database, an inverted index in the plain
+  ``search_terms`` table. It has one row per word and document, holding the
+  number of times the word appears. Each query word's count is divided by
+  the number of documents containing it, and a document's score is the sum.
+
+``SEARCH_BACKEND`` picks one. The default, ``auto``, uses ``fts5`` wherever
+SQLite has FTS5 compiled in. In both backends every query word must match,
+and it matches as a prefix, so "brake pad" finds "Replaced brake pads".
+
+ORM inserts, updates and deletes keep the index current through mapper
+events. Bulk creates index the rows they insert. Core deletes, including a
+customer's tickets going by ON DELETE CASCADE, drop their entries first.
+Matches are joined back to their source rows, so an entry that is left
+over never shows up in results. ``flask rebuild-search-index`` reindexes
+every row in ``SEARCH_REINDEX_BATCH_SIZE`` batches, one transaction per
+batch, while searches keep being served.
+"""
+import re
+import sqlite3
+from collections import Counter
+from functools import cache as memoize
+
+from flask import current_app, has_app_context
+from sqlalchemy import column, event, inspect, literal, literal_column, table
+from sqlalchemy.orm import Session
+
+from application.extensions import db
+from application.models import Customer, Inventory, ServiceTicket
+
+SEARCH_BACKENDS = ("auto", "fts5", "postings")
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 64
+
+# Searchable kinds of document: the model and its text column.
+SOURCES = {
+    "service_ticket": (ServiceTicket, ServiceTicket.description),
+    "inventory": (Inventory, Inventory.name),
+}
+
+_WORD = re.compile(r"[^\W_]+")
+
+search_terms = db.Table(
+    "search_terms",
+    db.Column("term", db.String(MAX_TERM_LENGTH), primary_key=True),
+    db.Column("kind", db.String(20), primary_key=True),
+    db.Column("ref_id", db.Integer, primary_key=True),
+    db.Column("hits", db.Integer, nullable=False),
+    db.Index("ix_search_terms_kind_ref_id", "kind", "ref_id"),
+)
+
+
+def terms(text):
+    """The lowercased words of ``text``, as the index stores them."""
+    return [word[:MAX_TERM_LENGTH] for word in _WORD.findall((text or "").lower())]
+
+
+@memoize
+def fts5_available():
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+
+def search_backend(dialect):
+    """The index backend in use on a database with ``dialect``."""
+    backend = current_app.config.get("SEARCH_BACKEND", "auto") if has_app_context() else "auto"
+    if backend == "auto":
+        return "fts5" if dialect.name == "sqlite" and fts5_available() else "postings"
+    return backend
+
+
+@memoize
+def _fts_table(kind):
+    model, _ = SOURCES[kind]
+    return table(f"{model.__tablename__}_fts", column("rowid"), column("body"))
+
+
+# Every table the index lives in, for caches of search results.
+INDEX_TABLES = ("search_terms",) + tuple(_fts_table(kind).name for kind in SOURCES)
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_fts_tables(target, connection, **kwargs):
+    # Virtual tables cannot be declared as Table objects, so they are created
+    # and dropped alongside the metadata. They exist whatever SEARCH_BACKEND says.
+    if connection.dialect.name != "sqlite" or not fts5_available():
+        return
+    for kind in SOURCES:
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {_fts_table(kind).name} "
+            "USING fts5(body, prefix='2 3')"
+        )
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _drop_fts_tables(target, connection, **kwargs):
+    if connection.dialect.name != "sqlite":
+        return
+    for kind in SOURCES:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {_fts_table(kind).name}")
+
+
+def _unindex(connection, backend, kind, ids):
+    """Drop the entries of ``ids``, a list or a select of source ids."""
+    if backend == "fts5":
+        fts = _fts_table(kind)
+        connection.execute(db.delete(fts).where(fts.c.rowid.in_(ids)))
+    else:
+        connection.execute(
+            search_terms.delete().where(search_terms.c.kind == kind, search_terms.c.ref_id.in_(ids))
+        )
+
+
+def _index(connection, backend, kind, rows):
+    """Add or replace the entries of ``rows``, ``(id, text)`` pairs."""
+    if not rows:
+        return
+    _unindex(connection, backend, kind, [row_id for row_id, _ in rows])
+    if backend == "fts5":
+        connection.execute(
+            db.insert(_fts_table(kind)),
+            [{"rowid": row_id, "body": text or ""} for row_id, text in rows],
+        )
+        return
+    postings = [
+        {"term": term, "kind": kind, "ref_id": row_id, "hits": hits}
+        for row_id, text in rows
+        for term, hits in Counter(terms(text)).items()
+    ]
+    if postings:
+        connection.execute(search_terms.insert(), postings)
+
+
+def _kind_of(model):
+    for kind, (source, text_column) in SOURCES.items():
+        if issubclass(model, source):
+            return kind, text_column
+    return None, None
+
+
+def index_new_rows(model, rows):
+    """Index rows of ``model`` inserted without the unit of work; ``rows`` are dicts with ``id``."""
+    kind, text_column = _kind_of(model)
+    if kind is None:
+        return
+    backend = search_backend(db.session.get_bind().dialect)
+    _index(db.session, backend, kind, [(row["id"], row.get(text_column.key)) for row in rows])
+
+
+@event.listens_for(ServiceTicket, "after_insert")
+@event.listens_for(Inventory, "after_insert")
+def _index_inserted(mapper, connection, target):
+    kind, text_column = _kind_of(type(target))
+    _index(connection, search_backend(connection.dialect), kind, [(target.id, getattr(target, text_column.key))])
+
+
+@event.listens_for(ServiceTicket, "after_update")
+@event.listens_for(Inventory, "after_update")
+def _index_updated(mapper, connection, target):
+    kind, text_column = _kind_of(type(target))
+    if inspect(target).attrs[text_column.key].history.has_changes():
+        _index(connection, search_backend(connection.dialect), kind, [(target.id, getattr(target, text_column.key))])
+
+
+@event.listens_for(ServiceTicket, "after_delete")
+@event.listens_for(Inventory, "after_delete")
+def _index_deleted(mapper, connection, target):
+    kind, _ = _kind_of(type(target))
+    _unindex(connection, search_backend(connection.dialect), kind, [target.id])
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _unindex_core_deletes(orm_execute_state):
+    if not orm_execute_state.is_delete:
+        return
+    deleted_from = getattr(orm_execute_state.statement, "table", None)
+    for kind, (model, _) in SOURCES.items():
+        if getattr(deleted_from, "name", None) == model.__tablename__:
+            ids = db.select(model.id)
+            if orm_execute_state.statement.whereclause is not None:
+                ids = ids.where(orm_execute_state.statement.whereclause)
+            session = orm_execute_state.session
+            _unindex(session, search_backend(session.get_bind().dialect), kind, ids)
+
+
+@event.listens_for(Session, "before_flush")
+def _unindex_cascaded_tickets(session, flush_context, instances):
+    # A deleted customer's tickets go by ON DELETE CASCADE; see models.Customer.
+    customer_ids = [obj.id for obj in session.deleted if isinstance(obj, Customer)]
+    if customer_ids:
+        ids = db.select(ServiceTicket.id).where(ServiceTicket.customer_id.in_(customer_ids))
+        _unindex(session, search_backend(session.get_bind().dialect), "service_ticket", ids)
+
+
+def _prefix_range(prefix):
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _fts5_matches(kinds, words):
+    match = " AND ".join(f'"{word}"*' for word in words)
+    selects = []
+    for kind in kinds:
+        model, text_column = SOURCES[kind]
+        fts = _fts_table(kind)
+        name = literal_column(fts.name)
+        selects.append(
+            db.select(
+                literal(kind).label("kind"),
+                model.id.label("id"),
+                (-db.func.bm25(name)).label("score"),
+                text_column.label("text"),
+            )
+            .select_from(fts.join(model.__table__, model.id == fts.c.rowid))
+            .where(name.op("MATCH")(match))
+        )
+    return selects
+
+
+def _postings_matches(kinds, words):
+    per_word = []
+    for word in words:
+        low, high = _prefix_range(word)
+        # Grouped first, so the window counts the documents containing the word.
+        per_word.append(
+            db.select(
+                search_terms.c.kind,
+                search_terms.c.ref_id,
+                (db.func.sum(search_terms.c.hits) * 1.0 / db.func.count().over()).label("score"),
+            )
+            .where(
+                search_terms.c.term >= low,
+                search_terms.c.term < high,
+                search_terms.c.kind.in_(kinds),
+            )
+            .group_by(search_terms.c.kind, search_terms.c.ref_id)
+        )
+    scored = db.union_all(*per_word).subquery()
+    matches = (
+        db.select(scored.c.kind, scored.c.ref_id, db.func.sum(scored.c.score).label("score"))
+        .group_by(scored.c.kind, scored.c.ref_id)
+        .having(db.func.count() == len(words))
+        .cte("matches")
+    )
+    selects = []
+    for kind in kinds:
+        model, text_column = SOURCES[kind]
+        selects.append(
+            db.select(
+                literal(kind).label("kind"),
+                model.id.label("id"),
+                matches.c.score,
+                text_column.label("text"),
+            )
+            .select_from(matches.join(model.__table__, model.id == matches.c.ref_id))
+            .where(matches.c.kind == kind)
+        )
+    return selects
+
+
+def search(query, kinds=None, limit=20, offset=0):
+    """Rows of ``(kind, id, score, text)`` matching every word of ``query``, best first.
+
+    Raises ValueError with a client-facing message for an unusable query.
+    """
+    words = list(dict.fromkeys(terms(query)))
+    if not words:
+        raise ValueError("q must contain at least one word.")
+    if len(words) > MAX_QUERY_TERMS:
+        raise ValueError(f"q may contain at most {MAX_QUERY_TERMS} words.")
+    kinds = list(kinds or SOURCES)
+
+    if search_backend(db.session.get_bind().dialect) == "fts5":
+        selects = _fts5_matches(kinds, words)
+    else:
+        selects = _postings_matches(kinds, words)
+    ranked = db.union_all(*selects).subquery()
+    statement = (
+        db.select(ranked)
+        .order_by(ranked.c.score.desc(), ranked.c.kind, ranked.c.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return db.session.execute(statement).all()
+
+
+def rebuild_search_index(batch_size=5000):
+    """Reindex every searchable row, ``batch_size`` rows per transaction.
+
+    Entries are replaced batch by batch, so searches keep working during a
+    rebuild, and entries of rows that no longer exist are dropped at the
+    end. Returns ``{kind: rows indexed}``.
+    """
+    backend = search_backend(db.session.get_bind().dialect)
+    indexed = {}
+    for kind, (model, text_column) in SOURCES.items():
+        after_id = 0
+        indexed[kind] = 0
+        while True:
+            rows = db.session.execute(
+                db.select(model.id, text_column)
+                .where(model.id > after_id)
+                .order_by(model.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            _index(db.session, backend, kind, [tuple(row) for row in rows])
+            db.session.commit()
+            after_id = rows[-1][0]
+            indexed[kind] += len(rows)
+
+        _unindex_missing(backend, kind, model)
+        if backend == "fts5":
+            name = _fts_table(kind).name
+            db.session.execute(db.text(f"INSERT INTO {name}({name}) VALUES ('optimize')"))
+        db.session.commit()
+    return indexed
+
+
+def _unindex_missing(backend, kind, model):
+    if backend == "fts5":
+        fts = _fts_table(kind)
+        db.session.execute(db.delete(fts).where(fts.c.rowid.not_in(db.select(model.id))))
+    else:
+        db.session.execute(
+            search_terms.delete().where(
+                search_terms.c.kind == kind,
+                search_terms.c.ref_id.not_in(db.select(model.id)),
+            )
+        )
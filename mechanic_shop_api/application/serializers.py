@@ -0,0 +1,206 @@
+import json
+from collections import defaultdict
+
+from flask import current_app, request
+from marshmallow import fields
+from sqlalchemy import inspect
+
+from application.extensions import db
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+class _ReprFloat(float):
+    # orjson and the stdlib disagree on exponent formatting outside this
+    # range (1e-05 vs 0.00001, 1e+16 vs 1e16). Wrapping such values in a
+    # float subclass makes orjson refuse them, and we fall back to the
+    # stdlib encoder, which formats subclasses exactly like float.
+    pass
+
+
+def _float(value):
+    if value is None:
+        return None
+    value = float(value)
+    if value != 0.0 and not 1e-4 <= abs(value) < 1e16:
+        return _ReprFloat(value)
+    return value
+
+
+class CompiledSchema:
+    """A marshmallow schema turned into a function over Core rows.
+
+    Dumping goes straight from ``select()`` rows to dicts with a generated
+    function, skipping ORM instances and marshmallow's per-field dispatch.
+    ``many=True`` nested fields are filled in with one extra query per field.
+    The output matches ``schema.dump`` for the supported field types.
+    """
+
+    def __init__(self, schema_class, only=None):
+        schema = schema_class(only=only)
+        model = schema.Meta.model
+        mapper = inspect(model)
+
+        self.schema_class = schema_class
+        self.only = only
+        self.model = model
+        self.columns = []
+        self.nested = []
+        self.keys = []
+        lines = []
+        for name, field in schema.dump_fields.items():
+            key = field.data_key or name
+            attribute = field.attribute or name
+            if isinstance(field, fields.Nested):
+                relationship = mapper.relationships[attribute]
+                if relationship.secondary is None or not field.many:
+                    raise TypeError(f"Cannot compile nested field {schema_class.__name__}.{name}")
+                self.nested.append((key, relationship, CompiledSchema(type(field.schema))))
+                continue
+
+            index = len(self.columns)
+            self.keys.append(key)
+            self.columns.append(mapper.columns[attribute])
+            if isinstance(field, fields.Float):
+                lines.append(f"        {key!r}: _float(row[{index}]),")
+            elif isinstance(field, (fields.Integer, fields.String)):
+                lines.append(f"        {key!r}: row[{index}],")
+            else:
+                raise TypeError(f"Cannot compile field {schema_class.__name__}.{name}")
+
+        self.keys.extend(key for key, _, _ in self.nested)
+        # Nested loading and keyset cursors need the primary key even when
+        # the field set leaves it out; it is selected but not dumped.
+        if mapper.primary_key[0] not in self.columns:
+            self.columns.append(mapper.primary_key[0])
+        self._pk_index = self.columns.index(mapper.primary_key[0])
+        self._variants = {}
+        self._schemas = {}
+        if only is None:
+            nested = {name for name, field in schema.dump_fields.items() if isinstance(field, fields.Nested)}
+            self.available_fields = (frozenset(schema.dump_fields), frozenset(nested))
+        source = "def dump_row(row):\n    return {\n" + "\n".join(lines) + "\n    }\n"
+        namespace = {"_float": _float}
+        exec(compile(source, f"<compiled {schema_class.__name__}>", "exec"), namespace)
+        self.dump_row = namespace["dump_row"]
+
+    def select(self):
+        return db.select(*self.columns)
+
+    def variant(self, only):
+        """The compiled schema limited to ``only``, built once per field set."""
+        if only is None or only == self.only:
+            return self
+        variant = self._variants.get(only)
+        if variant is None:
+            variant = CompiledSchema(self.schema_class, only)
+            variant.available_fields = self.available_fields
+            variant = self._variants.setdefault(only, variant)
+        return variant
+
+    def schema(self, many=False):
+        """The marshmallow schema for the same field set, built once."""
+        schema = self._schemas.get(many)
+        if schema is None:
+            schema = self._schemas.setdefault(many, self.schema_class(only=self.only, many=many))
+        return schema
+
+    @property
+    def relationships(self):
+        return [relationship for _, relationship, _ in self.nested]
+
+    def dump(self, rows):
+        items = [self.dump_row(row) for row in rows]
+        if self.nested and items:
+            ids = [row[self._pk_index] for row in rows]
+            for key, relationship, child in self.nested:
+                children = child.load_for(relationship, ids)
+                for item, parent_id in zip(items, ids):
+                    item[key] = children.get(parent_id, [])
+        return items
+
+    def load_for(self, relationship, parent_ids):
+        """Return ``{parent_id: [dumped child, ...]}`` for a many-to-many relationship."""
+        (_, parent_fk), = relationship.synchronize_pairs
+        statement = (
+            db.select(parent_fk, *self.columns)
+            .select_from(relationship.secondary)
+            .join(self.model.__table__, relationship.secondaryjoin)
+            .where(parent_fk.in_(parent_ids))
+        )
+        for clause in relationship.order_by or ():
+            statement = statement.order_by(clause)
+
+        grouped = defaultdict(list)
+        for row in db.session.execute(statement):
+            grouped[row[0]].append(self.dump_row(row[1:]))
+        return grouped
+
+
+def _field_list(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return {field.strip() for field in value.split(",") if field.strip()}
+
+
+def selected_schema(compiled):
+    """The variant of ``compiled`` for the request's ``?fields=`` and ``?include=``.
+
+    ``fields`` lists the top-level fields to return. ``include`` lists nested
+    fields to return; once either parameter is given, nested fields that are
+    not named in one of them are skipped, and so is the query that loads
+    them. Raises ValueError with a client-facing message for unknown names.
+    """
+    requested, include = _field_list("fields"), _field_list("include")
+    if requested is None and include is None:
+        return compiled
+
+    available, nested = compiled.available_fields
+    unknown = sorted((requested or set()) - available) + sorted((include or set()) - nested)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Available fields: {', '.join(sorted(available))}."
+        )
+
+    if requested is None:
+        requested = available - nested
+    only = tuple(sorted(requested | (include or set())))
+    if not only:
+        raise ValueError("fields must name at least one field.")
+    return compiled.variant(only)
+
+
+def dumps(data):
+    """Compact, key-sorted JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def fast_serialization_enabled():
+    return request.endpoint in current_app.config.get("FAST_SERIALIZATION_ENDPOINTS", ())
+
+
+def json_response(data, status=200):
+    """Same bytes as ``jsonify(data)``, encoded with orjson when it can be."""
+    provider = current_app.json
+    compact = provider.compact or (provider.compact is None and not current_app.debug)
+    if orjson is not None and compact and provider.sort_keys and provider.ensure_ascii:
+        try:
+            body = orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            body = None
+        if body is not None and body.isascii():
+            return current_app.response_class(body, status=status, mimetype=provider.mimetype)
+
+    response = provider.response(data)
+    response.status_code = status
+    return response
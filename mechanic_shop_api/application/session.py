@@ -0,0 +1,29 @@
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+
+
+class RoutingSession(Session):
+    """``db.session`` class that can send reads to a replica.
+
+    Anything that writes, whether a flush or an insert/update/delete
+    statement, pins the session to the primary for the rest of its life,
+    which is one request. The request therefore reads its own writes.
+    Otherwise the replica router registered on the app decides whether
+    the default bind is served by a replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_app_context():
+            return engine
+
+        if self._flushing or isinstance(clause, sa.UpdateBase):
+            self.info["use_primary"] = True
+        if self.info.get("use_primary"):
+            return engine
+
+        router = current_app.extensions.get("replicas")
+        if router is None or engine is not self._db.engines.get(None):
+            return engine
+        return router.engine_for(self) or engine
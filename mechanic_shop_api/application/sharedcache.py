@@ -0,0 +1,315 @@
+"""Response cache shared by every worker on a host, kept in a SQLite file.
+
+Select it with ``CACHE_TYPE = "application.sharedcache.SharedCache"``; the
+``cache = Cache()`` extension and the ``cached`` decorators need no change.
+With ``SimpleCache`` each gunicorn worker fills its own dict, so every
+worker misses once per entry and the memory is paid once per worker.
+Here all workers read and write one file at ``CACHE_SHARED_PATH``.
+
+* ``CACHE_MAX_BYTES`` is a budget for the stored values of all workers
+  together. A write that goes over it deletes expired entries first,
+  then the least recently used ones.
+* Values of ``CACHE_COMPRESS_THRESHOLD`` bytes or more are zlib-compressed
+  when that makes them smaller.
+* ``stats()`` reports this process's hits, misses and evictions together
+  with the shared entry count and size.
+
+Recency is approximate. A hit only rewrites ``accessed_at`` when the old
+value is more than ``touch_interval`` seconds old, so a hot entry costs
+one write per interval, not one per read.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from flask_caching.backends.base import BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    compressed INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at) WHERE expires_at > 0;
+CREATE TABLE IF NOT EXISTS cache_usage (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_usage (id, bytes) VALUES (1, 0);
+"""
+
+# Evict this many entries per query until the budget is met again.
+EVICTION_BATCH = 64
+
+
+class SharedCache(BaseCache):
+    def __init__(
+        self,
+        path,
+        default_timeout=300,
+        max_bytes=64 * 1024 * 1024,
+        compress_threshold=1024,
+        compress_level=6,
+        touch_interval=1.0,
+        busy_timeout=5.0,
+    ):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self.touch_interval = touch_interval
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.setdefault("path", config.get("CACHE_SHARED_PATH") or os.path.join(app.instance_path, "cache.db"))
+        kwargs.setdefault("max_bytes", config.get("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        kwargs.setdefault("compress_threshold", config.get("CACHE_COMPRESS_THRESHOLD", 1024))
+        cache = cls(*args, **kwargs)
+        cache.ignore_errors = config["CACHE_IGNORE_ERRORS"]
+        return cache
+
+    def _connection(self):
+        # One connection per thread and process, like the rate limit storage.
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # A cache can lose its last writes on power loss.
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, hits=0, misses=0, evictions=0):
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+            self._evictions += evictions
+
+    def _expires_at(self, timeout, now):
+        timeout = self._normalize_timeout(timeout)
+        return 0.0 if timeout == 0 else now + timeout
+
+    def _encode(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self.compress_threshold is not None and len(data) >= self.compress_threshold:
+            compressed = zlib.compress(data, self.compress_level)
+            if len(compressed) < len(data):
+                return compressed, True
+        return data, False
+
+    @staticmethod
+    def _decode(data, compressed):
+        return pickle.loads(zlib.decompress(data) if compressed else data)
+
+    # Reads
+
+    def _fetch(self, keys):
+        now = time.time()
+        connection = self._connection()
+        placeholders = ",".join("?" * len(keys))
+        rows = connection.execute(
+            f"SELECT key, value, compressed, expires_at, accessed_at FROM cache_entries "
+            f"WHERE key IN ({placeholders})",
+            keys,
+        ).fetchall()
+
+        found, stale = {}, []
+        for key, data, compressed, expires_at, accessed_at in rows:
+            if expires_at and expires_at <= now:
+                continue
+            found[key] = self._decode(data, compressed)
+            if now - accessed_at > self.touch_interval:
+                stale.append(key)
+        if stale:
+            connection.execute(
+                f"UPDATE cache_entries SET accessed_at = ? WHERE key IN ({','.join('?' * len(stale))})",
+                [now, *stale],
+            )
+        self._count(hits=len(found), misses=len(set(keys)) - len(found))
+        return found
+
+    def get(self, key):
+        return self._fetch([key]).get(key)
+
+    def get_many(self, *keys):
+        if not keys:
+            return []
+        found = self._fetch(list(keys))
+        return [found.get(key) for key in keys]
+
+    def has(self, key):
+        row = self._connection().execute(
+            "SELECT expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None and (not row[0] or row[0] > time.time())
+
+    # Writes
+
+    def _write(self, items, timeout, only_missing=False):
+        now = time.time()
+        expires_at = self._expires_at(timeout, now)
+        encoded = [(key, *self._encode(value)) for key, value in items]
+        written = []
+        with _Transaction(self._connection()) as connection:
+            delta = 0
+            for key, data, compressed in encoded:
+                row = connection.execute(
+                    "SELECT size, expires_at FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+                if only_missing and row is not None and (not row[1] or row[1] > now):
+                    continue
+                connection.execute(
+                    "INSERT INTO cache_entries (key, value, compressed, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                    "compressed = excluded.compressed, size = excluded.size, "
+                    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (key, data, int(compressed), len(data), expires_at, now),
+                )
+                delta += len(data) - (row[0] if row else 0)
+                written.append(key)
+            if delta:
+                connection.execute("UPDATE cache_usage SET bytes = bytes + ? WHERE id = 1", (delta,))
+            self._enforce_budget(connection, now, keep=set(written))
+        return written
+
+    def _enforce_budget(self, connection, now, keep=()):
+        used = connection.execute("SELECT bytes FROM cache_usage WHERE id = 1").fetchone()[0]
+        if used <= self.max_bytes:
+            return
+
+        freed = connection.execute(
+            "DELETE FROM cache_entries WHERE expires_at > 0 AND expires_at <= ? RETURNING size", (now,)
+        ).fetchall()
+        used -= sum(size for size, in freed)
+
+        evicted = 0
+        while used > self.max_bytes:
+            victims = connection.execute(
+                "SELECT key, size FROM cache_entries ORDER BY accessed_at LIMIT ?",
+                (EVICTION_BATCH + len(keep),),
+            ).fetchall()
+            victims = [(key, size) for key, size in victims if key not in keep]
+            if not victims:
+                break
+            for key, size in victims:
+                if used <= self.max_bytes:
+                    break
+                connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                used -= size
+                evicted += 1
+
+        connection.execute("UPDATE cache_usage SET bytes = ? WHERE id = 1", (max(used, 0),))
+        self._count(evictions=evicted)
+
+    def set(self, key, value, timeout=None):
+        self._write([(key, value)], timeout)
+        return True
+
+    def set_many(self, mapping, timeout=None):
+        return self._write(list(mapping.items()), timeout)
+
+    def add(self, key, value, timeout=None):
+        return bool(self._write([(key, value)], timeout, only_missing=True))
+
+    def delete(self, key):
+        return bool(self.delete_many(key))
+
+    def delete_many(self, *keys):
+        if not keys:
+            return []
+        with _Transaction(self._connection()) as connection:
+            deleted = connection.execute(
+                f"DELETE FROM cache_entries WHERE key IN ({','.join('?' * len(keys))}) RETURNING key, size",
+                keys,
+            ).fetchall()
+            freed = sum(size for _, size in deleted)
+            if freed:
+                connection.execute("UPDATE cache_usage SET bytes = bytes - ? WHERE id = 1", (freed,))
+        return [key for key, _ in deleted]
+
+    def clear(self):
+        with _Transaction(self._connection()) as connection:
+            connection.execute("DELETE FROM cache_entries")
+            connection.execute("UPDATE cache_usage SET bytes = 0 WHERE id = 1")
+        return True
+
+    def _increment(self, key, delta, create):
+        with _Transaction(self._connection()) as connection:
+            row = connection.execute(
+                "SELECT value, compressed, size, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            alive = row is not None and (not row[3] or row[3] > now)
+            if not alive and not create:
+                return None
+            value = (self._decode(row[0], row[1]) if alive else 0) + delta
+            data, compressed = self._encode(value)
+            # Like the other backends, an existing counter keeps its expiry.
+            expires_at = row[3] if alive else self._expires_at(None, now)
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, compressed, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data, int(compressed), len(data), expires_at, now),
+            )
+            connection.execute(
+                "UPDATE cache_usage SET bytes = bytes + ? WHERE id = 1", (len(data) - (row[2] if row else 0),)
+            )
+        return value
+
+    def inc(self, key, delta=1):
+        return self._increment(key, delta, create=True)
+
+    def inc_existing(self, key, delta=1):
+        """Like ``inc``, but a missing or expired key stays missing and None is returned.
+
+        The check and the write share one transaction, so a counter that
+        expires meanwhile is never recreated as just ``delta``.
+        """
+        return self._increment(key, delta, create=False)
+
+    def dec(self, key, delta=1):
+        return self.inc(key, -delta)
+
+    def stats(self):
+        """This process's hits, misses and evictions; entries and bytes are shared."""
+        entries, = self._connection().execute("SELECT count(*) FROM cache_entries").fetchone()
+        used, = self._connection().execute("SELECT bytes FROM cache_usage WHERE id = 1").fetchone()
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": entries,
+                "bytes": used,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class _Transaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        # Take the write lock up front so the size accounting cannot race.
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -0,0 +1,125 @@
+"""Single-flight recomputation of cached views.
+
+When a write changes a table's generation, every cached view of that table
+misses at once, and without coordination each concurrent request reruns
+the same queries. Put ``single_flight`` under ``versioned_cached`` to let
+one caller per cache key recompute while the others wait::
+
+    @customer_bp.route("/", methods=["GET"])
+    @versioned_cached("customers")
+    @single_flight
+    def get_customers():
+        ...
+
+Within a worker, waiting threads block on the leader's event. Across
+workers the leader holds a lock entry in the cache, added with
+``cache.add`` so that exactly one process wins. It expires after
+``SINGLE_FLIGHT_LOCK_TIMEOUT`` seconds in case that process dies. With the
+shared cache backend this coordinates every worker on the host; with a
+per-process cache it only coordinates threads.
+
+While the leader works, a waiter returns the last response for the same
+URL if one was stored within ``SINGLE_FLIGHT_STALE_TTL`` seconds
+(stale-while-revalidate). Otherwise it waits up to
+``SINGLE_FLIGHT_WAIT_TIMEOUT`` seconds for the new entry, and after that
+computes the response itself.
+"""
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g
+
+from application.caching import request_cache_key, should_cache
+from application.extensions import cache
+
+LOCK_KEY = "single-flight/%s"
+STALE_KEY = "stale/%s"
+
+
+class SingleFlight:
+    def __init__(self):
+        self.wait_timeout = 10.0
+        self.lock_timeout = 30
+        self.poll_interval = 0.05
+        self.stale_ttl = 30
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.wait_timeout = app.config.get("SINGLE_FLIGHT_WAIT_TIMEOUT", self.wait_timeout)
+        self.lock_timeout = app.config.get("SINGLE_FLIGHT_LOCK_TIMEOUT", self.lock_timeout)
+        self.poll_interval = app.config.get("SINGLE_FLIGHT_POLL_INTERVAL", self.poll_interval)
+        self.stale_ttl = app.config.get("SINGLE_FLIGHT_STALE_TTL", self.stale_ttl)
+
+    def run(self, key, compute):
+        """Return ``compute()`` for ``key``, computing it at most once at a time."""
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            return self._follow(key, compute, lambda: event.wait(self.wait_timeout))
+
+        try:
+            if cache.add(LOCK_KEY % key, os.getpid(), timeout=self.lock_timeout):
+                try:
+                    return self._lead(key, compute)
+                finally:
+                    cache.delete(LOCK_KEY % key)
+            # Another worker is recomputing; this thread polls for the whole process.
+            return self._follow(key, compute, lambda: self._poll(key))
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def _lead(self, key, compute):
+        rv = compute()
+        if should_cache(rv):
+            cache.set(key, rv, timeout=g.get("cache_timeout"))
+            if self.stale_ttl:
+                cache.set(STALE_KEY % request_cache_key(), rv, timeout=self.stale_ttl)
+        g.cache_handled = True
+        return rv
+
+    def _follow(self, key, compute, wait):
+        if self.stale_ttl:
+            stale = cache.get(STALE_KEY % request_cache_key())
+            if stale is not None:
+                g.cache_handled = True
+                # The current ETag does not describe this older body.
+                g.served_stale = True
+                return stale
+        wait()
+        rv = cache.get(key)
+        if rv is not None:
+            g.cache_handled = True
+            return rv
+        # The leader failed or its response was not cacheable.
+        return compute()
+
+    def _poll(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            if cache.has(key) or not cache.has(LOCK_KEY % key):
+                return
+            time.sleep(self.poll_interval)
+
+
+def single_flight(view_func):
+    """Let one caller per cache key recompute a ``versioned_cached`` view."""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        key = g.get("cache_key")
+        if key is None:
+            return view_func(*args, **kwargs)
+        return coalescer.run(key, lambda: view_func(*args, **kwargs))
+
+    return wrapper
+
+
+coalescer = SingleFlight()
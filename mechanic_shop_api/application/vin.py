@@ -0,0 +1,38 @@
+"""Vehicle identification numbers.
+
+VINs are stored uppercased and trimmed, so that lookups are plain
+comparisons against the ``(vin, id)`` index and never need
+``upper()`` or a case-insensitive collation. VINs never contain I, O or Q
+(they would be confused with 1 and 0), so those are rejected rather than
+silently stored.
+"""
+
+VIN_LENGTH = 17
+VIN_CHARS = frozenset("ABCDEFGHJKLMNPRSTUVWXYZ0123456789")
+
+
+def normalize_vin(value, partial=False):
+    """Return ``value`` uppercased and trimmed, or raise ValueError if it is not a VIN.
+
+    With ``partial=True`` any non-empty prefix of a VIN is accepted.
+    """
+    if not isinstance(value, str):
+        raise ValueError("VIN must be a string.")
+    vin = value.strip().upper()
+    if not vin:
+        raise ValueError("VIN must not be empty.")
+    if not VIN_CHARS.issuperset(vin):
+        raise ValueError("VIN may only contain digits and the letters A-Z except I, O and Q.")
+    if len(vin) > VIN_LENGTH or (not partial and len(vin) != VIN_LENGTH):
+        raise ValueError(f"VIN must be {VIN_LENGTH} characters.")
+    return vin
+
+
+def vin_prefix_range(prefix):
+    """``(low, high)`` such that a VIN starts with ``prefix`` iff ``low <= vin < high``.
+
+    A range, unlike LIKE, uses the index on every backend whatever the
+    collation.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
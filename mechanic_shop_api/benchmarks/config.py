@@ -0,0 +1,11 @@
+import os
+
+from config import Config, basedir
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        "BENCHMARK_DATABASE_URL",
+        f"sqlite:///{os.path.join(basedir, 'bench.db')}",
+    )
+    RATELIMIT_ENABLED = False
@@ -0,0 +1,73 @@
+"""Measure what a rate limit adds to each request, per storage backend.
+
+Two otherwise identical views are timed through the test client, one
+without a limit and one with a limit high enough never to trip. Their
+mean difference is the cost of the limit check:
+
+* ``memory``: Flask-Limiter's per-process storage (not shared by workers)
+* ``sqlite``: ``application.ratelimit.SQLiteStorage`` on a fresh file
+
+    python -m benchmarks.ratelimit --requests 5000
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+STORAGES = ("memory", "sqlite")
+
+
+def _app(storage, tmp):
+    from application import create_app
+    from application.extensions import limiter
+    from benchmarks.config import BenchmarkConfig
+
+    uri = "memory://" if storage == "memory" else f"sqlite:///{os.path.join(tmp, 'ratelimit.db')}"
+    config = type("RateLimitConfig", (BenchmarkConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        "RATELIMIT_ENABLED": True,
+        "RATELIMIT_STORAGE_URI": uri,
+        "CACHE_TYPE": "NullCache",
+    })
+    app = create_app(config)
+    app.logger.disabled = True
+    logging.getLogger("werkzeug").disabled = True
+
+    @app.route("/bench/plain")
+    def plain():
+        return {}
+
+    @app.route("/bench/limited")
+    @limiter.limit("1000000000 per minute")
+    def limited():
+        return {}
+
+    return app
+
+
+def _mean_us(client, path, requests):
+    for _ in range(min(requests, 200)):
+        client.get(path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    print(f"{'storage':8} {'plain':>10} {'limited':>10} {'overhead':>10}")
+    for storage in STORAGES:
+        with tempfile.TemporaryDirectory() as tmp:
+            client = _app(storage, tmp).test_client()
+            plain = _mean_us(client, "/bench/plain", args.requests)
+            limited = _mean_us(client, "/bench/limited", args.requests)
+        print(f"{storage:8} {plain:>8.1f}us {limited:>8.1f}us {limited - plain:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
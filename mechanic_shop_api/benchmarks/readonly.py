@@ -0,0 +1,133 @@
+"""Compare ORM and read-only loading of a large inventory table.
+
+Each mode runs in its own process so peak RSS is measured in isolation:
+
+* ``orm``: ``select(Inventory)`` instances dumped by marshmallow
+* ``readonly``: column rows as ``__slots__`` records dumped by marshmallow
+* ``readonly-compiled``: column rows dumped by the compiled serializer
+
+    python -m benchmarks.readonly --rows 100000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("orm", "readonly", "readonly-compiled")
+
+
+def _peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _seed(rows):
+    from application import create_app
+    from application.extensions import db
+    from application.models import Inventory
+    from benchmarks.config import BenchmarkConfig
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        chunk = 10000
+        for start in range(0, rows, chunk):
+            db.session.execute(
+                Inventory.__table__.insert(),
+                [
+                    {"id": i, "name": f"Part {i}", "price": round(5 + (i % 9950) / 20, 2)}
+                    for i in range(start + 1, min(start + chunk, rows) + 1)
+                ],
+            )
+        db.session.commit()
+
+
+def _run_mode(mode, iterations):
+    from application import create_app
+    from application.blueprints.inventory.schemas import (
+        compiled_inventory_schema,
+        inventories_schema,
+    )
+    from application.extensions import db
+    from application.models import Inventory
+    from application.readonly import as_records, fetch_all
+    from benchmarks.config import BenchmarkConfig
+
+    app = create_app(BenchmarkConfig)
+    columns = compiled_inventory_schema.columns
+    start_rss = _peak_rss_mb()
+    latencies = []
+    with app.app_context():
+        for _ in range(iterations):
+            start = time.perf_counter()
+            if mode == "orm":
+                items = db.session.scalars(db.select(Inventory).order_by(Inventory.id)).all()
+                data = inventories_schema.dump(items)
+            else:
+                rows = fetch_all(columns, order_by=Inventory.id)
+                if mode == "readonly":
+                    data = inventories_schema.dump(as_records(columns, rows))
+                else:
+                    data = compiled_inventory_schema.dump(rows)
+            latencies.append(time.perf_counter() - start)
+            count = len(data)
+            del data
+            db.session.remove()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rows": count,
+        "median_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "min_ms": round(latencies[0] * 1000, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rss_growth_mb": round(_peak_rss_mb() - start_rss, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--seed-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.seed_only:
+        _seed(args.rows)
+        return
+    if args.child:
+        print(json.dumps(_run_mode(args.child, args.iterations)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, BENCHMARK_DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'readonly.db')}")
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.readonly", "--seed-only", "--rows", str(args.rows)],
+            env=env, check=True,
+        )
+        results = []
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.readonly", "--child", mode,
+                 "--iterations", str(args.iterations)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'mode':20} {'rows':>8} {'median':>10} {'min':>10} {'peak RSS':>10} {'RSS growth':>11}")
+    for r in results:
+        print(
+            f"{r['mode']:20} {r['rows']:>8} {r['median_ms']:>8.1f}ms {r['min_ms']:>8.1f}ms "
+            f"{r['peak_rss_mb']:>8.1f}MB {r['rss_growth_mb']:>9.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""Drive every blueprint route under load and compare against a baseline.
+
+Requests go through the Flask test client by default, or to a running
+server (for example a local gunicorn) with ``--url``. Each route gets
+``--requests`` calls at ``--concurrency`` and reports p50/p95/p99 latency,
+throughput and SQL statements per request.
+
+    python -m benchmarks.seed --customers 10000 --tickets 100000
+    python -m benchmarks.run --concurrency 8 --output results.json --baseline baseline.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from application import create_app
+from application.auth import encode_token
+from application.extensions import db
+from application.models import Customer, Inventory, Mechanic, ServiceTicket
+from benchmarks.config import BenchmarkConfig
+from benchmarks.seed import BENCHMARK_PASSWORD, PARTS, VIN_CHARS
+
+_local = threading.local()
+# Ids this close to the next one deleted may be gone by the time a request lands.
+LIVE_ID_MARGIN = 256
+EXPORT_WINDOW = 1000
+# Rows per call for the bulk routes.
+BULK_SIZE = 10
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    _local.statements = getattr(_local, "statements", 0) + 1
+
+
+class Dataset:
+    """Id ranges of the seeded tables plus counters for ids a route consumes."""
+
+    def __init__(self, app, random_seed):
+        with app.app_context():
+            self.customers = db.session.scalar(db.select(db.func.max(Customer.id))) or 0
+            self.mechanics = db.session.scalar(db.select(db.func.max(Mechanic.id))) or 0
+            self.parts = db.session.scalar(db.select(db.func.max(Inventory.id))) or 0
+            self.tickets = db.session.scalar(db.select(db.func.max(ServiceTicket.id))) or 0
+        if not (self.customers and self.mechanics and self.parts and self.tickets):
+            raise SystemExit("Benchmark database is empty, run `python -m benchmarks.seed` first.")
+
+        self._app = app
+        self._lock = threading.Lock()
+        self._rng = random.Random(random_seed)
+        self._serial = itertools.count(1)
+        # Deletes walk down from the top of each table so every call hits a real row.
+        self._deletable = {
+            "customers": self.customers,
+            "mechanics": self.mechanics,
+            "parts": self.parts,
+        }
+        # (ticket, part) links made by add-part, for remove-part to take back.
+        self._added_parts = []
+
+    def randint(self, upper):
+        with self._lock:
+            return self._rng.randint(1, upper)
+
+    def serial(self):
+        with self._lock:
+            return next(self._serial)
+
+    def next_deletable(self, table):
+        with self._lock:
+            row_id = self._deletable[table]
+            self._deletable[table] -= 1
+            return row_id
+
+    def live_id(self, table):
+        """A random id that deletes have not reached, for rows other writes point at."""
+        with self._lock:
+            # Leave a margin for deletes already handed out but still in flight.
+            return self._rng.randint(1, max(1, self._deletable[table] - LIVE_ID_MARGIN))
+
+    def add_part(self):
+        with self._lock:
+            pair = self._rng.randint(1, self.tickets), self._rng.randint(1, self.parts)
+            self._added_parts.append(pair)
+            return pair
+
+    def take_added_part(self):
+        """A link add-part made, or a random pair once they run out."""
+        with self._lock:
+            if self._added_parts:
+                return self._added_parts.pop()
+            return self._rng.randint(1, self.tickets), self._rng.randint(1, self.parts)
+
+    def auth_headers(self, customer_id):
+        with self._app.app_context():
+            return {"Authorization": f"Bearer {encode_token(customer_id)}"}
+
+
+def _update_customer(data):
+    customer_id = data.randint(data.customers)
+    return f"/customers/{customer_id}", {"phone": "555-0000"}, data.auth_headers(customer_id)
+
+
+def _export(resource, upper, export_format="ndjson"):
+    # A window of EXPORT_WINDOW rows, so each call streams a bounded slice.
+    def build(data):
+        after_id = data.randint(max(1, upper(data) - EXPORT_WINDOW)) - 1
+        return (
+            f"/{resource}/export?format={export_format}&after_id={after_id}&max_id={after_id + EXPORT_WINDOW}",
+            None,
+            None,
+        )
+
+    return build
+
+
+def _add_part(data):
+    ticket_id, inventory_id = data.add_part()
+    return f"/service-tickets/{ticket_id}/add-part/{inventory_id}", None, None
+
+
+def _remove_part(data):
+    ticket_id, inventory_id = data.take_added_part()
+    return f"/service-tickets/{ticket_id}/remove-part/{inventory_id}", None, None
+
+
+def _vin_prefix(data):
+    # Seeded VINs are random, so a three-character prefix matches a handful of tickets.
+    prefix = "".join(VIN_CHARS[data.randint(len(VIN_CHARS)) - 1] for _ in range(3))
+    return f"/service-tickets/by-vin/{prefix}", None, None
+
+
+def _delete_customer(data):
+    customer_id = data.next_deletable("customers")
+    return f"/customers/{customer_id}", None, data.auth_headers(customer_id)
+
+
+SCENARIOS = [
+    ("POST", "/customers/", lambda d: ("/customers/", {
+        "name": "Bench Customer",
+        "email": f"bench-customer-{os.getpid()}-{d.serial()}@example.com",
+        "password": BENCHMARK_PASSWORD,
+    }, None)),
+    ("POST", "/customers/bulk", lambda d: ("/customers/bulk", [{
+        "name": "Bench Customer",
+        "email": f"bench-customer-{os.getpid()}-{d.serial()}@example.com",
+        "password": BENCHMARK_PASSWORD,
+    } for _ in range(BULK_SIZE)], None)),
+    ("GET", "/customers/", lambda d: (f"/customers/?page={d.randint(100)}", None, None)),
+    ("GET", "/customers/<int:customer_id>", lambda d: (f"/customers/{d.randint(d.customers)}", None, None)),
+    ("PUT", "/customers/<int:customer_id>", _update_customer),
+    ("DELETE", "/customers/<int:customer_id>", _delete_customer),
+    ("POST", "/customers/login", lambda d: ("/customers/login", {
+        "email": f"customer{d.randint(d.customers)}@example.com",
+        "password": BENCHMARK_PASSWORD,
+    }, None)),
+    ("GET", "/customers/my-tickets", lambda d: (
+        "/customers/my-tickets", None, d.auth_headers(d.randint(d.customers))
+    )),
+    ("GET", "/customers/export", _export("customers", lambda d: d.customers)),
+    ("POST", "/mechanics/", lambda d: ("/mechanics/", {
+        "name": "Bench Mechanic",
+        "email": f"bench-mechanic-{os.getpid()}-{d.serial()}@example.com",
+    }, None)),
+    ("POST", "/mechanics/bulk", lambda d: ("/mechanics/bulk", [{
+        "name": "Bench Mechanic",
+        "email": f"bench-mechanic-{os.getpid()}-{d.serial()}@example.com",
+    } for _ in range(BULK_SIZE)], None)),
+    ("GET", "/mechanics/", lambda d: ("/mechanics/", None, None)),
+    ("GET", "/mechanics/by-tickets", lambda d: ("/mechanics/by-tickets", None, None)),
+    ("GET", "/mechanics/export", _export("mechanics", lambda d: d.mechanics)),
+    ("PUT", "/mechanics/<int:mechanic_id>", lambda d: (
+        f"/mechanics/{d.randint(d.mechanics)}", {"salary": 65000.0}, None
+    )),
+    ("DELETE", "/mechanics/<int:mechanic_id>", lambda d: (
+        f"/mechanics/{d.next_deletable('mechanics')}", None, None
+    )),
+    ("POST", "/service-tickets/", lambda d: ("/service-tickets/", {
+        "description": "Bench ticket",
+        "vin": "1HGCM82633A123456",
+        "customer_id": d.live_id("customers"),
+    }, None)),
+    ("POST", "/service-tickets/bulk", lambda d: ("/service-tickets/bulk", [{
+        "description": "Bench ticket",
+        "vin": "1HGCM82633A123456",
+        "customer_id": d.live_id("customers"),
+    } for _ in range(BULK_SIZE)], None)),
+    ("GET", "/service-tickets/", lambda d: ("/service-tickets/", None, None)),
+    ("GET", "/service-tickets/by-vin/<vin>", _vin_prefix),
+    ("GET", "/service-tickets/export", _export("service-tickets", lambda d: d.tickets, "csv")),
+    ("PUT", "/service-tickets/<int:ticket_id>/assign-mechanic/<int:mechanic_id>", lambda d: (
+        f"/service-tickets/{d.randint(d.tickets)}/assign-mechanic/{d.randint(d.mechanics)}", None, None
+    )),
+    ("PUT", "/service-tickets/<int:ticket_id>/remove-mechanic/<int:mechanic_id>", lambda d: (
+        f"/service-tickets/{d.randint(d.tickets)}/remove-mechanic/{d.randint(d.mechanics)}", None, None
+    )),
+    ("PUT", "/service-tickets/<int:ticket_id>/edit", lambda d: (
+        f"/service-tickets/{d.randint(d.tickets)}/edit",
+        {"add_ids": [d.randint(d.mechanics)], "remove_ids": [d.randint(d.mechanics)]},
+        None,
+    )),
+    ("PUT", "/service-tickets/bulk-edit", lambda d: ("/service-tickets/bulk-edit", {
+        "ticket_ids": [d.randint(d.tickets) for _ in range(BULK_SIZE)],
+        "add_ids": [d.live_id("mechanics")],
+        "remove_ids": [d.live_id("mechanics")],
+    }, None)),
+    ("PUT", "/service-tickets/<int:ticket_id>/add-part/<int:inventory_id>", _add_part),
+    ("PUT", "/service-tickets/<int:ticket_id>/remove-part/<int:inventory_id>", _remove_part),
+    ("POST", "/inventory/", lambda d: ("/inventory/", {"name": "Bench Part", "price": 9.99}, None)),
+    ("POST", "/inventory/bulk", lambda d: (
+        "/inventory/bulk", [{"name": "Bench Part", "price": 9.99}] * BULK_SIZE, None
+    )),
+    ("GET", "/inventory/", lambda d: ("/inventory/", None, None)),
+    ("GET", "/inventory/<int:inventory_id>", lambda d: (f"/inventory/{d.randint(d.parts)}", None, None)),
+    ("GET", "/inventory/export", _export("inventory", lambda d: d.parts)),
+    ("PUT", "/inventory/<int:inventory_id>", lambda d: (
+        f"/inventory/{d.randint(d.parts)}", {"price": 19.99}, None
+    )),
+    # A dry run plans a whole price sheet without changing the prices other routes read.
+    ("POST", "/inventory/reprice", lambda d: ("/inventory/reprice?dry_run=true", {
+        "prices": {str(d.live_id("parts")): 24.99 for _ in range(BULK_SIZE)},
+        "rules": [{
+            "match": f"{PARTS[d.randint(len(PARTS)) - 1].split()[0]}*",
+            "markup_percent": 5,
+            "ending": 0.99,
+        }],
+    }, None)),
+    ("DELETE", "/inventory/<int:inventory_id>", lambda d: (
+        f"/inventory/{d.next_deletable('parts')}", None, None
+    )),
+    ("GET", "/search/", lambda d: (
+        f"/search/?q={PARTS[d.randint(len(PARTS)) - 1].split()[0].lower()}", None, None
+    )),
+]
+
+
+def missing_scenarios(app):
+    """Blueprint routes with no entry in SCENARIOS, as ``"METHOD rule"`` strings."""
+    covered = {(method, rule) for method, rule, _ in SCENARIOS}
+    missing = set()
+    for url_rule in app.url_map.iter_rules():
+        blueprint = url_rule.endpoint.rpartition(".")[0]
+        # Swagger UI is vendored, not one of the API's blueprints.
+        if not blueprint or blueprint == "swagger_ui":
+            continue
+        for method in url_rule.methods - {"HEAD", "OPTIONS"}:
+            if (method, url_rule.rule) not in covered:
+                missing.add(f"{method} {url_rule.rule}")
+    return sorted(missing)
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+        if not event.contains(Engine, "before_cursor_execute", _count_statement):
+            event.listen(Engine, "before_cursor_execute", _count_statement)
+
+    def request(self, method, path, body, headers):
+        _local.statements = 0
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        response.get_data()
+        return response.status_code, _local.statements
+
+
+class HTTPTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body, headers):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        for key, value in (headers or {}).items():
+            request.add_header(key, value)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, None
+
+    def scrape(self):
+        with urllib.request.urlopen(self.base_url + "/metrics") as response:
+            return response.read().decode()
+
+    def statements_per_request(self, method, rule, before, after):
+        def totals(text, name):
+            pattern = re.compile(
+                rf'^{name}\{{method="{re.escape(method)}",route="{re.escape(rule)}"[^}}]*\}} (\S+)$',
+                re.MULTILINE,
+            )
+            return sum(float(value) for value in pattern.findall(text))
+
+        statements = totals(after, "http_request_sql_statements_total") - totals(
+            before, "http_request_sql_statements_total"
+        )
+        requests = totals(after, "http_requests_total") - totals(before, "http_requests_total")
+        return statements / requests if requests else 0.0
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_scenario(transport, data, method, rule, build, requests, concurrency):
+    latencies = []
+    errors = 0
+    statements = 0
+    lock = threading.Lock()
+
+    def one_call(_):
+        nonlocal errors, statements
+        path, body, headers = build(data)
+        start = time.perf_counter()
+        status, count = transport.request(method, path, body, headers)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if status >= 400:
+                errors += 1
+            statements += count or 0
+
+    before = transport.scrape() if isinstance(transport, HTTPTransport) else None
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_call, range(requests)))
+    wall = time.perf_counter() - wall_start
+
+    if isinstance(transport, HTTPTransport):
+        queries = transport.statements_per_request(method, rule, before, transport.scrape())
+    else:
+        queries = statements / len(latencies) if latencies else 0.0
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "queries_per_request": round(queries, 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against ``baseline``."""
+    regressions = []
+    for name, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"
+            )
+        if current["queries_per_request"] > previous["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries/request {previous['queries_per_request']} -> "
+                f"{current['queries_per_request']}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Benchmark a running server instead of the test client")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--route", action="append", help="Only run routes containing this text")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown (0.2 = 20%%)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    app = create_app(BenchmarkConfig)
+    missing = missing_scenarios(app)
+    if missing:
+        raise SystemExit("Routes without a benchmark scenario:\n  " + "\n  ".join(missing))
+    data = Dataset(app, args.seed)
+    transport = HTTPTransport(args.url) if args.url else TestClientTransport(app)
+
+    results = {
+        "meta": {
+            "target": args.url or "test-client",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+            "customers": data.customers,
+            "tickets": data.tickets,
+        },
+        "routes": {},
+    }
+    for method, rule, build in SCENARIOS:
+        name = f"{method} {rule}"
+        if args.route and not any(text in name for text in args.route):
+            continue
+        results["routes"][name] = stats = run_scenario(
+            transport, data, method, rule, build, args.requests, args.concurrency
+        )
+        print(
+            f"{name:75} p50={stats['p50_ms']:>9.2f}ms p95={stats['p95_ms']:>9.2f}ms "
+            f"p99={stats['p99_ms']:>9.2f}ms {stats['throughput_rps']:>8.1f} req/s "
+            f"{stats['queries_per_request']:>7.1f} q/req"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Bulk-seed a realistic dataset for the benchmark suite.
+
+Rows are generated deterministically from ``--seed`` and written with Core
+executemany inserts in fixed-size chunks, so a million tickets load in
+seconds rather than going through the ORM unit of work one object at a time.
+
+    python -m benchmarks.seed --customers 100000 --tickets 1000000
+"""
+import argparse
+import random
+import string
+import time
+
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+from application import create_app
+from application.counters import rebuild_mechanic_ticket_counts, rebuild_parts_totals
+from application.extensions import db
+from application.models import (
+    Customer,
+    Inventory,
+    Mechanic,
+    ServiceTicket,
+    service_ticket_inventory,
+    service_ticket_mechanic,
+)
+from application.search import rebuild_search_index
+from benchmarks.config import BenchmarkConfig
+
+BENCHMARK_PASSWORD = "benchmark-password"
+CHUNK_SIZE = 10000
+VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+PARTS = (
+    "Oil Filter", "Air Filter", "Cabin Filter", "Brake Pads", "Brake Rotor",
+    "Spark Plug", "Wiper Blade", "Serpentine Belt", "Timing Belt", "Battery",
+    "Alternator", "Starter Motor", "Radiator Hose", "Thermostat", "Water Pump",
+)
+
+
+def _insert_chunked(table, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+
+
+def _vin(rng):
+    return "".join(rng.choice(VIN_CHARS) for _ in range(17))
+
+
+def seed(customers=100000, tickets=1000000, mechanics=500, parts=5000,
+         mechanics_per_ticket=2, parts_per_ticket=3, random_seed=42, echo=print):
+    rng = random.Random(random_seed)
+    # Hashing once keeps seeding fast; every customer can log in with
+    # BENCHMARK_PASSWORD using the app's configured method.
+    password_hash = generate_password_hash(
+        BENCHMARK_PASSWORD, method=current_app.config["PASSWORD_HASH_METHOD"]
+    )
+
+    steps = [
+        ("customers", Customer.__table__, (
+            {
+                "id": i,
+                "name": f"Customer {i}",
+                "email": f"customer{i}@example.com",
+                "password": password_hash,
+                "phone": f"555-{i % 10000:04d}",
+                "address": f"{i} {rng.choice(string.ascii_uppercase)} Street",
+            }
+            for i in range(1, customers + 1)
+        )),
+        ("mechanics", Mechanic.__table__, (
+            {
+                "id": i,
+                "name": f"Mechanic {i}",
+                "email": f"mechanic{i}@example.com",
+                "phone": f"555-{i % 10000:04d}",
+                "address": f"{i} Garage Way",
+                "salary": round(rng.uniform(40000, 90000), 2),
+            }
+            for i in range(1, mechanics + 1)
+        )),
+        ("inventory", Inventory.__table__, (
+            {
+                "id": i,
+                "name": f"{rng.choice(PARTS)} #{i}",
+                "price": round(rng.uniform(5, 500), 2),
+            }
+            for i in range(1, parts + 1)
+        )),
+        ("service tickets", ServiceTicket.__table__, (
+            {
+                "id": i,
+                "description": f"{rng.choice(PARTS)} replacement",
+                "vin": _vin(rng),
+                "customer_id": rng.randint(1, customers),
+            }
+            for i in range(1, tickets + 1)
+        )),
+        ("ticket mechanics", service_ticket_mechanic, (
+            {"service_ticket_id": ticket_id, "mechanic_id": mechanic_id}
+            for ticket_id in range(1, tickets + 1)
+            for mechanic_id in rng.sample(range(1, mechanics + 1), min(mechanics_per_ticket, mechanics))
+        )),
+        ("ticket parts", service_ticket_inventory, (
+            {"service_ticket_id": ticket_id, "inventory_id": inventory_id}
+            for ticket_id in range(1, tickets + 1)
+            for inventory_id in rng.sample(range(1, parts + 1), min(parts_per_ticket, parts))
+        )),
+    ]
+
+    db.drop_all()
+    db.create_all()
+    for label, table, rows in steps:
+        start = time.perf_counter()
+        _insert_chunked(table, rows)
+        db.session.commit()
+        echo(f"seeded {label} in {time.perf_counter() - start:.1f}s")
+
+    # Core inserts skip the ORM events that maintain the derived columns.
+    start = time.perf_counter()
+    rebuild_mechanic_ticket_counts()
+    echo(f"computed mechanic ticket counts in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    rebuild_parts_totals()
+    echo(f"computed ticket parts totals in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    rebuild_search_index(current_app.config["SEARCH_REINDEX_BATCH_SIZE"])
+    echo(f"indexed search documents in {time.perf_counter() - start:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--tickets", type=int, default=1000000)
+    parser.add_argument("--mechanics", type=int, default=500)
+    parser.add_argument("--parts", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        seed(
+            customers=args.customers,
+            tickets=args.tickets,
+            mechanics=args.mechanics,
+            parts=args.parts,
+            random_seed=args.seed,
+        )
+
+
+if __name__ == "__main__":
+    main()
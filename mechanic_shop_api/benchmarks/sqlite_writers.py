@@ -0,0 +1,121 @@
+"""Compare SQLite write throughput with and without the connection pragmas.
+
+Each profile gets a fresh database file and ``--writers`` processes (like
+gunicorn workers) that all start at the same moment and each send
+``--writes`` ``POST /inventory/`` requests through the test client:
+
+* ``rollback-journal``: no pragmas, SQLite's defaults (DELETE journal,
+  synchronous=FULL, pysqlite's 5s busy timeout)
+* ``tuned``: the ``Config`` defaults (WAL, synchronous=NORMAL, busy_timeout,
+  mmap and cache size)
+
+    python -m benchmarks.sqlite_writers --writers 8 --writes 200
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = {
+    "rollback-journal": {
+        "SQLITE_JOURNAL_MODE": None,
+        "SQLITE_SYNCHRONOUS": None,
+        "SQLITE_BUSY_TIMEOUT_MS": None,
+        "SQLITE_MMAP_SIZE": None,
+        "SQLITE_CACHE_SIZE": None,
+    },
+    "tuned": {},
+}
+
+
+def _app(profile):
+    from application import create_app
+    from benchmarks.config import BenchmarkConfig
+
+    config = type("ProfileConfig", (BenchmarkConfig,), PROFILES[profile])
+    return create_app(config)
+
+
+def _run_writer(profile, writer, writes, start_at):
+    app = _app(profile)
+    app.logger.disabled = True
+    logging.getLogger("werkzeug").disabled = True
+    client = app.test_client()
+
+    time.sleep(max(0.0, start_at - time.time()))
+    latencies = []
+    errors = 0
+    for i in range(writes):
+        start = time.perf_counter()
+        response = client.post("/inventory/", json={"name": f"Part {writer}-{i}", "price": 9.99})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 201:
+            errors += 1
+    return {"latencies": latencies, "errors": errors, "finished_at": time.time()}
+
+
+def _run_profile(profile, writers, writes, tmp):
+    env = dict(os.environ, BENCHMARK_DATABASE_URL=f"sqlite:///{os.path.join(tmp, profile + '.db')}")
+    # create_app creates the tables; do it once before the writers race.
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.sqlite_writers", "--child", profile, "--writes", "0"],
+        env=env, check=True, capture_output=True,
+    )
+
+    start_at = time.time() + 2.0
+    children = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.sqlite_writers", "--child", profile,
+             "--writer", str(writer), "--writes", str(writes), "--start-at", str(start_at)],
+            env=env, stdout=subprocess.PIPE, text=True,
+        )
+        for writer in range(writers)
+    ]
+    results = []
+    for child in children:
+        output, _ = child.communicate()
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    latencies = sorted(latency for r in results for latency in r["latencies"])
+    elapsed = max(r["finished_at"] for r in results) - start_at
+    errors = sum(r["errors"] for r in results)
+    return {
+        "profile": profile,
+        "writes": len(latencies),
+        "errors": errors,
+        "writes_per_sec": round((len(latencies) - errors) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="requests per writer")
+    parser.add_argument("--child", choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument("--writer", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--start-at", type=float, default=0.0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_run_writer(args.child, args.writer, args.writes, args.start_at)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [_run_profile(profile, args.writers, args.writes, tmp) for profile in PROFILES]
+
+    print(f"{'profile':18} {'writes':>7} {'errors':>7} {'writes/s':>9} {'p50':>9} {'p99':>9}")
+    for r in results:
+        print(
+            f"{r['profile']:18} {r['writes']:>7} {r['errors']:>7} {r['writes_per_sec']:>9.1f} "
+            f"{r['p50_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
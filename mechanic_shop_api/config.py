@@ -15,10 +15,76 @@ class Config:
         f"sqlite:///{os.path.join(basedir, 'app.db')}",
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Read replicas for GET requests, e.g. "sqlite:///replica1.db,sqlite:///replica2.db".
+    SQLALCHEMY_REPLICAS = [url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url]
+    REPLICA_STRATEGY = os.getenv("REPLICA_STRATEGY", "round_robin")
+    REPLICA_RETRY_INTERVAL = int(os.getenv("REPLICA_RETRY_INTERVAL", "30"))
+    # Responses read from a replica this soon after a write to their tables are not cached.
+    REPLICA_MAX_LAG = int(os.getenv("REPLICA_MAX_LAG", "5"))
+    # SQLite connection pragmas; None leaves SQLite's default.
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Negative values are KiB, so this is a 64 MiB page cache per connection.
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+    # Off by default in SQLite; deleting a customer relies on ON DELETE CASCADE.
+    SQLITE_FOREIGN_KEYS = os.getenv("SQLITE_FOREIGN_KEYS", "ON")
+    # Connection pool for MySQL/Postgres; DATABASE_POOL_RECYCLE defaults per backend.
+    DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+    DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "20"))
+    DATABASE_POOL_TIMEOUT = int(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+    DATABASE_POOL_RECYCLE = int(os.environ["DATABASE_POOL_RECYCLE"]) if os.getenv("DATABASE_POOL_RECYCLE") else None
+    DATABASE_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
     JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_EXPIRES_IN = int(os.getenv("JWT_EXPIRES_IN", "3600"))
-    CACHE_TYPE = os.getenv("CACHE_TYPE", "SimpleCache")
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+    TOKEN_CACHE_NEGATIVE_TTL = int(os.getenv("TOKEN_CACHE_NEGATIVE_TTL", "30"))
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "8"))
+    PASSWORD_HASH_TIMEOUT = int(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+    # Shared by every worker on the host; see application/sharedcache.py.
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "application.sharedcache.SharedCache")
+    CACHE_SHARED_PATH = os.getenv("CACHE_SHARED_PATH", os.path.join(basedir, "cache.db"))
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    CACHE_COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", "1024"))
+    # TTL of cached views with a per-process backend such as SimpleCache,
+    # whose generations other workers never see bumped.
+    CACHE_LOCAL_VIEW_TIMEOUT = int(os.getenv("CACHE_LOCAL_VIEW_TIMEOUT", "30"))
+    # Views decorated with single_flight; see application/singleflight.py.
+    SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", "10"))
+    SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", "30"))
+    SINGLE_FLIGHT_STALE_TTL = int(os.getenv("SINGLE_FLIGHT_STALE_TTL", "30"))
+    # Shared by every worker on the host; see application/ratelimit.py.
+    RATELIMIT_STORAGE_URI = os.getenv(
+        "RATELIMIT_STORAGE_URI",
+        f"sqlite:///{os.path.join(basedir, 'ratelimit.db')}",
+    )
+    RATELIMIT_STORAGE_OPTIONS = {"cleanup_interval": int(os.getenv("RATELIMIT_CLEANUP_INTERVAL", "60"))}
+    RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "sliding-window-counter")
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    FAST_SERIALIZATION_ENDPOINTS = set(filter(None, os.getenv(
+        "FAST_SERIALIZATION_ENDPOINTS",
+        "customer.get_customers,customer.get_customer,mechanic.get_mechanics,"
+        "mechanic.get_mechanics_by_tickets,"
+        "inventory.get_inventory_items,inventory.get_inventory_item,"
+        "service_ticket.get_service_tickets,service_ticket.get_service_tickets_by_vin",
+    ).split(",")))
+    # Cached list totals also expire, bounding drift from writes made outside the app.
+    COUNT_CACHE_TIMEOUT = int(os.getenv("COUNT_CACHE_TIMEOUT", "300"))
+    BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(64 * 1024 * 1024)))
+    BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "100000"))
+    BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+    BULK_EDIT_MAX_TICKETS = int(os.getenv("BULK_EDIT_MAX_TICKETS", "500"))
+    # "auto" uses SQLite FTS5 when available; see application/search.py.
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+    SEARCH_REINDEX_BATCH_SIZE = int(os.getenv("SEARCH_REINDEX_BATCH_SIZE", "5000"))
+    # Tickets deleted per transaction by DELETE /customers/<id>?async=true.
+    CUSTOMER_DELETE_CHUNK_SIZE = int(os.getenv("CUSTOMER_DELETE_CHUNK_SIZE", "1000"))
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
     CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300"))
 
 
@@ -30,5 +96,9 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'test.db')}"
+    SQLALCHEMY_REPLICAS = []
     CACHE_TYPE = "SimpleCache"
+    RATELIMIT_STORAGE_URI = "memory://"
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    PASSWORD_HASH_WORKERS = 0
     WTF_CSRF_ENABLED = False
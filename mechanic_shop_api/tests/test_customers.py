@@ -1,7 +1,15 @@
+import time
 import unittest
+from unittest import mock
+from sqlalchemy import event
 from application import create_app
-from application.models import db, Customer
-from application.auth import encode_token
+from application.counts import count_rows
+from application.deletes import delete_running
+from application.extensions import cache
+from application.models import db, Customer, Inventory, Mechanic, ServiceTicket
+from application.models import service_ticket_inventory, service_ticket_mechanic
+from application.auth import encode_token, token_cache
+from application.passwords import PasswordHasherBusy, password_hasher
 from werkzeug.security import generate_password_hash
 from config import TestingConfig
 
@@ -61,6 +69,43 @@ class TestCustomers(unittest.TestCase):
         response = self.client.post('/customers/', json=customer_payload)
         self.assertEqual(response.status_code, 400)
 
+    # Test POST /customers/bulk - Bulk Create Customers
+    def test_bulk_create_customers(self):
+        """Test creating customers in bulk with per-entry results"""
+        payload = [
+            {"name": "Ann", "email": "ann@email.com", "password": "pw1"},
+            {"name": "Bob", "email": "test@email.com", "password": "pw2"},
+            {"name": "Cid", "email": "cid@email.com"},
+            {"name": "Dee", "email": "ann@email.com", "password": "pw3"},
+            {"name": "Eve", "email": "eve@email.com", "password": "pw4"},
+        ]
+        response = self.client.post('/customers/bulk', json=payload)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json['created'], 2)
+        self.assertEqual(
+            [r['status'] for r in response.json['results']],
+            [201, 409, 400, 409, 201],
+        )
+
+        login = self.client.post('/customers/login', json={"email": "eve@email.com", "password": "pw4"})
+        self.assertEqual(login.status_code, 200)
+
+    def test_bulk_create_customers_hashes_in_process_pool(self):
+        """Test bulk passwords are hashed by the worker pool"""
+        self.app.config['PASSWORD_HASH_WORKERS'] = 2
+        password_hasher.init_app(self.app)
+        try:
+            payload = [
+                {"name": f"User {i}", "email": f"user{i}@email.com", "password": f"pw{i}"}
+                for i in range(4)
+            ]
+            response = self.client.post('/customers/bulk', json=payload)
+            self.assertEqual(response.status_code, 201)
+        finally:
+            password_hasher.shutdown()
+        login = self.client.post('/customers/login', json={"email": "user3@email.com", "password": "pw3"})
+        self.assertEqual(login.status_code, 200)
+
     # Test GET /customers/ - Get All Customers with Pagination
     def test_get_customers(self):
         """Test retrieving all customers with pagination"""
@@ -76,6 +121,151 @@ class TestCustomers(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json['per_page'], 5)
 
+    def test_get_customers_cache_invalidated_on_create(self):
+        """Test the cached customer list reflects a newly created customer"""
+        response = self.client.get('/customers/')
+        self.assertEqual(response.json['total'], 1)
+
+        self.client.post('/customers/', json={
+            "name": "John Doe",
+            "email": "john@email.com",
+            "password": "password123"
+        })
+        response = self.client.get('/customers/')
+        self.assertEqual(response.json['total'], 2)
+
+    def test_get_customers_total_counted_once(self):
+        """Test the cached total is reused and count=exact recounts"""
+        self.client.get('/customers/')
+        with self.app.app_context():
+            # Raw SQL bypasses the session events that maintain the total.
+            db.session.execute(db.text(
+                "INSERT INTO customers (name, email, password) VALUES ('Raw', 'raw@email.com', 'x')"
+            ))
+            db.session.commit()
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = self.client.get('/customers/?per_page=3')
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        self.assertEqual(response.json['total'], 1)
+        self.assertFalse(any("count(" in statement.lower() for statement in statements))
+
+        self.assertEqual(self.client.get('/customers/?count=exact').json['total'], 2)
+        self.assertEqual(self.client.get('/customers/?per_page=4').json['total'], 2)
+
+    def test_get_customers_count_estimate(self):
+        """Test count=estimate answers from the id range on a cold cache"""
+        with self.app.app_context():
+            cache.clear()
+        response = self.client.get('/customers/?count=estimate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['total'], 1)
+
+    def test_get_customers_total_follows_deletes(self):
+        """Test deleting a customer decrements the cached total"""
+        self.client.get('/customers/')
+        headers = {"Authorization": f"Bearer {self.token}"}
+        self.client.delete('/customers/1', headers=headers)
+        self.assertEqual(self.client.get('/customers/').json['total'], 0)
+
+    def test_get_customers_sparse_fields(self):
+        """Test ?fields= limits the fields of the list and of a single customer"""
+        response = self.client.get('/customers/?fields=id,name')
+        self.assertEqual(response.json['items'], [{"id": 1, "name": "Test User"}])
+        response = self.client.get('/customers/1?fields=email')
+        self.assertEqual(response.json, {"email": "test@email.com"})
+
+        self.app.config['FAST_SERIALIZATION_ENDPOINTS'] = set()
+        response = self.client.get('/customers/1?fields=email')
+        self.assertEqual(response.json, {"email": "test@email.com"})
+        self.assertEqual(self.client.get('/customers/1?fields=password').status_code, 400)
+
+    def test_get_customer_conditional(self):
+        """Test If-None-Match and If-Modified-Since answer 304 until the customer changes"""
+        response = self.client.get('/customers/1')
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = self.client.get('/customers/1', headers={"If-None-Match": etag})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn("email", statements[0])
+
+        response = self.client.get('/customers/1', headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+
+        headers = {"Authorization": f"Bearer {self.token}"}
+        self.client.put('/customers/1', json={"phone": "555-9999"}, headers=headers)
+        response = self.client.get('/customers/1', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_get_customers_conditional(self):
+        """Test the list ETag changes on create and delete, and per query string"""
+        etag = self.client.get('/customers/').headers['ETag']
+        self.assertEqual(self.client.get('/customers/', headers={"If-None-Match": etag}).status_code, 304)
+        self.assertNotEqual(self.client.get('/customers/?per_page=5').headers['ETag'], etag)
+
+        self.client.post('/customers/', json={
+            "name": "John Doe",
+            "email": "john@email.com",
+            "password": "password123"
+        })
+        response = self.client.get('/customers/', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        with self.app.app_context():
+            headers = {"Authorization": f"Bearer {encode_token(2)}"}
+        self.client.delete('/customers/2', headers=headers)
+        response = self.client.get('/customers/', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['total'], 1)
+
+    def test_get_customers_fast_serialization_matches(self):
+        """Test the compiled serializer returns the same bytes as marshmallow"""
+        self.client.post('/customers/', json={
+            "name": "Zoë Müller",
+            "email": "zoe@email.com",
+            "password": "password123"
+        })
+        fast = self.client.get('/customers/?per_page=1&page=2').data
+        self.app.config['FAST_SERIALIZATION_ENDPOINTS'] = set()
+        with self.app.app_context():
+            cache.clear()
+        slow = self.client.get('/customers/?per_page=1&page=2').data
+        self.assertEqual(fast, slow)
+
+    # Test GET /customers/export - Streaming Export
+    def test_export_customers_csv(self):
+        """Test exporting customers as CSV without password hashes"""
+        response = self.client.get('/customers/export?format=csv')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        self.assertIn('test@email.com', body)
+        self.assertNotIn('password', body)
+
     # Test GET /customers/<id> - Get Single Customer
     def test_get_customer_by_id(self):
         """Test retrieving a single customer by ID"""
@@ -117,6 +307,100 @@ class TestCustomers(unittest.TestCase):
         response = self.client.post('/customers/login', json=credentials)
         self.assertEqual(response.status_code, 400)
 
+    def test_login_rehashes_outdated_password(self):
+        """Test a successful login upgrades a hash made with old parameters"""
+        credentials = {"email": "test@email.com", "password": "testpass"}
+        response = self.client.post('/customers/login', json=credentials)
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            customer = db.session.get(Customer, 1)
+            self.assertTrue(customer.password.startswith(TestingConfig.PASSWORD_HASH_METHOD + "$"))
+
+        response = self.client.post('/customers/login', json=credentials)
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_bare_method_rehashes_once(self):
+        """Test a bare method name like "scrypt" does not rewrite the hash on every login"""
+        self.app.config['PASSWORD_HASH_METHOD'] = "scrypt"
+        password_hasher.init_app(self.app)
+        self.assertFalse(password_hasher.needs_rehash(generate_password_hash("pw", method="scrypt")))
+
+        credentials = {"email": "test@email.com", "password": "testpass"}
+        self.assertEqual(self.client.post('/customers/login', json=credentials).status_code, 200)
+        with self.app.app_context():
+            upgraded = db.session.get(Customer, 1).password
+        self.assertTrue(upgraded.startswith("scrypt:32768:8:1$"))
+
+        self.assertEqual(self.client.post('/customers/login', json=credentials).status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Customer, 1).password, upgraded)
+
+    def test_login_skips_rehash_when_hasher_busy(self):
+        """Test a correct password still logs in when the pool fills before the rehash"""
+        self.app.config['PASSWORD_HASH_MAX_PENDING'] = 1
+        password_hasher.init_app(self.app)
+        with self.app.app_context():
+            stored = db.session.get(Customer, 1).password
+        needs_rehash = password_hasher.needs_rehash
+
+        def fill_pool(stored_hash):
+            # Runs after the password check has released its slot.
+            self.assertTrue(password_hasher._slots.acquire(blocking=False))
+            return needs_rehash(stored_hash)
+
+        with mock.patch.object(password_hasher, "needs_rehash", side_effect=fill_pool):
+            response = self.client.post('/customers/login', json={"email": "test@email.com", "password": "testpass"})
+        password_hasher._slots.release()
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Customer, 1).password, stored)
+
+    def test_create_customer_hashes_in_process_pool(self):
+        """Test signup works when hashing runs in the worker process pool"""
+        self.app.config['PASSWORD_HASH_WORKERS'] = 1
+        password_hasher.init_app(self.app)
+        try:
+            response = self.client.post('/customers/', json={
+                "name": "Pool User",
+                "email": "pool@email.com",
+                "password": "password123"
+            })
+            self.assertEqual(response.status_code, 201)
+        finally:
+            password_hasher.shutdown()
+
+    def test_create_customer_hasher_busy(self):
+        """Test signup is shed with 503 when the hashing queue is full (negative test)"""
+        self.app.config['PASSWORD_HASH_MAX_PENDING'] = 0
+        password_hasher.init_app(self.app)
+        response = self.client.post('/customers/', json={
+            "name": "Busy User",
+            "email": "busy@email.com",
+            "password": "password123"
+        })
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_hasher_timeout_holds_slot_until_done(self):
+        """Test a timed-out hash keeps its pending slot until the worker finishes it (negative test)"""
+        self.app.config.update(
+            PASSWORD_HASH_WORKERS=1,
+            PASSWORD_HASH_TIMEOUT=0,
+            PASSWORD_HASH_MAX_PENDING=1,
+            PASSWORD_HASH_METHOD="scrypt:32768:8:1",
+        )
+        password_hasher.init_app(self.app)
+        try:
+            with self.assertRaises(PasswordHasherBusy):
+                password_hasher.hash("password123")
+            # The hash is still running in the pool, so the only slot is taken.
+            self.assertFalse(password_hasher._slots.acquire(blocking=False))
+            self.assertTrue(password_hasher._slots.acquire(timeout=30))
+            password_hasher._slots.release()
+        finally:
+            password_hasher.shutdown()
+
     # Test PUT /customers/<id> - Update Customer (Protected)
     def test_update_customer(self):
         """Test updating customer with valid token"""
@@ -135,6 +419,30 @@ class TestCustomers(unittest.TestCase):
         response = self.client.put('/customers/1', json=update_payload)
         self.assertEqual(response.status_code, 401)
 
+    def test_update_customer_invalid_token(self):
+        """Test updating customer with a malformed token (negative test)"""
+        headers = {'Authorization': "Bearer not-a-real-token"}
+        response = self.client.put('/customers/1', json={"name": "X"}, headers=headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json['error'], "Invalid token.")
+
+    def test_token_cache_reuses_verified_token(self):
+        """Test repeated requests with the same token hit the token cache"""
+        headers = {'Authorization': f"Bearer {self.token}"}
+        self.client.get('/customers/my-tickets', headers=headers)
+        hits = token_cache.stats()['hits']
+        response = self.client.get('/customers/my-tickets', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(token_cache.stats()['hits'], hits + 1)
+
+    def test_token_cache_cleared_on_secret_rotation(self):
+        """Test a cached token is rejected after SECRET_KEY changes (negative test)"""
+        headers = {'Authorization': f"Bearer {self.token}"}
+        self.client.get('/customers/my-tickets', headers=headers)
+        self.app.config['SECRET_KEY'] = "rotated-secret-key"
+        response = self.client.get('/customers/my-tickets', headers=headers)
+        self.assertEqual(response.status_code, 401)
+
     # Test DELETE /customers/<id> - Delete Customer (Protected)
     def test_delete_customer(self):
         """Test deleting customer with valid token"""
@@ -143,6 +451,73 @@ class TestCustomers(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('deleted', response.json['message'].lower())
 
+    def _add_fleet(self, tickets):
+        """Give customer 1 ``tickets`` tickets on two mechanics and a part, and customer 2 one ticket"""
+        with self.app.app_context():
+            other = Customer(name="Other", email="other@email.com", password="x")
+            first = Mechanic(name="First", email="first@email.com")
+            second = Mechanic(name="Second", email="second@email.com")
+            part = Inventory(name="Oil Filter", price=12.99)
+            db.session.add_all([other, first, second, part])
+            db.session.commit()
+            for i in range(tickets):
+                db.session.add(ServiceTicket(
+                    description=f"Job {i}", vin="1HGCM82633A123456", customer_id=1,
+                    mechanics=[first, second], inventory_items=[part],
+                ))
+            db.session.add(ServiceTicket(
+                description="Other job", vin="1HGCM82633A654321", customer=other, mechanics=[first],
+            ))
+            db.session.commit()
+
+    def _assert_fleet_deleted(self):
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(Customer, 1))
+            self.assertEqual(db.session.scalar(db.select(db.func.count()).select_from(ServiceTicket)), 1)
+            self.assertEqual(db.session.scalar(db.select(db.func.count()).select_from(service_ticket_mechanic)), 1)
+            self.assertEqual(db.session.scalar(db.select(db.func.count()).select_from(service_ticket_inventory)), 0)
+            counts = dict(db.session.execute(db.select(Mechanic.name, Mechanic.ticket_count)).all())
+            self.assertEqual(counts, {"First": 1, "Second": 0})
+
+    def test_delete_customer_cascades_without_loading_tickets(self):
+        """Test deleting a customer removes their tickets and links in a fixed number of statements"""
+        self._add_fleet(50)
+        with self.app.app_context():
+            self.assertEqual(count_rows(db.select(ServiceTicket.id), "service_tickets"), 51)
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            headers = {'Authorization': f"Bearer {self.token}"}
+            response = self.client.delete('/customers/1', headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        self.assertEqual(response.status_code, 200)
+        # Load the customer, release the mechanics' counts, drop the tickets'
+        # search entries, delete.
+        self.assertEqual(len(statements), 4)
+        self.assertFalse(any(s.startswith("SELECT service_tickets") for s in statements))
+        self._assert_fleet_deleted()
+        # The cached total of the cascaded table was dropped.
+        with self.app.app_context():
+            self.assertEqual(count_rows(db.select(ServiceTicket.id), "service_tickets"), 1)
+
+    def test_delete_customer_async_in_chunks(self):
+        """Test ?async=true answers 202 and deletes the tickets in chunks in the background"""
+        self.app.config['CUSTOMER_DELETE_CHUNK_SIZE'] = 3
+        self._add_fleet(10)
+        headers = {'Authorization': f"Bearer {self.token}"}
+        response = self.client.delete('/customers/1?async=true', headers=headers)
+        self.assertEqual(response.status_code, 202)
+
+        deadline = time.monotonic() + 10
+        while delete_running(1) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(delete_running(1))
+        self._assert_fleet_deleted()
+
     def test_delete_customer_no_token(self):
         """Test deleting customer without token (negative test)"""
         response = self.client.delete('/customers/1')
@@ -0,0 +1,123 @@
+import unittest
+from application import create_app
+from application.auth import encode_token
+from application.database import engine_options
+from application.models import db
+from config import Config, TestingConfig
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        """Set up the app against the test database"""
+        self.app = create_app(TestingConfig)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _pragma(self, name):
+        with self.app.app_context():
+            return db.session.execute(db.text(f"PRAGMA {name}")).scalar()
+
+    def test_sqlite_pragmas_applied(self):
+        """Test every SQLite connection gets the configured pragmas"""
+        self.assertEqual(self._pragma("journal_mode"), "wal")
+        self.assertEqual(self._pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self._pragma("busy_timeout"), TestingConfig.SQLITE_BUSY_TIMEOUT_MS)
+        self.assertEqual(self._pragma("cache_size"), TestingConfig.SQLITE_CACHE_SIZE)
+        self.assertEqual(self._pragma("foreign_keys"), 1)
+
+    def test_sqlite_pragma_disabled(self):
+        """Test a pragma set to None is left at SQLite's default"""
+        class NoBusyTimeoutConfig(TestingConfig):
+            SQLITE_BUSY_TIMEOUT_MS = None
+            SQLITE_SYNCHRONOUS = "FULL"
+
+        self.app = create_app(NoBusyTimeoutConfig)
+        self.assertEqual(self._pragma("synchronous"), 2)  # FULL
+        # pysqlite's own connect timeout (5s) still applies.
+        self.assertEqual(self._pragma("busy_timeout"), 5000)
+
+    def test_server_engine_options(self):
+        """Test pool options are generated per backend"""
+        config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+        mysql = engine_options(config, "mysql+mysqlconnector://user:pw@db/shop")
+        self.assertEqual(mysql["pool_recycle"], 280)
+        self.assertTrue(mysql["pool_pre_ping"])
+        self.assertEqual(mysql["pool_size"], Config.DATABASE_POOL_SIZE)
+
+        config["DATABASE_POOL_RECYCLE"] = 60
+        postgres = engine_options(config, "postgresql://user:pw@db/shop")
+        self.assertEqual(postgres["pool_recycle"], 60)
+        self.assertEqual(engine_options(config, "sqlite:///app.db"), {})
+
+    def test_explicit_engine_options_win(self):
+        """Test SQLALCHEMY_ENGINE_OPTIONS set on a config class is not overridden"""
+        class NoPrePingConfig(TestingConfig):
+            SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": False}
+
+        app = create_app(NoPrePingConfig)
+        self.assertEqual(app.config["SQLALCHEMY_ENGINE_OPTIONS"], {"pool_pre_ping": False})
+
+    def test_upgrade_db_from_original_schema(self):
+        """Test upgrade-db adds the new columns, indexes and cascades, and rebuilds derived data"""
+        with self.app.app_context():
+            db.drop_all()
+            for statement in ORIGINAL_SCHEMA:
+                db.session.execute(db.text(statement))
+            db.session.execute(db.text(
+                "INSERT INTO customers (id, name, email, password) VALUES (1, 'Ann', 'ann@example.com', 'x')"
+            ))
+            db.session.execute(db.text("INSERT INTO mechanics (id, name, email) VALUES (1, 'Bob', 'bob@example.com')"))
+            db.session.execute(db.text("INSERT INTO inventory (id, name, price) VALUES (1, 'Brake pads', 40.0)"))
+            db.session.execute(db.text(
+                "INSERT INTO service_tickets (id, description, vin, customer_id) "
+                "VALUES (1, 'Brake noise', '1HGCM82633A123456', 1)"
+            ))
+            db.session.execute(db.text("INSERT INTO service_ticket_mechanic VALUES (1, 1)"))
+            db.session.execute(db.text("INSERT INTO service_ticket_inventory VALUES (1, 1)"))
+            db.session.commit()
+            db.session.remove()
+
+        result = self.app.test_cli_runner().invoke(args=["upgrade-db"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Rebuilt table service_tickets (added parts_total, updated_at).", result.output)
+
+        client = self.app.test_client()
+        self.assertEqual(client.get('/mechanics/by-tickets').json[0]['ticket_count'], 1)
+        self.assertEqual(client.get('/service-tickets/').json[0]['parts_total'], 40.0)
+        self.assertEqual(len(client.get('/search/?q=brake').json['items']), 2)
+
+        result = self.app.test_cli_runner().invoke(args=["upgrade-db"])
+        self.assertIn("Schema is up to date.", result.output)
+
+        # The rebuilt foreign keys cascade a customer's tickets and their links.
+        self.assertEqual(client.delete('/customers/1', headers=self._auth(1)).status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(db.session.scalar(db.text("SELECT COUNT(*) FROM service_ticket_inventory")), 0)
+
+    def _auth(self, customer_id):
+        with self.app.app_context():
+            return {"Authorization": f"Bearer {encode_token(customer_id)}"}
+
+
+# The tables as the first release created them.
+ORIGINAL_SCHEMA = (
+    "CREATE TABLE customers (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+    "email VARCHAR(255) NOT NULL UNIQUE, password VARCHAR(255) NOT NULL, phone VARCHAR(50), address VARCHAR(255))",
+    "CREATE TABLE mechanics (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+    "email VARCHAR(255) NOT NULL UNIQUE, phone VARCHAR(50), address VARCHAR(255), salary FLOAT)",
+    "CREATE TABLE inventory (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, price FLOAT NOT NULL)",
+    "CREATE TABLE service_tickets (id INTEGER PRIMARY KEY, description VARCHAR(255) NOT NULL, "
+    "vin VARCHAR(17) NOT NULL, customer_id INTEGER NOT NULL REFERENCES customers (id))",
+    "CREATE TABLE service_ticket_mechanic (service_ticket_id INTEGER REFERENCES service_tickets (id), "
+    "mechanic_id INTEGER REFERENCES mechanics (id), PRIMARY KEY (service_ticket_id, mechanic_id))",
+    "CREATE TABLE service_ticket_inventory (service_ticket_id INTEGER REFERENCES service_tickets (id), "
+    "inventory_id INTEGER REFERENCES inventory (id), PRIMARY KEY (service_ticket_id, inventory_id))",
+)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
+import random
 import unittest
+from unittest import mock
 from application import create_app
-from application.models import db, Inventory
+from application import repricing
+from application.extensions import cache
+from application.models import db, Customer, Inventory, ServiceTicket
+from application.blueprints.inventory.routes import get_inventory_items
 from config import TestingConfig
 
 
@@ -51,6 +56,38 @@ class TestInventory(unittest.TestCase):
         response = self.client.post('/inventory/', json=item_payload)
         self.assertEqual(response.status_code, 400)
 
+    # Test POST /inventory/bulk - Bulk Create Inventory Items
+    def test_bulk_create_inventory(self):
+        """Test creating inventory items in bulk across several chunks"""
+        self.app.config['BULK_CHUNK_SIZE'] = 2
+        payload = [{"name": f"Part {i}", "price": 1.5 + i} for i in range(5)]
+        response = self.client.post('/inventory/bulk', json=payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['created'], 5)
+        self.assertEqual([r['index'] for r in response.json['results']], list(range(5)))
+        self.assertEqual(len(self.client.get('/inventory/').json), 8)
+
+    def test_bulk_create_inventory_too_large(self):
+        """Test bulk create rejects oversized bodies without inserting (negative test)"""
+        self.app.config['BULK_MAX_BYTES'] = 64
+        payload = [{"name": f"Part {i}", "price": 1.5} for i in range(5)]
+        response = self.client.post('/inventory/bulk', json=payload)
+        self.assertEqual(response.status_code, 413)
+
+        self.app.config['BULK_MAX_BYTES'] = 1024
+        self.app.config['BULK_MAX_ITEMS'] = 3
+        response = self.client.post('/inventory/bulk', json=payload)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(len(self.client.get('/inventory/').json), 3)
+
+    def test_bulk_create_inventory_invalid_json(self):
+        """Test bulk create rejects a body that is not a JSON array (negative test)"""
+        response = self.client.post('/inventory/bulk', data='{"name": "Part"}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/inventory/bulk', data='[{"name": "Part", "price": 1},', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.client.get('/inventory/').json), 3)
+
     # Test GET /inventory/ - Get All Inventory Items
     def test_get_inventory_items(self):
         """Test retrieving all inventory items"""
@@ -59,6 +96,81 @@ class TestInventory(unittest.TestCase):
         self.assertIsInstance(response.json, list)
         self.assertEqual(len(response.json), 3)
 
+    def test_get_inventory_items_cached_briefly_per_process(self):
+        """Test a per-process cache keeps the list for CACHE_LOCAL_VIEW_TIMEOUT, not an hour"""
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.client.get('/inventory/')
+        timeouts = [
+            call.kwargs["timeout"] for call in cache_set.call_args_list if call.args[0].startswith("view/")
+        ]
+        self.assertEqual(timeouts, [TestingConfig.CACHE_LOCAL_VIEW_TIMEOUT])
+
+    def test_get_inventory_items_paginated(self):
+        """Test page and per_page return one page with a total"""
+        response = self.client.get('/inventory/?page=2&per_page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json['items']), 1)
+        self.assertEqual(response.json['total'], 3)
+        self.assertEqual(response.json['pages'], 2)
+        self.assertFalse(response.json['has_next'])
+
+    def test_get_inventory_items_count_none(self):
+        """Test count=none skips the total but still reports a next page"""
+        response = self.client.get('/inventory/?per_page=2&count=none')
+        self.assertIsNone(response.json['total'])
+        self.assertIsNone(response.json['pages'])
+        self.assertTrue(response.json['has_next'])
+
+    def test_get_inventory_items_out_of_range_page(self):
+        """Test page and per_page below 1 are clamped like db.paginate"""
+        first = self.client.get('/inventory/?page=1&per_page=2').json['items']
+        response = self.client.get('/inventory/?page=0&per_page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['items'], first)
+        response = self.client.get('/inventory/?per_page=0')
+        self.assertEqual(len(response.json['items']), 3)
+
+    def test_get_inventory_items_invalid_count(self):
+        """Test an unknown count mode (negative test)"""
+        self.assertEqual(self.client.get('/inventory/?per_page=2&count=maybe').status_code, 400)
+
+    def test_get_inventory_fast_serialization_matches(self):
+        """Test the compiled serializer returns the same bytes as marshmallow"""
+        self.client.post('/inventory/', json={"name": "Big Part", "price": 1e16})
+        fast = self.client.get('/inventory/').data
+        self.app.config['FAST_SERIALIZATION_ENDPOINTS'] = set()
+        with self.app.app_context():
+            cache.clear()
+        slow = self.client.get('/inventory/').data
+        self.assertEqual(fast, slow)
+
+    # Test GET /inventory/export - Streaming Export
+    def test_export_inventory_ndjson(self):
+        """Test exporting inventory as newline-delimited JSON"""
+        response = self.client.get('/inventory/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"name":"Oil Filter"', lines[0])
+
+    def test_export_inventory_csv_resume(self):
+        """Test exporting inventory as CSV from an id onwards"""
+        response = self.client.get('/inventory/export?format=csv&after_id=1&max_id=2')
+        self.assertEqual(response.status_code, 200)
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines, ['id,name,price', '2,Brake Pads,45.5'])
+
+    def test_export_inventory_csv_fields(self):
+        """Test ?fields= picks the exported CSV columns"""
+        response = self.client.get('/inventory/export?format=csv&fields=name')
+        self.assertEqual(response.get_data(as_text=True).splitlines()[0], "name")
+
+    def test_export_inventory_invalid_format(self):
+        """Test exporting inventory with an unknown format (negative test)"""
+        response = self.client.get('/inventory/export?format=xml')
+        self.assertEqual(response.status_code, 400)
+
     # Test GET /inventory/<id> - Get Single Inventory Item
     def test_get_inventory_item_by_id(self):
         """Test retrieving a single inventory item by ID"""
@@ -71,6 +183,19 @@ class TestInventory(unittest.TestCase):
         response = self.client.get('/inventory/999')
         self.assertEqual(response.status_code, 404)
 
+    def test_get_inventory_item_fast_serialization_matches(self):
+        """Test the single-item compiled serializer matches marshmallow"""
+        fast = self.client.get('/inventory/2').data
+        self.app.config['FAST_SERIALIZATION_ENDPOINTS'] = set()
+        slow = self.client.get('/inventory/2').data
+        self.assertEqual(fast, slow)
+
+    def test_get_inventory_items_skips_identity_map(self):
+        """Test listing inventory does not load ORM instances into the session"""
+        with self.app.test_request_context('/inventory/'):
+            get_inventory_items()
+            self.assertEqual(len(db.session.identity_map), 0)
+
     # Test PUT /inventory/<id> - Update Inventory Item
     def test_update_inventory_item(self):
         """Test updating an inventory item"""
@@ -89,6 +214,77 @@ class TestInventory(unittest.TestCase):
         response = self.client.put('/inventory/999', json=update_payload)
         self.assertEqual(response.status_code, 404)
 
+    # Test POST /inventory/reprice - Bulk Repricing
+    def test_reprice_inventory_dry_run(self):
+        """Test a dry run returns the price changes without writing them"""
+        payload = {
+            "prices": {"2": 40.00},
+            "rules": [{"match": "*FILTER", "markup_percent": 10, "ending": 0.99}],
+        }
+        response = self.client.post('/inventory/reprice?dry_run=true', json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {
+            "dry_run": True,
+            "changed": 3,
+            "changes": [
+                {"id": 1, "name": "Oil Filter", "old_price": 12.99, "new_price": 14.99},
+                {"id": 2, "name": "Brake Pads", "old_price": 45.50, "new_price": 40.00},
+                {"id": 3, "name": "Air Filter", "old_price": 18.75, "new_price": 20.99},
+            ],
+        })
+        self.assertEqual(self.client.get('/inventory/1').json['price'], 12.99)
+
+    def test_reprice_inventory(self):
+        """Test repricing writes the new prices and updates tickets using the parts"""
+        with self.app.app_context():
+            db.session.add(Customer(name="Test Customer", email="customer@test.com", password="password"))
+            db.session.add(ServiceTicket(description="Oil change", vin="1HGCM82633A123456", customer_id=1))
+            db.session.commit()
+        self.client.put('/service-tickets/1/add-part/1', json={"quantity": 2})
+        self.assertEqual(self.client.get('/inventory/').json[0]['price'], 12.99)
+
+        payload = {"rules": [{"match": "*", "min_price": 15, "max_price": 40}]}
+        response = self.client.post('/inventory/reprice', json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json['dry_run'])
+        self.assertEqual([(c['id'], c['new_price']) for c in response.json['changes']], [(1, 15.0), (2, 40.0)])
+
+        response = self.client.get('/inventory/')
+        self.assertEqual([item['price'] for item in response.json], [15.0, 40.0, 18.75])
+        response = self.client.get('/service-tickets/?fields=parts_total')
+        self.assertEqual(response.json, [{"parts_total": 30.0}])
+
+    def test_reprice_inventory_invalid(self):
+        """Test price sheets that are empty, invalid or name unknown parts (negative test)"""
+        self.assertEqual(self.client.post('/inventory/reprice', json={}).status_code, 400)
+        for rule in ({"markup_percent": 5}, {"match": "*", "markup_percent": -100},
+                     {"match": "*", "ending": 1.5}, {"match": "*", "min_price": 10, "max_price": 5}):
+            response = self.client.post('/inventory/reprice', json={"rules": [rule]})
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/inventory/reprice', json={"prices": {"1": -1}})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/inventory/reprice', json={"prices": {"1": 9.99, "999": 1.00}})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['missing_ids'], [999])
+        self.assertEqual(self.client.get('/inventory/1').json['price'], 12.99)
+
+    @unittest.skipIf(repricing.np is None, "NumPy is not installed")
+    def test_reprice_numpy_matches_lists(self):
+        """Test the NumPy and plain-list repricing passes give the same prices"""
+        rng = random.Random(7)
+        names = [rng.choice(["Oil", "Brake", "Air"]) + f" part {i}" for i in range(1000)]
+        prices = [round(rng.uniform(0, 500), rng.choice([0, 1, 2, 3])) for _ in names]
+        rules = [
+            {"match": "brake*", "markup_percent": 12.5, "ending": 0.99},
+            {"match": "*part 1*", "markup_percent": -7, "min_price": 5, "max_price": 300},
+        ]
+        explicit = {rng.randrange(len(names)): rng.uniform(0, 100) for _ in range(50)}
+        self.assertEqual(
+            repricing._reprice_arrays(prices, names, rules, explicit),
+            repricing._reprice_lists(prices, names, rules, explicit),
+        )
+
     # Test DELETE /inventory/<id> - Delete Inventory Item
     def test_delete_inventory_item(self):
         """Test deleting an inventory item"""
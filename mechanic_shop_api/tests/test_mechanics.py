@@ -1,6 +1,8 @@
 import unittest
 from application import create_app
-from application.models import db, Mechanic
+from application.extensions import cache
+from application.counters import rebuild_mechanic_ticket_counts
+from application.models import db, Customer, Mechanic, ServiceTicket
 from config import TestingConfig
 
 
@@ -64,6 +66,19 @@ class TestMechanics(unittest.TestCase):
         response = self.client.post('/mechanics/', json=mechanic_payload)
         self.assertEqual(response.status_code, 400)
 
+    # Test POST /mechanics/bulk - Bulk Create Mechanics
+    def test_bulk_create_mechanics(self):
+        """Test creating mechanics in bulk"""
+        payload = [
+            {"name": "Tom Davis", "email": "tom@mechanic.com", "salary": 58000.0},
+            {"name": "Mike Again", "email": "mike@mechanic.com"},
+        ]
+        response = self.client.post('/mechanics/bulk', json=payload)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json['results'][0], {"index": 0, "status": 201, "id": 3})
+        self.assertEqual(response.json['results'][1]['status'], 409)
+        self.assertEqual(len(self.client.get('/mechanics/').json), 3)
+
     # Test GET /mechanics/ - Get All Mechanics
     def test_get_mechanics(self):
         """Test retrieving all mechanics"""
@@ -72,6 +87,46 @@ class TestMechanics(unittest.TestCase):
         self.assertIsInstance(response.json, list)
         self.assertEqual(len(response.json), 2)
 
+    def test_get_mechanics_paginated(self):
+        """Test page and per_page return one page with a total"""
+        response = self.client.get('/mechanics/?per_page=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['name'] for m in response.json['items']], ["Mike Johnson"])
+        self.assertEqual(response.json['total'], 2)
+        self.assertTrue(response.json['has_next'])
+
+    def test_get_mechanics_cache_invalidated_on_update(self):
+        """Test the cached mechanic list reflects an updated mechanic"""
+        self.client.get('/mechanics/')
+        self.client.put('/mechanics/1', json={"name": "Mike J."})
+        response = self.client.get('/mechanics/')
+        self.assertEqual(response.json[0]['name'], "Mike J.")
+
+    def test_get_mechanics_fast_serialization_matches(self):
+        """Test the compiled serializer returns the same bytes as marshmallow"""
+        self.client.post('/mechanics/', json={
+            "name": "José Peña",
+            "email": "jose@mechanic.com",
+            "salary": 0.00001
+        })
+        self.client.post('/mechanics/', json={
+            "name": "No Salary",
+            "email": "nosalary@mechanic.com"
+        })
+        fast = self.client.get('/mechanics/').data
+        self.app.config['FAST_SERIALIZATION_ENDPOINTS'] = set()
+        with self.app.app_context():
+            cache.clear()
+        slow = self.client.get('/mechanics/').data
+        self.assertEqual(fast, slow)
+
+    # Test GET /mechanics/export - Streaming Export
+    def test_export_mechanics_ndjson(self):
+        """Test exporting mechanics as newline-delimited JSON"""
+        response = self.client.get('/mechanics/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 2)
+
     # Test GET /mechanics/by-tickets - Get Mechanics by Ticket Count
     def test_get_mechanics_by_tickets(self):
         """Test retrieving mechanics sorted by ticket count"""
@@ -79,6 +134,63 @@ class TestMechanics(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.json, list)
 
+    def _create_tickets(self, count):
+        with self.app.app_context():
+            customer = Customer(name="Jane Doe", email="jane@example.com", password="x")
+            db.session.add(customer)
+            for i in range(count):
+                db.session.add(ServiceTicket(description=f"Job {i}", vin="1HGCM82633A004352", customer=customer))
+            db.session.commit()
+
+    def test_get_mechanics_by_tickets_counts_follow_assignments(self):
+        """Test ticket counts are maintained as mechanics are assigned and removed"""
+        self._create_tickets(2)
+        self.client.put('/service-tickets/1/assign-mechanic/1')
+        self.client.put('/service-tickets/1/edit', json={"add_ids": [2]})
+        self.client.put('/service-tickets/2/assign-mechanic/2')
+
+        response = self.client.get('/mechanics/by-tickets')
+        self.assertEqual([(m['id'], m['ticket_count']) for m in response.json], [(2, 2), (1, 1)])
+
+        self.client.put('/service-tickets/1/remove-mechanic/2')
+        with self.app.app_context():
+            db.session.delete(db.session.get(ServiceTicket, 2))
+            db.session.commit()
+        response = self.client.get('/mechanics/by-tickets')
+        self.assertEqual([(m['id'], m['ticket_count']) for m in response.json], [(1, 1), (2, 0)])
+
+    def test_get_mechanics_by_tickets_limit(self):
+        """Test the leaderboard can be limited to the top N mechanics"""
+        response = self.client.get('/mechanics/by-tickets?limit=1')
+        self.assertEqual([m['id'] for m in response.json], [2])
+        response = self.client.get('/mechanics/by-tickets?limit=1&page=2')
+        self.assertEqual([m['id'] for m in response.json], [1])
+
+    def test_get_mechanics_by_tickets_invalid_limit(self):
+        """Test the leaderboard rejects a non-positive limit (negative test)"""
+        response = self.client.get('/mechanics/by-tickets?limit=0')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_mechanics_by_tickets_page_without_limit(self):
+        """Test the leaderboard rejects page without limit instead of ignoring it (negative test)"""
+        response = self.client.get('/mechanics/by-tickets?page=2')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_ticket_counts(self):
+        """Test rebuilding drifted ticket counts from the association table"""
+        self._create_tickets(1)
+        self.client.put('/service-tickets/1/assign-mechanic/1')
+        with self.app.app_context():
+            db.session.execute(db.update(Mechanic).values(ticket_count=5))
+            db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=["rebuild-ticket-counts"])
+        self.assertIn("2 were out of date", result.output)
+        with self.app.app_context():
+            self.assertEqual(rebuild_mechanic_ticket_counts(), 0)
+            counts = db.session.execute(db.select(Mechanic.id, Mechanic.ticket_count).order_by(Mechanic.id)).all()
+        self.assertEqual([tuple(row) for row in counts], [(1, 1), (2, 0)])
+
     # Test PUT /mechanics/<id> - Update Mechanic
     def test_update_mechanic(self):
         """Test updating a mechanic"""
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from application import create_app
+from application.auth import encode_token
+from application.instrumentation import instrumentation
+from application.models import db, Customer, ServiceTicket
+from config import TestingConfig
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """Set up test client and initialize test database"""
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        instrumentation.reset()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            customer = Customer(
+                name="Test Customer",
+                email="customer@test.com",
+                password="password"
+            )
+            db.session.add(customer)
+            for i in range(3):
+                db.session.add(ServiceTicket(
+                    description=f"Service {i}",
+                    vin=f"1HGCM82633A12345{i}",
+                    customer_id=1
+                ))
+            db.session.commit()
+
+            self.token = encode_token(1)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    # Test GET /metrics - Prometheus export
+    def test_metrics_records_route(self):
+        """Test a request shows up in the latency, SQL and size metrics"""
+        self.client.get('/inventory/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/inventory/"} 1', body)
+        self.assertIn('http_request_sql_statements_total{method="GET",route="/inventory/"}', body)
+        self.assertIn('http_response_bytes_total{method="GET",route="/inventory/"}', body)
+        self.assertIn('http_requests_total{method="GET",route="/inventory/",status="200"} 1', body)
+
+    def test_n_plus_one_detected(self):
+        """Test lazily loading ticket relationships is flagged as N+1"""
+        instrumentation.n_plus_one_threshold = 2
+        headers = {'Authorization': f"Bearer {self.token}"}
+        with self.assertLogs(self.app.logger, level='WARNING') as logs:
+            self.client.get('/customers/my-tickets', headers=headers)
+        self.assertIn('Possible N+1 query', logs.output[0])
+
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('http_request_n_plus_one_total{method="GET",route="/customers/my-tickets"} 1', body)
+
+    def test_metrics_aggregated_across_workers(self):
+        """Test snapshots written by other worker processes are summed"""
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            instrumentation.metrics_dir = metrics_dir
+            try:
+                with open(os.path.join(metrics_dir, 'metrics-99999.json'), 'w') as f:
+                    f.write('{"counters": [["http_requests_total", '
+                            '[["method", "GET"], ["route", "/inventory/"], ["status", 200]], 4]], '
+                            '"histograms": []}')
+                self.client.get('/inventory/')
+                body = self.client.get('/metrics').get_data(as_text=True)
+            finally:
+                instrumentation.metrics_dir = None
+        self.assertIn('http_requests_total{method="GET",route="/inventory/",status="200"} 5', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from application import create_app
+from application.models import db
+from application.ratelimit import SQLiteStorage
+from config import TestingConfig
+
+
+class TestRateLimitStorage(unittest.TestCase):
+    def setUp(self):
+        """Create a shared rate limit file"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.uri = f"sqlite:///{os.path.join(self.tmp.name, 'ratelimit.db')}"
+        self.storage = SQLiteStorage(self.uri, cleanup_interval=0)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.tmp.cleanup()
+
+    def _acquire_at(self, now, count, limit=10):
+        with mock.patch("application.ratelimit.time.time", return_value=now):
+            return [self.storage.acquire_sliding_window_entry("key", limit, 60) for _ in range(count)]
+
+    def test_sliding_window_weights_previous_window(self):
+        """Test half of the previous window still counts halfway through the next"""
+        self.assertEqual(self._acquire_at(6000.0, 11), [True] * 10 + [False])
+        # 30s into the next window the previous 10 hits weigh 5.
+        self.assertEqual(self._acquire_at(6090.0, 6), [True] * 5 + [False])
+        # Two windows later nothing carries over.
+        self.assertEqual(self._acquire_at(6240.0, 10), [True] * 10)
+
+    def test_shared_between_storages(self):
+        """Test two storages on one file (two workers) share the same counts"""
+        other = SQLiteStorage(self.uri, cleanup_interval=0)
+        self.assertEqual(self._acquire_at(6000.0, 5, limit=6), [True] * 5)
+        with mock.patch("application.ratelimit.time.time", return_value=6001.0):
+            self.assertTrue(other.acquire_sliding_window_entry("key", 6, 60))
+            self.assertFalse(other.acquire_sliding_window_entry("key", 6, 60))
+
+    def test_idle_keys_expire(self):
+        """Test keys are deleted once both of their windows have passed"""
+        self._acquire_at(6000.0, 1)
+        with mock.patch("application.ratelimit.time.time", return_value=6100.0):
+            self.assertEqual(self.storage.expire(), 0)
+        with mock.patch("application.ratelimit.time.time", return_value=6120.0):
+            self.assertEqual(self.storage.expire(), 1)
+
+
+class TestLoginRateLimit(unittest.TestCase):
+    def setUp(self):
+        """Start two apps, as two workers would, on one rate limit file"""
+        self.tmp = tempfile.TemporaryDirectory()
+
+        class SharedLimitConfig(TestingConfig):
+            RATELIMIT_STORAGE_URI = f"sqlite:///{os.path.join(self.tmp.name, 'ratelimit.db')}"
+
+        self.apps = [create_app(SharedLimitConfig) for _ in range(2)]
+        with self.apps[0].app_context():
+            db.drop_all()
+            db.create_all()
+
+    def tearDown(self):
+        """Clean up after each test"""
+        with self.apps[0].app_context():
+            db.session.remove()
+            db.drop_all()
+        self.tmp.cleanup()
+
+    def test_login_limit_applies_across_workers(self):
+        """Test the 5 per minute login limit counts requests to every worker"""
+        payload = {"email": "nobody@email.com", "password": "wrong"}
+        statuses = [
+            self.apps[i % 2].test_client().post('/customers/login', json=payload).status_code
+            for i in range(6)
+        ]
+        self.assertNotIn(429, statuses[:5])
+        self.assertEqual(statuses[5], 429)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from application import create_app
+from application.extensions import db
+from application.models import Mechanic
+from application.replicas import read_only
+from config import TestingConfig
+
+
+class TestReplicas(unittest.TestCase):
+    def setUp(self):
+        """Seed the primary, copy it to two SQLite replicas and tell the copies apart"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.replica_files = [os.path.join(self.tmp.name, f"replica{i}.db") for i in (1, 2)]
+
+        class ReplicaConfig(TestingConfig):
+            SQLALCHEMY_REPLICAS = [f"sqlite:///{path}" for path in self.replica_files]
+            CACHE_TYPE = "NullCache"
+
+        self.config_class = ReplicaConfig
+        self.app = create_app(ReplicaConfig)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(Mechanic(name="Primary", email="mech@test.com"))
+            db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=["sync-replicas"])
+        self.assertEqual(result.output.count("Copied primary"), 2)
+        for i, path in enumerate(self.replica_files, 1):
+            self._set_replica_name(path, f"Replica {i}")
+
+    def tearDown(self):
+        """Clean up after each test"""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        self.app.extensions["replicas"].dispose()
+        self.tmp.cleanup()
+
+    def _set_replica_name(self, path, name):
+        connection = sqlite3.connect(path)
+        with connection:
+            connection.execute("UPDATE mechanics SET name = ?", (name,))
+        connection.close()
+
+    def _mechanic_name(self):
+        return self.client.get('/mechanics/').json[0]['name']
+
+    def test_get_requests_round_robin_across_replicas(self):
+        """Test GET requests alternate between the replicas"""
+        names = [self._mechanic_name() for _ in range(4)]
+        self.assertEqual(sorted(names), ["Replica 1", "Replica 1", "Replica 2", "Replica 2"])
+        self.assertNotEqual(names[0], names[1])
+
+    def test_writes_go_to_primary(self):
+        """Test non-GET requests use the primary"""
+        response = self.client.put('/mechanics/1', json={"phone": "555-0199"})
+        self.assertEqual(response.json['name'], "Primary")
+
+    def test_read_after_write_stays_on_primary(self):
+        """Test a GET view that writes reads its own write back"""
+        @self.app.route('/test/touch')
+        def touch():
+            before = db.session.get(Mechanic, 1).name
+            db.session.add(Mechanic(name="New", email="new@test.com"))
+            db.session.commit()
+            count = db.session.scalar(db.select(db.func.count()).select_from(Mechanic))
+            return {"before": before, "count": count}
+
+        response = self.client.get('/test/touch')
+        self.assertTrue(response.json['before'].startswith("Replica"))
+        self.assertEqual(response.json['count'], 2)
+
+    def test_read_only_decorator(self):
+        """Test a view marked read_only reads from a replica for any method"""
+        @self.app.route('/test/lookup', methods=['POST'])
+        @read_only
+        def lookup():
+            return {"name": db.session.get(Mechanic, 1).name}
+
+        self.assertTrue(self.client.post('/test/lookup').json['name'].startswith("Replica"))
+
+    def test_failed_replica_taken_out_of_rotation(self):
+        """Test a replica that errors is skipped until it passes a health check"""
+        os.remove(self.replica_files[0])
+        os.mkdir(self.replica_files[0])  # make it impossible to open
+
+        names = []
+        for _ in range(4):
+            try:
+                names.append(self._mechanic_name())
+            except Exception:
+                names.append(None)
+        self.assertLessEqual(names.count(None), 1)
+        self.assertEqual(names[-2:], ["Replica 2", "Replica 2"])
+
+        # Once the retry interval has passed the replica is probed again.
+        self.app.extensions["replicas"].replicas[0].retry_at = 0
+        os.rmdir(self.replica_files[0])
+        with self.app.app_context():
+            db.session.execute(db.text(f"VACUUM INTO '{self.replica_files[0]}'"))
+        self.assertIn("Primary", [self._mechanic_name() for _ in range(3)])
+
+    def test_least_connections(self):
+        """Test least_connections avoids the replica that is already busy"""
+        class LeastConnectionsConfig(self.config_class):
+            REPLICA_STRATEGY = "least_connections"
+
+        self.app.extensions["replicas"].dispose()
+        self.app = create_app(LeastConnectionsConfig)
+        self.client = self.app.test_client()
+        busy = self.app.extensions["replicas"].replicas[0].engine.connect()
+        try:
+            self.assertEqual({self._mechanic_name() for _ in range(3)}, {"Replica 2"})
+        finally:
+            busy.close()
+
+    def test_replica_reads_after_write_not_cached(self):
+        """Test responses read from a replica right after a write are not cached"""
+        class CachedConfig(self.config_class):
+            CACHE_TYPE = "SimpleCache"
+            SQLALCHEMY_REPLICAS = self.config_class.SQLALCHEMY_REPLICAS[:1]
+
+        self.app.extensions["replicas"].dispose()
+        self.app = create_app(CachedConfig)
+        self.client = self.app.test_client()
+        self.client.put('/mechanics/1', json={"phone": "555-0199"})
+
+        self.assertEqual(self._mechanic_name(), "Replica 1")
+        self._set_replica_name(self.replica_files[0], "Replica 1 caught up")
+        self.assertEqual(self._mechanic_name(), "Replica 1 caught up")
+
+        self.app.config['REPLICA_MAX_LAG'] = 0
+        self._mechanic_name()
+        self._set_replica_name(self.replica_files[0], "Replica 1 later")
+        self.assertEqual(self._mechanic_name(), "Replica 1 caught up")
+
+
+if __name__ == '__main__':
+    unittest.main()
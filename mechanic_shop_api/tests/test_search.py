@@ -0,0 +1,127 @@
+import unittest
+from application import create_app
+from application.models import db, Customer, Inventory, ServiceTicket
+from application.search import SOURCES, _fts_table, search_terms
+from config import TestingConfig
+
+
+class TestSearch(unittest.TestCase):
+    backend = "fts5"
+
+    def setUp(self):
+        """Set up test client and initialize test database"""
+        class SearchConfig(TestingConfig):
+            SEARCH_BACKEND = self.backend
+
+        self.app = create_app(SearchConfig)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(Customer(name="Test Customer", email="customer@test.com", password="password"))
+            db.session.add_all([
+                ServiceTicket(description="Replaced front brake pads", vin="1HGCM82633A123456", customer_id=1),
+                ServiceTicket(description="Brake fluid flush", vin="1HGCM82633A123456", customer_id=1),
+                ServiceTicket(description="Oil change", vin="2FMDK4KC8DBA12345", customer_id=1),
+                Inventory(name="Ceramic brake pad set", price=45.00),
+                Inventory(name="Oil filter", price=12.99),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        """Clean up after each test"""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _hits(self, query):
+        response = self.client.get(f'/search/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted((item['type'], item['id']) for item in response.json['items'])
+
+    def _index_size(self):
+        with self.app.app_context():
+            if self.backend == "fts5":
+                return sum(
+                    db.session.scalar(db.select(db.func.count()).select_from(_fts_table(kind)))
+                    for kind in SOURCES
+                )
+            return db.session.scalar(db.select(db.func.count()).select_from(search_terms))
+
+    # Test GET /search/ - Full-Text Search
+    def test_search(self):
+        """Test every word must match, as a prefix, across tickets and inventory"""
+        self.assertEqual(self._hits('q=brake+pad'), [("inventory", 1), ("service_ticket", 1)])
+        self.assertEqual(self._hits('q=BRAK'), [("inventory", 1), ("service_ticket", 1), ("service_ticket", 2)])
+        self.assertEqual(self._hits('q=oil&type=inventory'), [("inventory", 2)])
+        self.assertEqual(self._hits('q=transmission'), [])
+
+    def test_search_ranked_and_paginated(self):
+        """Test results come best first, one page at a time"""
+        response = self.client.get('/search/?q=brake&per_page=2')
+        self.assertEqual(len(response.json['items']), 2)
+        self.assertTrue(response.json['has_next'])
+        scores = [item['score'] for item in response.json['items']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        response = self.client.get('/search/?q=brake&per_page=2&page=2')
+        self.assertEqual(len(response.json['items']), 1)
+        self.assertFalse(response.json['has_next'])
+
+    def test_search_follows_writes(self):
+        """Test creates, updates and deletes show up in the results"""
+        self.client.post('/service-tickets/', json={
+            "description": "Brake pad inspection", "vin": "2FMDK4KC8DBA12345", "customer_id": 1
+        })
+        self.client.put('/inventory/1', json={"name": "Wiper blades", "price": 20.00})
+        with self.app.app_context():
+            db.session.delete(db.session.get(ServiceTicket, 1))
+            db.session.commit()
+        self.assertEqual(self._hits('q=brake+pad'), [("service_ticket", 4)])
+        self.assertEqual(self._hits('q=wiper'), [("inventory", 1)])
+
+    def test_search_bulk_created_rows(self):
+        """Test rows from the bulk endpoints are indexed"""
+        self.client.post('/inventory/bulk', json=[{"name": "Brake rotor", "price": 80.00}])
+        self.assertEqual(self._hits('q=rotor'), [("inventory", 3)])
+
+    def test_customer_delete_drops_ticket_entries(self):
+        """Test tickets deleted by cascade leave no search entries behind"""
+        before = self._index_size()
+        with self.app.app_context():
+            db.session.delete(db.session.get(Customer, 1))
+            db.session.commit()
+        self.assertLess(self._index_size(), before)
+        self.assertEqual(self._hits('q=brake'), [("inventory", 1)])
+
+    def test_rebuild_search_index(self):
+        """Test flask rebuild-search-index restores an emptied index in batches"""
+        with self.app.app_context():
+            if self.backend == "fts5":
+                for kind in SOURCES:
+                    db.session.execute(db.delete(_fts_table(kind)))
+            else:
+                db.session.execute(search_terms.delete())
+            db.session.commit()
+        self.assertEqual(self._hits('q=brake'), [])
+
+        result = self.app.test_cli_runner().invoke(args=["rebuild-search-index", "--batch-size", "2"])
+        self.assertIn("Indexed 3 service_ticket rows.", result.output)
+        self.assertIn("Indexed 2 inventory rows.", result.output)
+        self.assertEqual(self._hits('q=brake'), [("inventory", 1), ("service_ticket", 1), ("service_ticket", 2)])
+
+    def test_search_invalid(self):
+        """Test searching without words or with an unknown type (negative test)"""
+        self.assertEqual(self.client.get('/search/?q=').status_code, 400)
+        self.assertEqual(self.client.get('/search/?q=%21%21').status_code, 400)
+        self.assertEqual(self.client.get('/search/?q=oil&type=mechanic').status_code, 400)
+
+
+class TestSearchPostings(TestSearch):
+    """The same tests against the inverted index used on other databases"""
+    backend = "postings"
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
+from sqlalchemy import event
 from application import create_app
+from application.extensions import cache
 from application.models import db, Customer, Mechanic, ServiceTicket, Inventory
 from config import TestingConfig
 
@@ -71,6 +73,27 @@ class TestServiceTickets(unittest.TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.json['description'], "Brake repair")
 
+    def test_create_service_ticket_normalizes_vin(self):
+        """Test VINs are stored uppercased and trimmed"""
+        response = self.client.post('/service-tickets/', json={
+            "description": "Brake repair",
+            "vin": " 2fmdk4kc8dba12345 ",
+            "customer_id": 1
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['vin'], "2FMDK4KC8DBA12345")
+
+    def test_create_service_ticket_invalid_vin(self):
+        """Test VINs with I, O or Q or of the wrong length are rejected (negative test)"""
+        for vin in ("2FMDK4KC8DBA1234O", "2FMDK4KC8DBA1234", "2FMDK4KC8DBA12345-"):
+            response = self.client.post('/service-tickets/', json={
+                "description": "Brake repair",
+                "vin": vin,
+                "customer_id": 1
+            })
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('vin', response.json)
+
     def test_create_service_ticket_missing_fields(self):
         """Test creating ticket with missing fields (negative test)"""
         ticket_payload = {
@@ -80,6 +103,16 @@ class TestServiceTickets(unittest.TestCase):
         response = self.client.post('/service-tickets/', json=ticket_payload)
         self.assertEqual(response.status_code, 400)
 
+    def test_create_service_ticket_unknown_customer(self):
+        """Test creating a ticket for a customer that does not exist (negative test)"""
+        response = self.client.post('/service-tickets/', json={
+            "description": "Brake repair",
+            "vin": "2FMDK4KC8DBA12345",
+            "customer_id": 999
+        })
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('customer_id', response.json)
+
     # Test GET /service-tickets/ - Get All Service Tickets
     def test_get_service_tickets(self):
         """Test retrieving all service tickets"""
@@ -87,6 +120,202 @@ class TestServiceTickets(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.json, list)
         self.assertEqual(len(response.json), 1)
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_get_service_tickets_cursor_pagination(self):
+        """Test walking the ticket list page by page with the next cursor"""
+        for vin in ("2FMDK4KC8DBA12345", "3FADP4BJ7FM123456"):
+            self.client.post('/service-tickets/', json={
+                "description": "Tire rotation",
+                "vin": vin,
+                "customer_id": 1
+            })
+
+        response = self.client.get('/service-tickets/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['id'] for t in response.json], [1, 2])
+        cursor = response.headers['X-Next-Cursor']
+
+        response = self.client.get(f'/service-tickets/?limit=2&cursor={cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['id'] for t in response.json], [3])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_get_service_tickets_filtered(self):
+        """Test filtering the ticket list by vin and mechanic"""
+        self.client.put('/service-tickets/1/assign-mechanic/2')
+
+        response = self.client.get('/service-tickets/?vin=1HGCM82633A123456&mechanic_id=2')
+        self.assertEqual(len(response.json), 1)
+        self.assertEqual(response.json[0]['mechanics'][0]['id'], 2)
+
+        response = self.client.get('/service-tickets/?mechanic_id=1')
+        self.assertEqual(response.json, [])
+
+    def test_get_service_tickets_cache_invalidated_on_assign(self):
+        """Test the cached ticket list reflects a newly assigned mechanic"""
+        response = self.client.get('/service-tickets/')
+        self.assertEqual(response.json[0]['mechanics'], [])
+
+        self.client.put('/service-tickets/1/assign-mechanic/1')
+        response = self.client.get('/service-tickets/')
+        self.assertEqual(len(response.json[0]['mechanics']), 1)
+
+    def test_get_service_tickets_fast_serialization_matches(self):
+        """Test the compiled serializer returns the same bytes as marshmallow"""
+        self.client.put('/service-tickets/1/edit', json={"add_ids": [2, 1]})
+        self.client.put('/service-tickets/1/add-part/1')
+        self.client.post('/service-tickets/', json={
+            "description": "Alignment",
+            "vin": "2FMDK4KC8DBA12345",
+            "customer_id": 1
+        })
+        fast = self.client.get('/service-tickets/').data
+        self.app.config['FAST_SERIALIZATION_ENDPOINTS'] = set()
+        with self.app.app_context():
+            cache.clear()
+        slow = self.client.get('/service-tickets/').data
+        self.assertEqual(fast, slow)
+
+    def test_get_service_tickets_sparse_fields(self):
+        """Test ?fields= returns only those fields and skips the relationship queries"""
+        self.client.put('/service-tickets/1/edit', json={"add_ids": [1]})
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        for fast in (True, False):
+            if not fast:
+                self.app.config['FAST_SERIALIZATION_ENDPOINTS'] = set()
+            with self.app.app_context():
+                cache.clear()
+            event.listen(engine, "before_cursor_execute", record)
+            try:
+                response = self.client.get('/service-tickets/?fields=id,vin,customer_id')
+            finally:
+                event.remove(engine, "before_cursor_execute", record)
+            self.assertEqual(response.json, [{"id": 1, "vin": "1HGCM82633A123456", "customer_id": 1}])
+            ticket_selects = [s for s in statements if "FROM service_tickets" in s]
+            self.assertTrue(ticket_selects)
+            self.assertFalse(any("description" in s for s in ticket_selects))
+            self.assertFalse(any("service_ticket_mechanic" in s for s in statements))
+            statements.clear()
+
+    def test_get_service_tickets_include(self):
+        """Test ?include= adds only the named nested fields"""
+        self.client.put('/service-tickets/1/edit', json={"add_ids": [1]})
+        ticket = self.client.get('/service-tickets/?include=mechanics').json[0]
+        self.assertIn('description', ticket)
+        self.assertEqual(len(ticket['mechanics']), 1)
+        self.assertNotIn('inventory_items', ticket)
+
+        ticket = self.client.get('/service-tickets/?fields=id&include=inventory_items').json[0]
+        self.assertEqual(ticket, {"id": 1, "inventory_items": []})
+
+    def test_get_service_tickets_unknown_field(self):
+        """Test ?fields= and ?include= with unknown names (negative test)"""
+        response = self.client.get('/service-tickets/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json['error'])
+        self.assertEqual(self.client.get('/service-tickets/?include=vin').status_code, 400)
+
+    def test_get_service_tickets_conditional(self):
+        """Test editing a ticket's mechanics or renaming a mechanic changes the list ETag"""
+        etag = self.client.get('/service-tickets/').headers['ETag']
+        self.assertEqual(self.client.get('/service-tickets/', headers={"If-None-Match": etag}).status_code, 304)
+
+        self.client.put('/service-tickets/1/edit', json={"add_ids": [1]})
+        response = self.client.get('/service-tickets/', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        self.client.put('/mechanics/1', json={"name": "Renamed"})
+        response = self.client.get('/service-tickets/', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json[0]['mechanics'][0]['name'], "Renamed")
+
+    def test_get_service_tickets_invalid_cursor(self):
+        """Test listing tickets with a malformed cursor (negative test)"""
+        response = self.client.get('/service-tickets/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    # Test GET /service-tickets/by-vin/<vin> - Vehicle History
+    def test_get_service_tickets_by_vin(self):
+        """Test a vehicle's history by full VIN, and by partial VIN across pages"""
+        for vin in ("1HGCM82633A123456", "1HGCM82633A999999", "2FMDK4KC8DBA12345"):
+            self.client.post('/service-tickets/', json={
+                "description": "Service",
+                "vin": vin,
+                "customer_id": 1
+            })
+
+        response = self.client.get('/service-tickets/by-vin/1hgcm82633a123456')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['id'] for t in response.json], [1, 2])
+
+        seen = []
+        url = '/service-tickets/by-vin/1HGCM?limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend((t['vin'], t['id']) for t in response.json)
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/service-tickets/by-vin/1HGCM?limit=2&cursor={cursor}' if cursor else None
+        self.assertEqual(seen, [
+            ("1HGCM82633A123456", 1),
+            ("1HGCM82633A123456", 2),
+            ("1HGCM82633A999999", 3),
+        ])
+
+        response = self.client.get('/service-tickets/by-vin/1HGCM?fields=id')
+        self.assertEqual(response.json, [{"id": 1}, {"id": 2}, {"id": 3}])
+
+    def test_normalize_vins_command(self):
+        """Test flask normalize-vins fixes VINs written before normalization"""
+        with self.app.app_context():
+            db.session.execute(ServiceTicket.__table__.insert().values(
+                description="Legacy", vin=" 2fmdk4kc8dba12345", customer_id=1
+            ))
+            db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=["normalize-vins"])
+        self.assertIn("Normalized 1 VINs", result.output)
+        response = self.client.get('/service-tickets/by-vin/2FMDK4KC8DBA12345')
+        self.assertEqual([t['description'] for t in response.json], ["Legacy"])
+
+    def test_get_service_tickets_by_vin_invalid(self):
+        """Test VIN lookups with an invalid VIN or cursor (negative test)"""
+        self.assertEqual(self.client.get('/service-tickets/by-vin/1HGCQ').status_code, 400)
+        self.assertEqual(self.client.get('/service-tickets/by-vin/1HGCM82633A1234567').status_code, 400)
+        response = self.client.get('/service-tickets/by-vin/1HGCM?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    # Test GET /service-tickets/export - Streaming Export
+    def test_export_service_tickets(self):
+        """Test exporting tickets with their mechanics as NDJSON and CSV"""
+        self.client.put('/service-tickets/1/edit', json={"add_ids": [1, 2]})
+        response = self.client.get('/service-tickets/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True).count('"email":"mech'), 2)
+
+        response = self.client.get('/service-tickets/export?format=csv')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[1], '1,Oil change,1HGCM82633A123456,1,0.0,1;2,')
+
+    # Test POST /service-tickets/bulk - Bulk Create Service Tickets
+    def test_bulk_create_service_tickets(self):
+        """Test creating tickets in bulk, rejecting unknown customers"""
+        payload = [
+            {"description": "Brakes", "vin": "2FMDK4KC8DBA12345", "customer_id": 1},
+            {"description": "Tires", "vin": "2FMDK4KC8DBA12346", "customer_id": 99},
+            {"description": "Tires"},
+        ]
+        response = self.client.post('/service-tickets/bulk', json=payload)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.json['results']], [201, 404, 400])
+        self.assertEqual(len(self.client.get('/service-tickets/').json), 2)
 
     # Test PUT /service-tickets/<id>/assign-mechanic/<mechanic_id>
     def test_assign_mechanic_to_ticket(self):
@@ -144,6 +373,55 @@ class TestServiceTickets(unittest.TestCase):
         response = self.client.put('/service-tickets/1/edit', json=payload)
         self.assertEqual(response.status_code, 404)
 
+    def test_bulk_edit_add_and_remove(self):
+        """Test removing mechanics while adding others in one request"""
+        self.client.put('/service-tickets/1/edit', json={"add_ids": [1, 2]})
+        response = self.client.put('/service-tickets/1/edit', json={"add_ids": [2], "remove_ids": [1]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['id'] for m in response.json['mechanics']], [2])
+
+    def test_bulk_edit_missing_remove_ids_leaves_ticket_unchanged(self):
+        """Test a missing id in remove_ids rolls back the whole edit (negative test)"""
+        response = self.client.put('/service-tickets/1/edit', json={"add_ids": [1], "remove_ids": [999]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['missing_ids'], [999])
+        response = self.client.get('/service-tickets/')
+        self.assertEqual(response.json[0]['mechanics'], [])
+
+    # Test PUT /service-tickets/bulk-edit - Edit Mechanics Across Tickets
+    def test_bulk_edit_many_tickets(self):
+        """Test applying mechanic changes to several tickets at once"""
+        self.client.post('/service-tickets/', json={
+            "description": "Brakes",
+            "vin": "2FMDK4KC8DBA12345",
+            "customer_id": 1
+        })
+        self.client.put('/service-tickets/2/assign-mechanic/2')
+        payload = {"ticket_ids": [1, 2], "add_ids": [1], "remove_ids": [2]}
+        response = self.client.put('/service-tickets/bulk-edit', json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(t['id'], [m['id'] for m in t['mechanics']]) for t in response.json],
+            [(1, [1]), (2, [1])],
+        )
+
+        response = self.client.get('/mechanics/by-tickets')
+        self.assertEqual([(m['id'], m['ticket_count']) for m in response.json], [(1, 2), (2, 0)])
+
+    def test_bulk_edit_many_tickets_not_found(self):
+        """Test bulk edit with a non-existent ticket id (negative test)"""
+        payload = {"ticket_ids": [1, 999], "add_ids": [1]}
+        response = self.client.put('/service-tickets/bulk-edit', json=payload)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['missing_ids'], [999])
+
+    def test_bulk_edit_many_tickets_too_many(self):
+        """Test bulk edit rejects more tickets than the configured maximum (negative test)"""
+        self.app.config['BULK_EDIT_MAX_TICKETS'] = 1
+        payload = {"ticket_ids": [1, 2], "add_ids": [1]}
+        response = self.client.put('/service-tickets/bulk-edit', json=payload)
+        self.assertEqual(response.status_code, 400)
+
     # Test PUT /service-tickets/<id>/add-part/<inventory_id>
     def test_add_part_to_ticket(self):
         """Test adding an inventory part to a service ticket"""
@@ -156,6 +434,78 @@ class TestServiceTickets(unittest.TestCase):
         response = self.client.put('/service-tickets/999/add-part/1')
         self.assertEqual(response.status_code, 404)
 
+    def test_add_part_quantity_updates_parts_total(self):
+        """Test parts_total follows part quantities as parts are added and removed"""
+        self.client.post('/inventory/', json={"name": "Brake Pads", "price": 45.00})
+        response = self.client.put('/service-tickets/1/add-part/1', json={"quantity": 2})
+        self.assertAlmostEqual(response.json['parts_total'], 25.98)
+
+        self.client.put('/service-tickets/1/add-part/2')
+        response = self.client.put('/service-tickets/1/add-part/2', json={"quantity": 4})
+        self.assertAlmostEqual(response.json['parts_total'], 205.98)
+
+        response = self.client.put('/service-tickets/1/remove-part/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json['inventory_items']], [2])
+        self.assertAlmostEqual(response.json['parts_total'], 180.00)
+
+    def test_add_part_invalid_quantity(self):
+        """Test adding a part with a zero or non-integer quantity (negative test)"""
+        for quantity in (0, -1, 1.5, "2"):
+            response = self.client.put('/service-tickets/1/add-part/1', json={"quantity": quantity})
+            self.assertEqual(response.status_code, 400)
+
+    def test_remove_part_not_found(self):
+        """Test removing a part from a non-existent ticket (negative test)"""
+        response = self.client.put('/service-tickets/999/remove-part/1')
+        self.assertEqual(response.status_code, 404)
+
+    def test_parts_total_follows_price_changes(self):
+        """Test repricing or deleting a part updates the totals of tickets using it"""
+        self.client.put('/service-tickets/1/add-part/1', json={"quantity": 3})
+        self.client.put('/inventory/1', json={"name": "Oil Filter", "price": 10.00})
+        response = self.client.get('/service-tickets/?fields=parts_total')
+        self.assertEqual(response.json, [{"parts_total": 30.00}])
+
+        self.client.delete('/inventory/1')
+        response = self.client.get('/service-tickets/?fields=parts_total')
+        self.assertEqual(response.json, [{"parts_total": 0.0}])
+
+    def test_get_service_tickets_sorted_by_parts_total(self):
+        """Test sorting and filtering the ticket list by parts_total, page by page"""
+        for quantity in (3, 1, 2):
+            ticket_id = self.client.post('/service-tickets/', json={
+                "description": "Oil change", "vin": "2FMDK4KC8DBA12345", "customer_id": 1
+            }).json['id']
+            self.client.put(f'/service-tickets/{ticket_id}/add-part/1', json={"quantity": quantity})
+
+        response = self.client.get('/service-tickets/?sort=-parts_total&limit=2&fields=id')
+        self.assertEqual(response.json, [{"id": 2}, {"id": 4}])
+        cursor = response.headers['X-Next-Cursor']
+        response = self.client.get(f'/service-tickets/?sort=-parts_total&limit=2&fields=id&cursor={cursor}')
+        self.assertEqual(response.json, [{"id": 3}, {"id": 1}])
+
+        response = self.client.get('/service-tickets/?sort=parts_total&min_parts_total=10&max_parts_total=30&fields=id')
+        self.assertEqual(response.json, [{"id": 3}, {"id": 4}])
+
+    def test_get_service_tickets_invalid_sort(self):
+        """Test an unknown sort, or an id cursor with a parts_total sort (negative test)"""
+        self.assertEqual(self.client.get('/service-tickets/?sort=vin').status_code, 400)
+        cursor = self.client.get('/service-tickets/?limit=1').headers.get('X-Next-Cursor', 'MQ')
+        response = self.client.get(f'/service-tickets/?sort=parts_total&cursor={cursor}')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_parts_totals_command(self):
+        """Test flask rebuild-parts-totals repairs drifted totals"""
+        self.client.put('/service-tickets/1/add-part/1', json={"quantity": 2})
+        with self.app.app_context():
+            db.session.execute(db.update(ServiceTicket).values(parts_total=99.0))
+            db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=["rebuild-parts-totals"])
+        self.assertIn("(1 were out of date)", result.output)
+        with self.app.app_context():
+            self.assertAlmostEqual(db.session.get(ServiceTicket, 1).parts_total, 25.98)
+
 
 if __name__ == '__main__':
     unittest.main()
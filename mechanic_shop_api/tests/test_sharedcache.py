@@ -0,0 +1,149 @@
+import os
+import tempfile
+import time
+import unittest
+from application import create_app
+from application.extensions import cache
+from application.models import db, Inventory
+from application.sharedcache import SharedCache
+from config import TestingConfig
+
+
+class TestSharedCache(unittest.TestCase):
+    def setUp(self):
+        """Create a cache file in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.db")
+        self.cache = SharedCache(self.path, max_bytes=10_000, compress_threshold=None, touch_interval=0)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.tmp.cleanup()
+
+    def test_set_get_delete(self):
+        """Test values round-trip and deleting frees their bytes"""
+        self.cache.set("a", {"name": "Oil Filter"})
+        self.assertEqual(self.cache.get("a"), {"name": "Oil Filter"})
+        self.assertEqual(self.cache.get_many("a", "b"), [{"name": "Oil Filter"}, None])
+        self.assertTrue(self.cache.delete("a"))
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["bytes"], 0)
+
+    def test_shared_between_processes(self):
+        """Test a second cache on the same file (another worker) sees the same entries"""
+        other = SharedCache(self.path)
+        self.cache.set("a", 1)
+        self.assertEqual(other.get("a"), 1)
+        self.assertFalse(other.add("a", 2))
+        self.assertEqual(self.cache.get("a"), 1)
+
+    def test_least_recently_used_evicted_over_budget(self):
+        """Test writes over the byte budget evict the least recently used entries"""
+        value = "x" * 3000
+        for key in ("a", "b", "c"):
+            self.cache.set(key, value)
+        self.cache.get("a")  # now b is the least recently used
+        self.cache.set("d", value)
+
+        self.assertIsNone(self.cache.get("b"))
+        for key in ("a", "c", "d"):
+            self.assertEqual(self.cache.get(key), value)
+        stats = self.cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["entries"], 3)
+        self.assertLessEqual(stats["bytes"], 10_000)
+
+    def test_large_values_compressed(self):
+        """Test values over the threshold are stored compressed"""
+        compressing = SharedCache(self.path, compress_threshold=1024)
+        compressing.set("big", "x" * 100_000)
+        self.assertEqual(compressing.get("big"), "x" * 100_000)
+        self.assertLess(compressing.stats()["bytes"], 1000)
+
+    def test_expired_entries_miss(self):
+        """Test expired entries are misses and counted in the stats"""
+        self.cache.set("a", 1, timeout=-1)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertFalse(self.cache.has("a"))
+        self.assertTrue(self.cache.add("a", 2))
+        self.assertEqual(self.cache.get("a"), 2)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_inc_existing_skips_missing_and_expired(self):
+        """Test inc_existing only increments a live counter and never creates one"""
+        self.assertIsNone(self.cache.inc_existing("count", 1))
+        self.assertIsNone(self.cache.get("count"))
+        self.cache.set("count", 5, timeout=-1)
+        self.assertIsNone(self.cache.inc_existing("count", 1))
+        self.assertFalse(self.cache.has("count"))
+
+        self.cache.set("count", 5)
+        self.assertEqual(self.cache.inc_existing("count", -2), 3)
+        self.assertEqual(self.cache.get("count"), 3)
+
+
+class TestSharedResponseCache(unittest.TestCase):
+    def setUp(self):
+        """Start two apps, as two workers would, on one cache file"""
+        self.tmp = tempfile.TemporaryDirectory()
+
+        class SharedCacheConfig(TestingConfig):
+            CACHE_TYPE = "application.sharedcache.SharedCache"
+            CACHE_SHARED_PATH = os.path.join(self.tmp.name, "cache.db")
+
+        self.apps = [create_app(SharedCacheConfig) for _ in range(2)]
+        with self.apps[0].app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(Inventory(name="Oil Filter", price=12.99))
+            db.session.commit()
+
+    def tearDown(self):
+        """Clean up after each test"""
+        with self.apps[0].app_context():
+            db.session.remove()
+            db.drop_all()
+        self.tmp.cleanup()
+
+    def test_second_worker_hits_first_workers_entry(self):
+        """Test a response cached by one worker is served by the other"""
+        first, second = (app.test_client() for app in self.apps)
+        self.assertEqual(first.get('/inventory/').status_code, 200)
+
+        with self.apps[1].app_context():
+            before = cache.cache.stats()["hits"]
+        self.assertEqual(second.get('/inventory/').json[0]['name'], "Oil Filter")
+        with self.apps[1].app_context():
+            self.assertGreater(cache.cache.stats()["hits"], before)
+
+        # A write through either worker changes the key for both.
+        first.put('/inventory/1', json={"name": "Air Filter", "price": 9.99})
+        self.assertEqual(second.get('/inventory/').json[0]['name'], "Air Filter")
+
+    def test_view_entries_kept_for_an_hour(self):
+        """Test a shared backend keeps versioned view entries for their full timeout"""
+        self.apps[0].test_client().get('/inventory/')
+        with self.apps[0].app_context():
+            expires_at, = cache.cache._connection().execute(
+                "SELECT expires_at FROM cache_entries WHERE key LIKE 'view/%'"
+            ).fetchone()
+        self.assertGreater(expires_at - time.time(), 3000)
+
+    def test_insert_increments_only_a_live_total(self):
+        """Test an insert moves a cached total in place but never recreates an expired one"""
+        first, second = (app.test_client() for app in self.apps)
+        self.assertEqual(first.get('/inventory/?page=1').json['total'], 1)
+        second.post('/inventory/', json={"name": "Air Filter", "price": 9.99})
+        with self.apps[0].app_context():
+            self.assertEqual(cache.get("count/inventory"), 2)
+            cache.set("count/inventory", 2, timeout=-1)
+
+        second.post('/inventory/', json={"name": "Cabin Filter", "price": 14.99})
+        with self.apps[0].app_context():
+            self.assertIsNone(cache.get("count/inventory"))
+        self.assertEqual(first.get('/inventory/?page=1').json['total'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
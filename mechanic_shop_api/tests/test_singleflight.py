@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+from application import create_app
+from application.caching import versioned_cache_key, versioned_cached
+from application.extensions import cache
+from application.models import db, Inventory
+from application.singleflight import LOCK_KEY, coalescer, single_flight
+from config import TestingConfig
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        """Set up an app with a slow cached view and initialize test database"""
+        self.app = create_app(TestingConfig)
+        self.calls = 0
+        self.release = threading.Event()
+
+        @self.app.route('/test/slow')
+        @versioned_cached("inventory")
+        @single_flight
+        def slow():
+            self.calls += 1
+            self.release.wait(5)
+            return {"name": db.session.get(Inventory, 1).name}
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(Inventory(name="Oil Filter", price=12.99))
+            db.session.commit()
+
+    def tearDown(self):
+        """Clean up after each test"""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _concurrent_gets(self, count):
+        results = [None] * count
+
+        def get(i):
+            results[i] = self.app.test_client().get('/test/slow').json['name']
+
+        threads = [threading.Thread(target=get, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.3)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        self.release.clear()
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        """Test concurrent misses on one key run the view once"""
+        results = self._concurrent_gets(8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ["Oil Filter"] * 8)
+
+    def test_waiters_get_stale_copy_while_leader_recomputes(self):
+        """Test callers arriving during a recompute get the previous response"""
+        self.release.set()
+        self.app.test_client().get('/test/slow')
+        self.release.clear()
+        self.app.test_client().put('/inventory/1', json={"name": "Air Filter", "price": 9.99})
+
+        results = self._concurrent_gets(4)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(results.count("Air Filter"), 1)
+        self.assertEqual(results.count("Oil Filter"), 3)
+        # Once the leader is done everyone sees the new value.
+        self.assertEqual(self.app.test_client().get('/test/slow').json['name'], "Air Filter")
+
+    def test_waits_for_lock_held_by_another_worker(self):
+        """Test a caller polls while another worker holds the lock, then computes itself"""
+        self.app.config['SINGLE_FLIGHT_WAIT_TIMEOUT'] = 0.2
+        self.app.config['SINGLE_FLIGHT_STALE_TTL'] = 0
+        coalescer.init_app(self.app)
+        try:
+            with self.app.test_request_context('/test/slow'):
+                cache.add(LOCK_KEY % versioned_cache_key(("inventory",)), 12345, timeout=60)
+
+            self.release.set()
+            start = time.monotonic()
+            response = self.app.test_client().get('/test/slow')
+            self.assertGreaterEqual(time.monotonic() - start, 0.2)
+            self.assertEqual(response.json['name'], "Oil Filter")
+            self.assertEqual(self.calls, 1)
+        finally:
+            coalescer.init_app(create_app(TestingConfig))
+
+
+if __name__ == '__main__':
+    unittest.main()